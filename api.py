@@ -0,0 +1,218 @@
+import argparse
+import http.client
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cubo import (
+    combinar_cubos,
+    combinar_marginais,
+    construir_cubo,
+    construir_marginais,
+    indicadores_do_cubo,
+    resumir_tempos,
+    selecionar_grupo
+)
+from instrumentacao import configurar_logging
+from lote import POPULACAO_PADRAO, TODOS, carregar_diretorio, interpretar_anos, interpretar_estados, serializar
+from memoizacao import CacheLRU, chave_indicadores
+from particoes import obter_derivado, registrar_derivado, versao_dos_dados
+from populacao import anos_substituidos, calcular_taxas, padronizacao_disponivel, populacao_selecao
+from topografia import GRUPOS
+
+logger = logging.getLogger(__name__)
+
+# Respostas guardadas em cache (uma por combinação de anos, UFs e grupo)
+MAX_RESPOSTAS_CACHE = 1024
+
+class ServicoIndicadores:
+    """
+    Dados carregados uma única vez e compartilhados por todas as
+    requisições, com as respostas já serializadas em um cache LRU.
+    """
+
+    def __init__(self, diretorio, max_processos=None, max_respostas=MAX_RESPOSTAS_CACHE):
+        # Cubos por ano: as consultas somam células em vez de percorrer as linhas
+        registrar_derivado("cubo", construir_cubo)
+        registrar_derivado("marginais", construir_marginais)
+        registrar_derivado("tempos", resumir_tempos)
+        self.estado = {}
+        carregar_diretorio(diretorio, max_processos, self.estado)
+        self.anos = list(self.estado["anos_disponiveis"])
+        self.cache = CacheLRU(max_respostas)
+        # A trava geral protege apenas o cache e o dicionário de travas; o
+        # cálculo usa a trava da própria chave, para que consultas diferentes
+        # rodem em paralelo e consultas iguais calculem uma única vez
+        self._trava = threading.Lock()
+        self._travas_chaves = {}
+
+    def consultar(self, parametros):
+        """Retorna a resposta JSON (em bytes) para os parâmetros da consulta"""
+        anos = interpretar_anos(parametros.get("anos", TODOS), self.anos)
+        ufs = interpretar_estados(parametros.get("ufs", TODOS))
+        # Na query string, '+' não codificado chega como espaço
+        grupo = parametros.get("grupo", "C43+C44").upper().replace(" ", "+")
+        if grupo not in GRUPOS:
+            raise ValueError(f"Grupo desconhecido: {grupo} (use {', '.join(GRUPOS)})")
+        if not anos:
+            raise ValueError(f"Nenhum dos anos pedidos está disponível (anos disponíveis: {self.anos})")
+
+        chave = chave_indicadores(versao_dos_dados(self.estado, anos), anos, ufs, grupo)
+        with self._trava:
+            trava_chave = self._travas_chaves.setdefault(chave, threading.Lock())
+        with trava_chave:
+            try:
+                with self._trava:
+                    resposta = self.cache.buscar(chave)
+                if resposta is None:
+                    resposta = self._calcular(anos, ufs, grupo)
+                    with self._trava:
+                        self.cache.guardar(chave, resposta)
+                return resposta
+            finally:
+                with self._trava:
+                    self._travas_chaves.pop(chave, None)
+
+    def _calcular(self, anos, ufs, grupo):
+        """Todas as seções da resposta consideram apenas os casos do grupo de topografia"""
+        cubo, marginais = selecionar_grupo(
+            combinar_cubos(obter_derivado(self.estado, "cubo", anos)),
+            combinar_marginais(obter_derivado(self.estado, "marginais", anos)),
+            GRUPOS[grupo]
+        )
+        tempos = obter_derivado(self.estado, "tempos", anos)
+        populacao = populacao_selecao(anos, ufs) or POPULACAO_PADRAO
+        incidencia, mortalidade, _, _ = indicadores_do_cubo(cubo, tempos, populacao, ufs, marginais)
+
+        casos = incidencia["casos_totais"]
+        obitos = mortalidade["obitos_total"]
+        resposta = {
+            "anos": sorted(anos),
+            "ufs": sorted(ufs),
+            "grupo": grupo,
+            "populacao": populacao,
+            "anos_populacao_substituidos": anos_substituidos(anos, ufs),
+            "casos": casos,
+            "obitos": obitos,
+            "letalidade": (obitos / casos) * 100 if casos > 0 else 0,
+            "incidencia": incidencia,
+            "mortalidade": mortalidade,
+            "taxas_por_uf": calcular_taxas(cubo, ufs, grupo=grupo, idades=marginais.get("idade")),
+            "taxa_padronizada_disponivel": padronizacao_disponivel()
+        }
+        return json.dumps(serializar(resposta), ensure_ascii=False, default=str).encode("utf-8")
+
+class ManipuladorIndicadores(BaseHTTPRequestHandler):
+    """Rotas: /indicadores?anos=2019,2020&ufs=SP,RJ&grupo=C43, /anos, /estatisticas e /saude"""
+
+    # Conexões persistentes, para que os clientes não reabram a conexão a cada consulta
+    protocol_version = "HTTP/1.1"
+    servico = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        try:
+            if url.path == "/indicadores":
+                self._responder(200, self.servico.consultar(parametros))
+            elif url.path == "/anos":
+                self._responder_json(200, {"anos": self.servico.anos})
+            elif url.path == "/estatisticas":
+                self._responder_json(200, self.servico.cache.estatisticas())
+            elif url.path == "/saude":
+                self._responder_json(200, {"status": "ok"})
+            else:
+                self._responder_json(404, {"erro": f"Rota não encontrada: {url.path}"})
+        except ValueError as e:
+            self._responder_json(400, {"erro": str(e)})
+        except Exception:
+            logger.exception("erro ao responder consulta", extra={"caminho": self.path})
+            self._responder_json(500, {"erro": "Erro interno ao calcular os indicadores"})
+
+    def _responder_json(self, status, dados):
+        self._responder(status, json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+
+    def _responder(self, status, corpo):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # Uma linha por requisição apenas no nível DEBUG
+        logger.debug("requisição", extra={"cliente": self.client_address[0], "linha": formato % args})
+
+def servir(diretorio, host="127.0.0.1", porta=8502, max_processos=None):
+    """Carrega os dados do diretório e atende as consultas até ser interrompido"""
+    ManipuladorIndicadores.servico = ServicoIndicadores(diretorio, max_processos)
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorIndicadores)
+    logger.info("api de indicadores iniciada", extra={"endereco": f"http://{host}:{porta}"})
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+def medir_vazao(host, porta, caminhos, requisicoes=1000, concorrencia=8):
+    """
+    Cliente de benchmark: envia as requisições (alternando entre os
+    caminhos) com conexões persistentes e mede as requisições por segundo.
+    """
+    por_cliente = [requisicoes // concorrencia + (i < requisicoes % concorrencia) for i in range(concorrencia)]
+
+    def cliente(quantidade, deslocamento):
+        conexao = http.client.HTTPConnection(host, porta)
+        erros = 0
+        for i in range(quantidade):
+            conexao.request("GET", caminhos[(i + deslocamento) % len(caminhos)])
+            resposta = conexao.getresponse()
+            resposta.read()
+            erros += resposta.status != 200
+        conexao.close()
+        return erros
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        erros = sum(executor.map(cliente, por_cliente, range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "segundos": round(duracao, 3),
+        "requisicoes_por_s": round(requisicoes / duracao, 1),
+        "erros": erros
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local com os indicadores do dashboard")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    servir_parser = subcomandos.add_parser("servir", help="carrega os dados e atende as consultas")
+    servir_parser.add_argument("diretorio", help="diretório com os arquivos anuais")
+    servir_parser.add_argument("--host", default="127.0.0.1")
+    servir_parser.add_argument("--porta", type=int, default=8502)
+    servir_parser.add_argument("--processos", type=int, default=None, help="processos usados na leitura")
+
+    vazao_parser = subcomandos.add_parser("vazao", help="mede as requisições por segundo de uma API em execução")
+    vazao_parser.add_argument("caminhos", nargs="+", help="caminhos consultados (ex.: '/indicadores?anos=2021')")
+    vazao_parser.add_argument("--host", default="127.0.0.1")
+    vazao_parser.add_argument("--porta", type=int, default=8502)
+    vazao_parser.add_argument("--requisicoes", type=int, default=1000)
+    vazao_parser.add_argument("--concorrencia", type=int, default=8)
+
+    args = parser.parse_args()
+    configurar_logging()
+    if args.comando == "servir":
+        servir(args.diretorio, args.host, args.porta, args.processos)
+    else:
+        resultado = medir_vazao(args.host, args.porta, args.caminhos, args.requisicoes, args.concorrencia)
+        print(json.dumps(resultado, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
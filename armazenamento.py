@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cubo import DIMENSOES_PELE, MARGINAIS, combinar_parciais_indicadores, indicadores_da_parcial, parciais_indicadores
+from instrumentacao import medir
+from sobrevida import COLUNAS_SOBREVIDA, calcular_sobrevida
+from tendencias import COLUNAS_TENDENCIAS, agregar_tendencias, combinar_agregados_tendencias, tendencias_do_agregado
+from topografia import mascara_grupo
+
+# Modo fora da memória: os dados de cada ano ficam em Parquet no disco
+FORA_DA_MEMORIA = os.environ.get("FORA_DA_MEMORIA", "0") == "1"
+
+# Diretório das partições (cada sessão usa um subdiretório próprio)
+DIRETORIO_PARTICOES = os.environ.get("PARTICOES_DIR", ".particoes")
+
+# Linhas por grupo no arquivo Parquet e por lote lido nas consultas
+LINHAS_POR_LOTE = int(os.environ.get("PARTICOES_LINHAS_POR_LOTE", "250000"))
+
+# Colunas lidas para calcular os indicadores pelo cubo
+COLUNAS_INDICADORES = list(dict.fromkeys(
+    ["UF", "TOPOGRAF", "GRUPO_TOPOGRAF", "DTDIAGNO", "DATAINITRT", "DATAOBITO", "IDADE"]
+    + DIMENSOES_PELE + [c for colunas in MARGINAIS.values() for c in colunas]
+))
+
+class ParticaoEmDisco:
+    """Dados de um ano gravados em Parquet, lidos em lotes apenas quando consultados"""
+
+    def __init__(self, caminho, linhas, colunas):
+        self.caminho = caminho
+        self.linhas = linhas
+        self.colunas = colunas
+
+    def __len__(self):
+        return self.linhas
+
+    def _existentes(self, colunas):
+        if colunas is None:
+            return None
+        return [c for c in colunas if c in self.colunas]
+
+    def lotes(self, colunas=None, tamanho=LINHAS_POR_LOTE):
+        """Lê o ano em lotes de até `tamanho` linhas, apenas com as colunas pedidas"""
+        arquivo = pq.ParquetFile(self.caminho)
+        for lote in arquivo.iter_batches(batch_size=tamanho, columns=self._existentes(colunas)):
+            yield pa.Table.from_batches([lote]).to_pandas()
+
+    def ler(self, colunas=None):
+        """Lê o ano inteiro (apenas com as colunas pedidas)"""
+        return pd.read_parquet(self.caminho, columns=self._existentes(colunas))
+
+def remover_diretorio(diretorio):
+    """Remove o diretório de partições de uma sessão"""
+    shutil.rmtree(diretorio, ignore_errors=True)
+
+class DiretorioSessao:
+    """
+    Subdiretório exclusivo das partições de uma sessão. É removido por
+    liberar(), quando o objeto deixa de ser referenciado (ex.: o Streamlit
+    descarta o estado de uma sessão encerrada) ou quando o processo termina.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PARTICOES):
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho = tempfile.mkdtemp(prefix="sessao_", dir=diretorio)
+        self._remover = weakref.finalize(self, remover_diretorio, self.caminho)
+
+    def liberar(self):
+        """Remove o diretório e as partições (chamadas repetidas não fazem nada)"""
+        self._remover()
+
+def _caminho_particao(diretorio, ano):
+    return os.path.join(diretorio, f"ANO={ano}", "dados.parquet")
+
+def gravar_particao(diretorio, ano, df):
+    """Grava os dados de um ano em Parquet e retorna a partição correspondente"""
+    caminho = _caminho_particao(diretorio, ano)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        try:
+            df.to_parquet(temporario, index=False, row_group_size=LINHAS_POR_LOTE)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Colunas com tipos mistos: gravar como texto, em vez de perder o ano
+            textos = {c: "string" for c in df.columns if df[c].dtype == object}
+            df.astype(textos).to_parquet(temporario, index=False, row_group_size=LINHAS_POR_LOTE)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return ParticaoEmDisco(caminho, len(df), list(df.columns))
+
+def remover_particao(diretorio, ano):
+    """Remove o arquivo de um ano"""
+    shutil.rmtree(os.path.dirname(_caminho_particao(diretorio, ano)), ignore_errors=True)
+
+class ConjuntoEmDisco:
+    """
+    Equivalente ao ConjuntoParticionado para o modo fora da memória: as
+    partições ficam no disco e as consultas percorrem os anos em lotes,
+    de modo que a memória usada não depende do total de linhas.
+    """
+
+    def __init__(self, particoes_por_ano, versao=None):
+        self.anos = sorted(particoes_por_ano)
+        self.versao = versao
+        self.particoes = dict(particoes_por_ano)
+
+    def particao(self, ano):
+        return self.particoes[ano]
+
+    def lotes(self, anos, colunas=None, tamanho=LINHAS_POR_LOTE):
+        """Percorre as linhas dos anos selecionados em lotes"""
+        for ano in sorted(a for a in set(anos) if a in self.particoes):
+            yield from self.particoes[ano].lotes(colunas, tamanho)
+
+    def selecionar(self, anos, colunas=None):
+        """
+        Lê as linhas dos anos selecionados em um único DataFrame.
+        Carrega tudo na memória: as consultas devem preferir lotes().
+        """
+        partes = [self.particoes[a].ler(colunas) for a in sorted(set(anos)) if a in self.particoes]
+        if not partes:
+            return pd.DataFrame(columns=colunas or [])
+        return pd.concat(partes, ignore_index=True)
+
+def reduzir_lotes(lotes, mapear, reduzir, argumentos=()):
+    """
+    Aplica `mapear` a cada lote e acumula os parciais com `reduzir`, que
+    recebe a lista [acumulado, novo parcial] (o acumulado começa como None).
+    """
+    parcial = None
+    for lote in lotes:
+        parcial = reduzir([parcial, mapear(lote, *argumentos)])
+    return parcial
+
+@medir("calcular_indicadores_em_disco")
+def calcular_indicadores_em_disco(conjunto, anos, populacao_total, estados_selecionados):
+    """
+    Calcula os indicadores de metricas.calcular_todos_indicadores percorrendo
+    as partições em lotes: cada lote vira um cubo de contagens e somas dos
+    intervalos, que são acumulados, e os indicadores saem do cubo final.
+    """
+    parcial = reduzir_lotes(
+        conjunto.lotes(anos, COLUNAS_INDICADORES), parciais_indicadores, combinar_parciais_indicadores
+    )
+    return indicadores_da_parcial(parcial, populacao_total, estados_selecionados)
+
+@medir("calcular_sobrevida_em_disco")
+def calcular_sobrevida_em_disco(conjunto, anos, estados_selecionados, estratificacao="tipo"):
+    """
+    Calcula as curvas de sobrevida lendo apenas as colunas necessárias e
+    guardando, de cada lote, somente os casos de câncer de pele.
+    """
+    partes = []
+    for lote in conjunto.lotes(anos, COLUNAS_SOBREVIDA):
+        if estados_selecionados and "UF" in lote.columns:
+            lote = lote[lote["UF"].isin(estados_selecionados)]
+        partes.append(lote[mascara_grupo(lote, "C43+C44")])
+    if not partes:
+        # Nenhuma linha lida: DataFrame vazio com as datas no tipo esperado
+        datas = ["DTDIAGNO", "DATAINITRT", "DATAOBITO"]
+        partes = [pd.DataFrame({
+            c: pd.Series(dtype="datetime64[ns]" if c in datas else object) for c in COLUNAS_SOBREVIDA
+        })]
+    df = pd.concat(partes, ignore_index=True)
+    return calcular_sobrevida(df, estratificacao)
+
+@medir("calcular_tendencias_em_disco")
+def calcular_tendencias_em_disco(conjunto, anos, estados_selecionados=None, populacao_total=None):
+    """Calcula as séries anuais somando os agregados de cada lote"""
+    agregado = reduzir_lotes(
+        conjunto.lotes(anos, COLUNAS_TENDENCIAS), agregar_tendencias, combinar_agregados_tendencias,
+        (estados_selecionados,)
+    )
+    return tendencias_do_agregado(agregado, estados_selecionados, populacao_total)
@@ -0,0 +1,210 @@
+import argparse
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from intervalos import INTERVALOS, calcular_intervalos
+
+# Backend usado quando nenhum é informado; configurável pelo ambiente
+BACKEND_PADRAO = os.environ.get("METRICAS_BACKEND", "pandas")
+
+# Tolerância relativa na comparação de médias entre backends (ordem de soma diferente)
+TOLERANCIA_PARIDADE = 1e-9
+
+class BackendPandas:
+    """
+    Implementação de referência das consultas dos indicadores: filtros e
+    agrupamentos diretamente no pandas.
+    """
+
+    nome = "pandas"
+
+    def contar(self, df, mascara, colunas):
+        """Conta as combinações das colunas nas linhas selecionadas pela máscara"""
+        if not colunas:
+            return pd.Series(dtype="int64")
+        return df.loc[mascara, colunas].groupby(colunas, dropna=False, observed=True).size()
+
+    def medias_intervalos(self, df, mascara):
+        """Média, em dias, de cada intervalo nas linhas selecionadas (NaN sem casos)"""
+        return calcular_intervalos(df[mascara]).mean().to_dict()
+
+class BackendDuckDB:
+    """
+    Executa as mesmas consultas no DuckDB, que lê as colunas do DataFrame
+    sem copiá-las e agrupa em paralelo, usando todos os núcleos.
+    Requer o pacote opcional duckdb.
+    """
+
+    nome = "duckdb"
+
+    def __init__(self, threads=None):
+        self.threads = threads
+        # Conexões do DuckDB não devem ser compartilhadas entre threads
+        self._local = threading.local()
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            try:
+                import duckdb
+            except ImportError:
+                raise ValueError("Para usar o backend 'duckdb' instale o pacote 'duckdb'.")
+            conexao = duckdb.connect()
+            if self.threads:
+                conexao.execute(f"SET threads TO {int(self.threads)}")
+            self._local.conexao = conexao
+        return conexao
+
+    def _consultar(self, tabela, sql):
+        conexao = self._conexao()
+        conexao.register("tabela", tabela)
+        try:
+            return conexao.execute(sql).df()
+        finally:
+            conexao.unregister("tabela")
+
+    def contar(self, df, mascara, colunas):
+        """Conta as combinações das colunas nas linhas selecionadas pela máscara"""
+        if not colunas:
+            return pd.Series(dtype="int64")
+        tabela = pd.DataFrame({c: df[c] for c in colunas}, copy=False)
+        tabela["_SELECIONADA"] = np.asarray(mascara, dtype=bool)
+        nomes = ", ".join(f'"{c}"' for c in colunas)
+        resultado = self._consultar(
+            tabela, f'SELECT {nomes}, count(*) AS "_CASOS" FROM tabela WHERE "_SELECIONADA" GROUP BY {nomes}'
+        )
+        # Mesmo tipo das colunas de origem e mesma ordem do groupby do pandas
+        for coluna in colunas:
+            tipo = df[coluna].dtype
+            serie = resultado[coluna]
+            if isinstance(tipo, pd.CategoricalDtype):
+                serie = serie.astype(object)
+            resultado[coluna] = serie.astype(tipo)
+        contagens = resultado.set_index(colunas)["_CASOS"].astype("int64").sort_index()
+        return contagens.rename(None)
+
+    def medias_intervalos(self, df, mascara):
+        """Média, em dias, de cada intervalo nas linhas selecionadas (NaN sem casos)"""
+        medias = {}
+        expressoes = []
+        datas = {}
+        for nome, (inicio, fim) in INTERVALOS.items():
+            if inicio not in df.columns or fim not in df.columns:
+                medias[nome] = np.nan
+                continue
+            datas[inicio] = df[inicio]
+            datas[fim] = df[fim]
+            # Intervalos negativos são descartados, como na referência
+            dias = f'date_diff(\'day\', CAST("{inicio}" AS DATE), CAST("{fim}" AS DATE))'
+            expressoes.append(f'avg({dias}) FILTER (WHERE {dias} >= 0) AS "{nome}"')
+        if not expressoes:
+            return medias
+        tabela = pd.DataFrame(datas, copy=False)
+        tabela["_SELECIONADA"] = np.asarray(mascara, dtype=bool)
+        resultado = self._consultar(
+            tabela, f'SELECT {", ".join(expressoes)} FROM tabela WHERE "_SELECIONADA"'
+        )
+        for nome in resultado.columns:
+            valor = resultado.at[0, nome]
+            medias[nome] = np.nan if pd.isna(valor) else float(valor)
+        return medias
+
+# Backends disponíveis, por nome
+BACKENDS = {
+    "pandas": BackendPandas(),
+    "duckdb": BackendDuckDB()
+}
+
+def registrar_backend(backend):
+    """Registra um backend (objeto com os métodos contar e medias_intervalos)"""
+    BACKENDS[backend.nome] = backend
+
+def obter_backend(backend=None):
+    """Retorna o backend pelo nome (ou o próprio objeto); por padrão, BACKEND_PADRAO"""
+    if backend is None:
+        backend = BACKEND_PADRAO
+    if not isinstance(backend, str):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (disponíveis: {', '.join(BACKENDS)})")
+    return BACKENDS[backend]
+
+def _normalizar(valor):
+    """Converte os resultados em dicionários e listas comparáveis"""
+    if isinstance(valor, pd.Series):
+        return {str(k): _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, dict):
+        return {str(k): _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, (np.integer, np.floating)):
+        return valor.item()
+    return valor
+
+def _diferencas(esperado, obtido, caminho=""):
+    """Lista as diferenças entre dois resultados normalizados"""
+    if isinstance(esperado, dict) and isinstance(obtido, dict):
+        diferencas = []
+        for chave in sorted(set(esperado) | set(obtido)):
+            if chave not in obtido or chave not in esperado:
+                diferencas.append(f"{caminho}/{chave}: presente em apenas um backend")
+            else:
+                diferencas += _diferencas(esperado[chave], obtido[chave], f"{caminho}/{chave}")
+        return diferencas
+    if isinstance(esperado, float) or isinstance(obtido, float):
+        if isinstance(esperado, (int, float)) and isinstance(obtido, (int, float)):
+            if (math.isnan(esperado) and math.isnan(obtido)) or math.isclose(
+                esperado, obtido, rel_tol=TOLERANCIA_PARIDADE, abs_tol=0.0
+            ):
+                return []
+    elif esperado == obtido:
+        return []
+    return [f"{caminho}: {esperado!r} != {obtido!r}"]
+
+def verificar_paridade(df, populacao_total, estados_selecionados=None, backends=("pandas", "duckdb")):
+    """
+    Calcula os indicadores com cada backend e compara com o primeiro
+    (a referência). Contagens devem ser idênticas; médias podem diferir
+    apenas pela ordem da soma (TOLERANCIA_PARIDADE).
+    Retorna a lista de diferenças (vazia quando há paridade).
+    """
+    # Importado aqui porque metricas depende deste módulo
+    from metricas import calcular_todos_indicadores
+
+    referencia, *outros = backends
+    esperado = _normalizar(calcular_todos_indicadores(df, populacao_total, estados_selecionados, referencia))
+    diferencas = []
+    for backend in outros:
+        obtido = _normalizar(calcular_todos_indicadores(df, populacao_total, estados_selecionados, backend))
+        diferencas += [f"{backend}{d}" for d in _diferencas(esperado, obtido)]
+    return diferencas
+
+def main():
+    from dados_sinteticos import gerar_dataframe
+    from utils import processar_dataframe
+
+    parser = argparse.ArgumentParser(description="Verifica se os backends calculam os mesmos indicadores")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=["pandas", "duckdb"])
+    args = parser.parse_args()
+
+    falhas = 0
+    for linhas in args.linhas:
+        df = processar_dataframe(gerar_dataframe(linhas, 2021, args.semente))
+        for estados in ([], ["SP"], ["SP", "RJ", "MG"]):
+            diferencas = verificar_paridade(df, 211000000, estados, args.backends)
+            situacao = "ok" if not diferencas else f"{len(diferencas)} diferenças"
+            print(f"{linhas:>10} linhas, estados={estados or 'todos'}: {situacao}")
+            for diferenca in diferencas[:20]:
+                print(f"    {diferenca}")
+            falhas += bool(diferencas)
+    sys.exit(1 if falhas else 0)
+
+if __name__ == "__main__":
+    main()
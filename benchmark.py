@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from backends import BACKENDS
+from cache_figuras import figura_em_cache
+from cubo import combinar_marginais, construir_cubo, construir_marginais, indicadores_do_cubo, resumir_tempos
+from dados_sinteticos import MAX_LINHAS_EXCEL, gerar_dataframe
+from leitores import obter_leitor
+from metricas import (
+    calcular_indicadores_incidencia,
+    calcular_indicadores_mortalidade,
+    calcular_perfil_demografico,
+    calcular_tempos_medios,
+    calcular_todos_indicadores
+)
+from sobrevida import calcular_sobrevida
+from tendencias import calcular_tendencias
+from utils import processar_dataframe
+from visualizations import (
+    criar_grafico_barras,
+    criar_grafico_linha,
+    criar_grafico_pizza,
+    criar_grafico_sobrevida,
+    gerar_pdf
+)
+
+try:
+    import resource
+except ImportError:
+    # Windows: o pico de memória do processo não é registrado
+    resource = None
+
+# Tamanhos padrão das bases sintéticas (linhas)
+TAMANHOS_PADRAO = [10000, 100000, 1000000]
+
+# Planilhas maiores que isto não são geradas (a escrita de .xlsx é muito lenta)
+MAX_LINHAS_PLANILHA_PADRAO = 100000
+
+# População usada nos indicadores, como no dashboard
+POPULACAO_PADRAO = 211000000
+
+def _cronometrar(funcao, repeticoes):
+    """Executa a função repetidas vezes e retorna (duração de cada execução, último resultado)"""
+    duracoes = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracoes.append(time.perf_counter() - inicio)
+    return duracoes, resultado
+
+def _medir_pico(funcao):
+    """Executa a função mais uma vez e retorna o pico de memória alocada (MB) registrado pelo tracemalloc"""
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / 2 ** 20, 3)
+
+def pico_rss_mb():
+    """Maior memória residente do processo até agora (MB), ou None se indisponível"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return round(pico / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 3)
+
+def _registro(etapa, linhas, duracoes=None, erro=None, pico_memoria_mb=None):
+    """Resultado de uma etapa no formato gravado em JSON"""
+    registro = {"etapa": etapa, "linhas": linhas}
+    if erro is not None:
+        registro["erro"] = erro
+        return registro
+    mediana = statistics.median(duracoes)
+    registro.update({
+        "repeticoes": len(duracoes),
+        "mediana_s": round(mediana, 6),
+        "minimo_s": round(min(duracoes), 6),
+        "maximo_s": round(max(duracoes), 6),
+        "linhas_por_s": round(linhas / mediana) if mediana > 0 else None,
+        "pico_memoria_mb": pico_memoria_mb
+    })
+    return registro
+
+def executar_etapa(resultados, etapa, linhas, funcao, repeticoes, memoria=True):
+    """
+    Mede uma etapa e guarda o resultado; falhas são registradas sem
+    interromper a suíte. Com `memoria`, a etapa é executada mais uma vez,
+    fora da medição de tempo, para registrar o pico de memória alocada.
+    """
+    try:
+        duracoes, valor = _cronometrar(funcao, repeticoes)
+        pico = _medir_pico(funcao) if memoria else None
+    except Exception as e:
+        resultados.append(_registro(etapa, linhas, erro=f"{type(e).__name__}: {e}"))
+        return None
+    resultados.append(_registro(etapa, linhas, duracoes, pico_memoria_mb=pico))
+    return valor
+
+def _registro_compactacao(df, linhas):
+    """Memória do DataFrame antes e depois de utils.compactar_dataframe (relatório de processar_dataframe)"""
+    relatorio = df.attrs.get("memoria", {})
+    return {
+        "etapa": "compactar_dataframe",
+        "linhas": linhas,
+        "memoria_antes_mb": round(relatorio.get("bytes_por_linha_antes", 0) * len(df) / 2 ** 20, 3),
+        "memoria_depois_mb": round(relatorio.get("bytes_por_linha_depois", 0) * len(df) / 2 ** 20, 3)
+    }
+
+def executar_tamanho(linhas, repeticoes=3, semente=0, max_linhas_planilha=MAX_LINHAS_PLANILHA_PADRAO, pdf=True,
+                     memoria=True):
+    """Executa todas as etapas da suíte para uma base sintética com o número de linhas informado"""
+    resultados = []
+    bruto = executar_etapa(
+        resultados, "gerar_dados", linhas, lambda: gerar_dataframe(linhas, 2021, semente), 1, memoria=False
+    )
+    if bruto is None:
+        # Sem a base sintética não há o que medir nas demais etapas
+        return resultados
+
+    # Ingestão: leitura dos formatos aceitos pelo upload
+    arquivos = {"csv": bruto.to_csv(index=False, sep=";").encode("utf-8")}
+    if linhas <= min(max_linhas_planilha, MAX_LINHAS_EXCEL):
+        planilha = BytesIO()
+        bruto.to_excel(planilha, index=False)
+        arquivos["xlsx"] = planilha.getvalue()
+    for extensao, conteudo in arquivos.items():
+        leitor = obter_leitor(f"RHC_2021.{extensao}")
+        executar_etapa(
+            resultados, f"leitura_{extensao}", linhas,
+            lambda: leitor(BytesIO(conteudo)), repeticoes, memoria
+        )
+
+    df = executar_etapa(
+        resultados, "processar_dataframe", linhas,
+        lambda: processar_dataframe(bruto.copy()), repeticoes, memoria
+    )
+    if df is not None:
+        resultados.append(_registro_compactacao(df, linhas))
+
+    # Indicadores: funções de referência, passagem única e cubo
+    executar_etapa(resultados, "calcular_indicadores_incidencia", linhas,
+                   lambda: calcular_indicadores_incidencia(df, POPULACAO_PADRAO, []), repeticoes, memoria)
+    executar_etapa(resultados, "calcular_indicadores_mortalidade", linhas,
+                   lambda: calcular_indicadores_mortalidade(df, []), repeticoes, memoria)
+    executar_etapa(resultados, "calcular_tempos_medios", linhas,
+                   lambda: calcular_tempos_medios(df), repeticoes, memoria)
+    perfil = executar_etapa(resultados, "calcular_perfil_demografico", linhas,
+                            lambda: calcular_perfil_demografico(df), repeticoes, memoria)
+    for backend in BACKENDS:
+        executar_etapa(resultados, f"calcular_todos_indicadores.{backend}", linhas,
+                       lambda: calcular_todos_indicadores(df, POPULACAO_PADRAO, [], backend), repeticoes, memoria)
+    cubo = executar_etapa(resultados, "construir_cubo", linhas,
+                          lambda: construir_cubo(df).assign(ANO=2021), repeticoes, memoria)
+    marginais = executar_etapa(resultados, "construir_marginais", linhas,
+                               lambda: combinar_marginais({2021: construir_marginais(df)}), repeticoes, memoria)
+    tempos = {2021: resumir_tempos(df)}
+    executar_etapa(resultados, "indicadores_do_cubo", linhas,
+                   lambda: indicadores_do_cubo(cubo, tempos, POPULACAO_PADRAO, [], marginais), repeticoes, memoria)
+    tendencias = executar_etapa(resultados, "calcular_tendencias", linhas,
+                                lambda: calcular_tendencias(df, [], POPULACAO_PADRAO), repeticoes, memoria)
+    sobrevida = executar_etapa(resultados, "calcular_sobrevida", linhas,
+                               lambda: calcular_sobrevida(df, "tipo"), repeticoes, memoria)
+
+    # Construção das figuras
+    figuras = []
+    if perfil is not None:
+        figuras.append(executar_etapa(
+            resultados, "figura.criar_grafico_pizza", linhas,
+            lambda: criar_grafico_pizza(perfil["raca"], "RACACOR", "Distribuição por Raça/Cor"), repeticoes, memoria
+        ))
+        figuras.append(executar_etapa(
+            resultados, "figura.criar_grafico_barras", linhas,
+            lambda: criar_grafico_barras(perfil["idade"], "IDADE", 0, "Distribuição por Idade"), repeticoes, memoria
+        ))
+        # Mesma figura pelo cache (a primeira repetição constrói, as demais reaproveitam a figura)
+        executar_etapa(
+            resultados, "figura_em_cache.criar_grafico_barras", linhas,
+            lambda: figura_em_cache(criar_grafico_barras, perfil["idade"], "IDADE", 0, "Distribuição por Idade"),
+            repeticoes, memoria
+        )
+    if tendencias is not None:
+        figuras.append(executar_etapa(
+            resultados, "figura.criar_grafico_linha", linhas,
+            lambda: criar_grafico_linha(tendencias.reset_index(), "ANO", ["casos_pele", "obitos_pele"], "Tendências"),
+            repeticoes, memoria
+        ))
+    if sobrevida is not None:
+        figuras.append(executar_etapa(
+            resultados, "figura.criar_grafico_sobrevida", linhas,
+            lambda: criar_grafico_sobrevida(sobrevida[0], "Curvas de sobrevida"), repeticoes, memoria
+        ))
+
+    # Relatório em PDF (a exportação das figuras depende do kaleido)
+    figuras = [f for f in figuras if f is not None]
+    if pdf and figuras:
+        executar_etapa(
+            resultados, "gerar_pdf", linhas,
+            lambda: gerar_pdf(figuras, [f"Figura {i + 1}" for i in range(len(figuras))], {"linhas": linhas}, 2021),
+            1, memoria
+        )
+    resultados.append({"etapa": "processo", "linhas": linhas, "pico_rss_mb": pico_rss_mb()})
+    return resultados
+
+def ambiente():
+    """Informações da máquina e das bibliotecas, gravadas junto com os resultados"""
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "processadores": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__
+    }
+
+def _resumo(registro):
+    """Tempo e memória de um registro, para a saída no terminal"""
+    if "erro" in registro:
+        return f"erro: {registro['erro']}"
+    if "memoria_antes_mb" in registro:
+        return f"{registro['memoria_antes_mb']:.1f} MB -> {registro['memoria_depois_mb']:.1f} MB"
+    if "pico_rss_mb" in registro:
+        return f"pico RSS {registro['pico_rss_mb']} MB"
+    resumo = f"{registro['mediana_s']:.4f} s"
+    if registro.get("pico_memoria_mb") is not None:
+        resumo += f"  pico {registro['pico_memoria_mb']:.1f} MB"
+    return resumo
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o desempenho do dashboard com bases sintéticas do RHC")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="tamanhos das bases sintéticas (de 10 mil a 10 milhões de linhas)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada etapa (vale a mediana)")
+    parser.add_argument("--semente", type=int, default=0, help="semente da geração dos dados")
+    parser.add_argument("--max-linhas-planilha", type=int, default=MAX_LINHAS_PLANILHA_PADRAO,
+                        help="maior base gravada também como .xlsx")
+    parser.add_argument("--sem-pdf", action="store_true", help="não medir a geração do PDF")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="não executar cada etapa mais uma vez para medir o pico de memória")
+    parser.add_argument("--saida", default="benchmark.json", help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    for linhas in args.linhas:
+        parciais = executar_tamanho(
+            linhas, args.repeticoes, args.semente, args.max_linhas_planilha, not args.sem_pdf, not args.sem_memoria
+        )
+        for registro in parciais:
+            print(f"{linhas:>10} {registro['etapa']:<40} {_resumo(registro)}")
+        resultados.extend(parciais)
+
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump({"ambiente": ambiente(), "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import hashlib
+import os
+
+import pandas as pd
+
+# Diretório e limite de tamanho do cache em disco
+DIRETORIO_CACHE = os.environ.get("CACHE_DADOS_DIR", ".cache_dados")
+LIMITE_CACHE_BYTES = int(os.environ.get("CACHE_DADOS_LIMITE_MB", "2048")) * 1024 * 1024
+
+# Alterar sempre que processar_dataframe mudar o formato da saída
+VERSAO_CACHE = 5
+
+def chave_arquivo(conteudo):
+    """Gera a chave do cache a partir do conteúdo do arquivo"""
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+    return f"v{VERSAO_CACHE}_{hash_conteudo}"
+
+def _caminho(chave):
+    return os.path.join(DIRETORIO_CACHE, f"{chave}.parquet")
+
+def carregar_do_cache(chave):
+    """Retorna o DataFrame armazenado para a chave ou None se não existir"""
+    caminho = _caminho(chave)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        df = pd.read_parquet(caminho)
+    except Exception:
+        # Entrada corrompida: descartar e reprocessar o arquivo
+        _remover(caminho)
+        return None
+    # Atualizar o horário de acesso para a política LRU
+    os.utime(caminho, None)
+    return df
+
+def salvar_no_cache(chave, df):
+    """Armazena o DataFrame processado em formato Parquet"""
+    os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+    caminho = _caminho(chave)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+    except Exception:
+        # Colunas com tipos mistos não são suportadas pelo Parquet: não armazenar
+        _remover(temporario)
+        return False
+    aplicar_limite_cache()
+    return True
+
+def aplicar_limite_cache(limite_bytes=None):
+    """Remove as entradas menos usadas até o cache caber no limite"""
+    limite_bytes = LIMITE_CACHE_BYTES if limite_bytes is None else limite_bytes
+    if not os.path.isdir(DIRETORIO_CACHE):
+        return
+
+    entradas = []
+    for nome in os.listdir(DIRETORIO_CACHE):
+        if not nome.endswith(".parquet"):
+            continue
+        caminho = os.path.join(DIRETORIO_CACHE, nome)
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite_bytes:
+            break
+        _remover(caminho)
+        total -= tamanho
+
+def limpar_cache():
+    """Remove todas as entradas do cache"""
+    aplicar_limite_cache(0)
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,53 @@
+import hashlib
+import threading
+
+import pandas as pd
+
+from memoizacao import CacheLRU
+
+# Quantidade de figuras mantidas em cache, compartilhadas por todas as sessões
+MAX_FIGURAS_CACHE = 128
+
+_cache = CacheLRU(MAX_FIGURAS_CACHE)
+_trava = threading.Lock()
+
+def hash_dados(dados):
+    """Resumo (SHA-1) dos valores, da ordem, dos tipos e dos nomes de uma série ou tabela agregada"""
+    resumo = hashlib.sha1()
+    if isinstance(dados, (pd.Series, pd.DataFrame)):
+        try:
+            resumo.update(pd.util.hash_pandas_object(dados, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Valores não suportados pelo hash do pandas (ex.: listas)
+            resumo.update(dados.to_json(default_handler=str).encode("utf-8"))
+        if isinstance(dados, pd.Series):
+            descricao = (dados.name, str(dados.dtype))
+        else:
+            descricao = (tuple(dados.columns), tuple(str(t) for t in dados.dtypes))
+        resumo.update(repr((type(dados).__name__, descricao, tuple(dados.index.names))).encode("utf-8"))
+    else:
+        resumo.update(repr(dados).encode("utf-8"))
+    return resumo.hexdigest()
+
+def _chave_parametro(parametro):
+    """Parâmetros em lista (ex.: estados selecionados) viram tuplas, para compor a chave"""
+    return tuple(parametro) if isinstance(parametro, list) else parametro
+
+def figura_em_cache(criar, dados, *parametros):
+    """
+    Retorna a figura criada por criar(dados, *parametros). A figura só é
+    construída quando a função, os dados e os parâmetros mudam; o mesmo
+    objeto é devolvido a todas as sessões e deve ser tratado como somente
+    leitura (ex.: apenas passado a st.plotly_chart).
+    """
+    chave = (criar.__name__, hash_dados(dados), tuple(_chave_parametro(p) for p in parametros))
+    with _trava:
+        return _cache.obter(chave, lambda: criar(dados, *parametros))
+
+def estatisticas_figuras():
+    with _trava:
+        return _cache.estatisticas()
+
+def limpar_figuras():
+    with _trava:
+        _cache.limpar()
@@ -1,23 +1,50 @@
 import streamlit as st
-import pandas as pd
 from streamlit_lottie import st_lottie
 import time
 
 # Importar módulos personalizados
-from utils import extrair_ano_do_arquivo, processar_dataframe
-from metricas import (
-    calcular_indicadores_incidencia,
-    calcular_indicadores_mortalidade,
-    calcular_tempos_medios,
-    calcular_perfil_demografico
+from instrumentacao import configurar_logging, iniciar_execucao, registros_execucao, resumir_execucao
+from utils import extrair_ano_do_arquivo
+from ingestao import ler_arquivo, processar_em_paralelo
+from particoes import (
+    definir_ano,
+    inicializar_estado,
+    liberar_disco,
+    obter_conjunto,
+    obter_derivado,
+    registrar_derivado,
+    remover_ano,
+    usar_disco,
+    versao_dos_dados
 )
+from armazenamento import (
+    FORA_DA_MEMORIA,
+    ConjuntoEmDisco,
+    calcular_sobrevida_em_disco,
+    calcular_tendencias_em_disco
+)
+from mapa_reducao import MAPA_REDUCAO, calcular_tendencias_paralelo
+from memoizacao import CacheLRU, chave_indicadores, contem_ano
+from cache_figuras import estatisticas_figuras
+from populacao import anos_substituidos, calcular_taxas, padronizacao_disponivel, populacao_selecao
+from cubo import combinar_cubos, combinar_marginais, construir_cubo, construir_marginais, indicadores_do_cubo, resumir_tempos
+from sobrevida import calcular_sobrevida
+from quantis import esbocos_intervalos, resumir_esbocos
+from tendencias import calcular_tendencias
 from styles import aplicar_estilos
-from componentes import mostrar_sidebar, mostrar_header, mostrar_secao_upload
+from componentes import (
+    mostrar_sidebar,
+    mostrar_header,
+    mostrar_secao_upload,
+    mostrar_gerenciamento_anos,
+    mostrar_painel_depuracao
+)
 from tabs import (
     mostrar_tab_incidencia,
     mostrar_tab_mortalidade,
     mostrar_tab_tempos,
-    mostrar_tab_perfil
+    mostrar_tab_perfil,
+    mostrar_tab_tendencias
 )
 
 # Configuração da página
@@ -36,42 +63,185 @@ st.set_page_config(
 # Aplicar estilos personalizados
 aplicar_estilos()
 
+# Logs estruturados (JSON) e medição das etapas desta execução do script
+configurar_logging()
+iniciar_execucao()
+
 # Inicializar estado da sessão se necessário
 if 'dados_carregados' not in st.session_state:
     st.session_state.dados_carregados = False
     st.session_state.dados_por_ano = {}
     st.session_state.anos_disponiveis = []
     st.session_state.dados_atuais = {}
+inicializar_estado(st.session_state)
+if 'cache_indicadores' not in st.session_state:
+    st.session_state.cache_indicadores = CacheLRU()
+
+# Agregados pré-calculados para cada ano na ingestão
+registrar_derivado("cubo", construir_cubo)
+registrar_derivado("marginais", construir_marginais)
+registrar_derivado("tempos", resumir_tempos)
+registrar_derivado("esbocos", esbocos_intervalos)
+
+# Avisar quando o mapeamento não encontrar alguma coluna padrão
+def avisar_colunas_ausentes(nome_arquivo, df):
+    colunas_ausentes = df.attrs.get("mapeamento", {}).get("colunas_ausentes", [])
+    if colunas_ausentes:
+        st.warning(f"Arquivo {nome_arquivo}: colunas não encontradas: {', '.join(colunas_ausentes)}")
 
 # Função para processar os arquivos enviados
-def processar_arquivos(uploaded_files):
+def processar_arquivos(uploaded_files, paralelo=None):
     """Processa os arquivos carregados"""
-    dados_por_ano = {}
-    anos_disponiveis = []
+    estado = {}
+    inicializar_estado(estado)
+    if FORA_DA_MEMORIA:
+        usar_disco(estado)
+    
+    # Por padrão, usar o modo paralelo quando houver mais de um arquivo;
+    # fora da memória, ler um ano por vez para que só ele fique na memória
+    if paralelo is None:
+        paralelo = len(uploaded_files) > 1 and not FORA_DA_MEMORIA
     
-    for file in uploaded_files:
-        ano = extrair_ano_do_arquivo(file.name)
-        if ano:
-            try:
-                df = pd.read_excel(file)
-                df = processar_dataframe(df)
-                dados_por_ano[ano] = df
-                anos_disponiveis.append(ano)
-            except Exception as e:
-                st.error(f"Erro ao processar arquivo {file.name}: {e}")
+    if paralelo:
+        arquivos = [(file.name, file.getvalue()) for file in uploaded_files]
+        for nome_arquivo, ano, df, erro in processar_em_paralelo(arquivos):
+            if erro:
+                st.error(f"Erro ao processar arquivo {nome_arquivo}: {erro}")
                 continue
+            avisar_colunas_ausentes(nome_arquivo, df)
+            definir_ano(estado, ano, df)
+    else:
+        for file in uploaded_files:
+            ano = extrair_ano_do_arquivo(file.name)
+            if ano:
+                try:
+                    df = ler_arquivo(file.name, file.getvalue())
+                    avisar_colunas_ausentes(file.name, df)
+                    definir_ano(estado, ano, df)
+                except Exception as e:
+                    st.error(f"Erro ao processar arquivo {file.name}: {e}")
+                    continue
     
-    if not anos_disponiveis:
+    if not estado["anos_disponiveis"]:
+        liberar_disco(estado)
         st.warning("Não foi possível identificar o ano nos nomes dos arquivos.")
         return False
     
-    anos_disponiveis.sort()
+    # Novo envio: descartar as partições em disco dos dados anteriores
+    liberar_disco(st.session_state)
     st.session_state.dados_carregados = True
-    st.session_state.dados_por_ano = dados_por_ano
-    st.session_state.anos_disponiveis = anos_disponiveis
+    for chave, valor in estado.items():
+        st.session_state[chave] = valor
+    st.session_state.cache_indicadores.limpar()
     
+    # Conjunto com os DataFrames de todos os anos (sem cópia)
+    obter_conjunto(st.session_state)
+    
+    # A ingestão termina com um rerun; guardar as medições para o painel de depuração
+    st.session_state.etapas_ingestao = registros_execucao()
+    return True
+
+# Função para adicionar ou substituir um único ano já carregado
+def processar_arquivo_ano(file):
+    """Processa apenas o arquivo enviado, sem reprocessar os demais anos"""
+    ano = extrair_ano_do_arquivo(file.name)
+    if not ano:
+        st.warning(f"Não foi possível identificar o ano no nome do arquivo {file.name}.")
+        return False
+    try:
+        df = ler_arquivo(file.name, file.getvalue())
+    except Exception as e:
+        st.error(f"Erro ao processar arquivo {file.name}: {e}")
+        return False
+    avisar_colunas_ausentes(file.name, df)
+    definir_ano(st.session_state, ano, df)
+    st.session_state.cache_indicadores.invalidar(contem_ano(ano))
+    obter_conjunto(st.session_state)
+    st.session_state.etapas_ingestao = registros_execucao()
+    return True
+
+# Função para remover um único ano dos dados carregados
+def remover_dados_ano(ano):
+    remover_ano(st.session_state, ano)
+    st.session_state.cache_indicadores.invalidar(contem_ano(ano))
+    obter_conjunto(st.session_state)
+    if not st.session_state.anos_disponiveis:
+        liberar_disco(st.session_state)
+        st.session_state.dados_carregados = False
     return True
 
+# Função para calcular os indicadores da seleção atual, com cache
+def calcular_indicadores_selecao(anos_selecionados, estados_selecionados, populacao_total):
+    """Calcula os indicadores a partir dos cubos dos anos selecionados"""
+    def calcular():
+        cubo = combinar_cubos(obter_derivado(st.session_state, "cubo", anos_selecionados))
+        tempos_por_ano = obter_derivado(st.session_state, "tempos", anos_selecionados)
+        # População dos estados e anos selecionados; valor padrão se a tabela não cobrir a seleção
+        populacao = populacao_selecao(anos_selecionados, estados_selecionados) or populacao_total
+        marginais = combinar_marginais(obter_derivado(st.session_state, "marginais", anos_selecionados))
+        indicadores = indicadores_do_cubo(cubo, tempos_por_ano, populacao, estados_selecionados, marginais)
+        indicadores[0]["populacao"] = populacao
+        indicadores[0]["taxas_por_estado"] = calcular_taxas(cubo, estados_selecionados, idades=marginais.get("idade"))
+        indicadores[0]["anos_populacao_substituidos"] = anos_substituidos(anos_selecionados, estados_selecionados)
+        indicadores[0]["padronizacao_disponivel"] = padronizacao_disponivel()
+        # Mediana e percentis dos intervalos a partir dos esboços de cada ano e estado
+        indicadores[2]["distribuicao"] = resumir_esbocos(
+            obter_derivado(st.session_state, "esbocos", anos_selecionados),
+            estados_selecionados
+        )
+        return indicadores
+    
+    chave = chave_indicadores(
+        versao_dos_dados(st.session_state, anos_selecionados),
+        anos_selecionados,
+        estados_selecionados,
+        populacao_total
+    )
+    return st.session_state.cache_indicadores.obter(chave, calcular)
+
+# Função para calcular as curvas de sobrevida da seleção atual, com cache
+def calcular_sobrevida_selecao(anos_selecionados, estados_selecionados, estratificacao):
+    """Calcula as curvas de Kaplan-Meier dos anos e estados selecionados"""
+    def calcular():
+        conjunto = obter_conjunto(st.session_state)
+        if isinstance(conjunto, ConjuntoEmDisco):
+            return calcular_sobrevida_em_disco(conjunto, anos_selecionados, estados_selecionados, estratificacao)
+        df = conjunto.selecionar(anos_selecionados)
+        if estados_selecionados:
+            df = df[df["UF"].isin(estados_selecionados)]
+        return calcular_sobrevida(df, estratificacao)
+
+    chave = chave_indicadores(
+        versao_dos_dados(st.session_state, anos_selecionados),
+        anos_selecionados,
+        estados_selecionados,
+        "sobrevida",
+        estratificacao
+    )
+    return st.session_state.cache_indicadores.obter(chave, calcular)
+
+# Função para calcular as séries anuais dos indicadores da seleção atual, com cache
+def calcular_tendencias_selecao(anos_selecionados, estados_selecionados, populacao_total):
+    """Calcula as séries anuais de todos os indicadores em uma única agregação"""
+    def calcular():
+        conjunto = obter_conjunto(st.session_state)
+        # Vários anos: agregar cada ano em um processo e somar os agregados
+        if MAPA_REDUCAO and len(anos_selecionados) > 1:
+            return calcular_tendencias_paralelo(conjunto, anos_selecionados, estados_selecionados, populacao_total)
+        if isinstance(conjunto, ConjuntoEmDisco):
+            return calcular_tendencias_em_disco(conjunto, anos_selecionados, estados_selecionados, populacao_total)
+        df = conjunto.selecionar(anos_selecionados)
+        return calcular_tendencias(df, estados_selecionados, populacao_total)
+
+    chave = chave_indicadores(
+        versao_dos_dados(st.session_state, anos_selecionados),
+        anos_selecionados,
+        estados_selecionados,
+        "tendencias",
+        populacao_total
+    )
+    return st.session_state.cache_indicadores.obter(chave, calcular)
+
 def main():
     """Função principal do dashboard"""
     mostrar_header()
@@ -97,6 +267,10 @@ def main():
             st.rerun()
         return
     
+    # Adicionar, substituir ou remover anos individualmente
+    if mostrar_gerenciamento_anos(st.session_state.anos_disponiveis, processar_arquivo_ano, remover_dados_ano):
+        st.rerun()
+    
     # Mostrar sidebar e obter seleção de ano e estado
     anos_selecionados, estados_selecionados = mostrar_sidebar(
         st.session_state.dados_por_ano,
@@ -104,27 +278,26 @@ def main():
         estados_disponiveis=["SP", "RJ", "MG"]  # Exemplo de estados disponíveis
     )
 
-    # Obter dados dos anos selecionados
-    if anos_selecionados:
-        dfs_selecionados = [st.session_state.dados_por_ano[ano] for ano in anos_selecionados]
-        df = pd.concat(dfs_selecionados)
-    else:
+    if not anos_selecionados:
         st.warning("Nenhum ano foi selecionado. Por favor, selecione pelo menos um ano.")
         return
     
-    # Calcular indicadores
-    indicadores_incidencia = calcular_indicadores_incidencia(df, 211000000, estados_selecionados)  # valor padrão
-    indicadores_mortalidade = calcular_indicadores_mortalidade(df, estados_selecionados)
-    indicadores_tempos = calcular_tempos_medios(df)
-    indicadores_perfil = calcular_perfil_demografico(df)
+    # Calcular indicadores (reaproveitados entre execuções com os mesmos filtros)
+    (
+        indicadores_incidencia,
+        indicadores_mortalidade,
+        indicadores_tempos,
+        indicadores_perfil
+    ) = calcular_indicadores_selecao(anos_selecionados, estados_selecionados, 211000000)  # valor padrão
     
     # Criar abas na ordem correta
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "Incidência",
         "Mortalidade",
         "Letalidade",
         "Perfil",
-        "Tempo"
+        "Tempo",
+        "Tendências"
     ])
     # Conteúdo das abas
     with tab1:
@@ -138,7 +311,25 @@ def main():
         mostrar_tab_perfil(indicadores_perfil)
     with tab5:
         from tabs import mostrar_tab_tempos
-        mostrar_tab_tempos(indicadores_tempos)
+        mostrar_tab_tempos(
+            indicadores_tempos,
+            lambda estratificacao: calcular_sobrevida_selecao(
+                anos_selecionados, estados_selecionados, estratificacao
+            )
+        )
+    with tab6:
+        mostrar_tab_tendencias(
+            calcular_tendencias_selecao(anos_selecionados, estados_selecionados, 211000000)
+        )
+    
+    # Etapas mais lentas desta execução
+    mostrar_painel_depuracao(
+        registros_execucao(),
+        st.session_state.get("etapas_ingestao"),
+        st.session_state.cache_indicadores.estatisticas(),
+        estatisticas_figuras=estatisticas_figuras()
+    )
+    resumir_execucao()
     # Rodapé sempre visível (apenas texto)
     st.markdown("""
     <div style="text-align: center; opacity: 0.7; padding: 20px;">
@@ -147,12 +338,6 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-# Função para redefinir os dados (resetar a aplicação)
-def resetar_aplicacao():
-    for key in ['dados_carregados', 'dados_por_ano', 'anos_disponiveis', 'dados_atuais']:
-        if key in st.session_state:
-            del st.session_state[key]
-
 # Executar a aplicação
 if __name__ == "__main__":
     main()
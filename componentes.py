@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils import get_sexo_map, get_raca_map, calcular_metricas_basicas, calcular_tempos_medios, calcular_diferenca
+from utils import get_sexo_map, get_raca_map, calcular_metricas_basicas, calcular_tempos_medios
+from intervalos import calcular_tempos
+from instrumentacao import etapas_mais_lentas
 from visualizations import (
     criar_grafico_pizza, criar_grafico_barras, criar_grafico_linha, criar_mapa_calor,
     criar_grafico_combinado_idade_sexo, criar_card_estatistico
@@ -59,6 +61,52 @@ def mostrar_sidebar(dados_por_ano, anos_disponiveis, estados_disponiveis):
         )
     return anos_selecionados, estados_selecionados
 
+def mostrar_gerenciamento_anos(anos_disponiveis, callback_adicionar, callback_remover):
+    """Permite adicionar, substituir ou remover um ano sem recarregar os demais"""
+    alterado = False
+    with st.sidebar.expander("Gerenciar anos carregados"):
+        arquivo = st.file_uploader(
+            "Adicionar ou substituir um ano",
+            type=["xlsx", "csv", "dbf", "dbc"],
+            accept_multiple_files=False,
+            key="arquivo_ano"
+        )
+        if st.button("Adicionar/substituir", key="adicionar-ano"):
+            if arquivo:
+                with st.spinner(f"Processando {arquivo.name}..."):
+                    alterado = callback_adicionar(arquivo)
+            else:
+                st.warning("Selecione um arquivo.")
+        if anos_disponiveis:
+            ano_remover = st.selectbox("Remover um ano", options=anos_disponiveis, key="ano_remover")
+            if st.button("Remover", key="remover-ano"):
+                alterado = callback_remover(ano_remover)
+    return alterado
+
+def _tabela_etapas(etapas, limite):
+    """Tabela com as etapas mais demoradas, da mais lenta para a mais rápida"""
+    return pd.DataFrame(etapas_mais_lentas(limite, etapas)).set_index("etapa")
+
+def mostrar_painel_depuracao(etapas, etapas_ingestao=None, estatisticas_cache=None, limite=10,
+                             estatisticas_figuras=None):
+    """Painel com as etapas mais lentas da última execução e o uso dos caches de indicadores e figuras"""
+    with st.sidebar.expander("🛠️ Depuração"):
+        st.markdown("**Etapas mais lentas desta execução**")
+        if etapas:
+            st.caption(f"Total medido: {sum(r['duracao_ms'] for r in etapas):.1f} ms em {len(etapas)} etapas")
+            st.dataframe(_tabela_etapas(etapas, limite))
+        else:
+            st.caption("Nenhuma etapa medida.")
+        if etapas_ingestao:
+            st.markdown("**Última ingestão de arquivos**")
+            st.dataframe(_tabela_etapas(etapas_ingestao, limite))
+        if estatisticas_cache:
+            st.markdown("**Cache de indicadores**")
+            st.json(estatisticas_cache)
+        if estatisticas_figuras:
+            st.markdown("**Cache de figuras**")
+            st.json(estatisticas_figuras)
+
 def mostrar_header():
     """Exibe o cabeçalho da aplicação"""
     col1, col2 = st.columns([1, 8])
@@ -86,7 +134,7 @@ def mostrar_secao_upload(callback_processamento=None):
                 <div style='border: 2px dashed #7D3C98; border-radius: 10px; padding: 30px; background: #181818;'>
                     <h4 style='text-align:center; color:#fff; margin-bottom:1.5rem;'>Arraste e solte os arquivos aqui</h4>
                     <div style='display:flex; justify-content:center;'>
-                        <span style='color:#aaa; font-size:0.95rem;'>Formatos aceitos: .xlsx</span>
+                        <span style='color:#aaa; font-size:0.95rem;'>Formatos aceitos: .xlsx, .csv, .dbf, .dbc</span>
                     </div>
                 </div>
             </div>
@@ -94,7 +142,7 @@ def mostrar_secao_upload(callback_processamento=None):
     """, unsafe_allow_html=True)
     uploaded_files = st.file_uploader(
         "",
-        type=["xlsx"],
+        type=["xlsx", "csv", "dbf", "dbc"],
         accept_multiple_files=True,
         key="file_uploader"
     )
@@ -256,8 +304,8 @@ def mostrar_analise_mortalidade(dados, ano_selecionado, mostrar_tabelas=False):
     obitos_por_raca["RACA_NOME"] = obitos_por_raca["RACACOR"].map(raca_map)
     
     # Calcular mortalidade por estado
-    obitos_por_estado = obitos_pele.groupby("ESTADRES").size().reset_index(name="QUANTIDADE")
-    obitos_por_estado = obitos_por_estado.rename(columns={"ESTADRES": "ESTADO"})
+    obitos_por_estado = obitos_pele.groupby("UF", observed=True).size().reset_index(name="QUANTIDADE")
+    obitos_por_estado = obitos_por_estado.rename(columns={"UF": "ESTADO"})
     
     # Layout com duas colunas
     col1, col2 = st.columns(2)
@@ -319,25 +367,20 @@ def mostrar_tempos_medios(dados, ano_selecionado, mostrar_tabelas=False):
     # Título da seção
     st.subheader(f"Tempos Médios - {ano_selecionado}")
     
+    # Calcular todos os intervalos e suas estatísticas de uma só vez
+    intervalos, resumo = calcular_tempos(data_pele)
+    data_pele["DIFF_DTDIAGNO_DATAINITRT"] = intervalos["DIFF_DTDIAGNO_DATAINITRT"]
+    data_pele["DIFF_DTDIAGNO_DATAOBITO"] = intervalos["DIFF_DTDIAGNO_DATAOBITO"]
+    tempos_tratamento = resumo["DIFF_DTDIAGNO_DATAINITRT"]
+    tempos_obito = resumo["DIFF_DTDIAGNO_DATAOBITO"]
+    
     # Criar colunas para organizar os cards de métricas
     col1, col2 = st.columns(2)
     
     with col1:
         # 1. Médias de Tempo do primeiro diagnóstico até início tratamento
         st.markdown("### Tempo até início do tratamento")
-        
-        # Calculando as diferenças de datas entre DTDIAGNO e DATAINITRT
-        data_pele["DIFF_DTDIAGNO_DATAINITRT"] = data_pele.apply(
-            lambda row: calcular_diferenca(
-                row["DTDIAGNO"].strftime('%d/%m/%Y') if pd.notna(row["DTDIAGNO"]) else None, 
-                row["DATAINITRT"].strftime('%d/%m/%Y') if pd.notna(row["DATAINITRT"]) else None
-            ), 
-            axis=1
-        )
-        
-        # Filtrar valores válidos para calcular as médias (remover NaN)
-        tempos_tratamento = data_pele["DIFF_DTDIAGNO_DATAINITRT"].dropna()
-        media_tempo_initr = tempos_tratamento.mean()
+        media_tempo_initr = tempos_tratamento["media"]
         
         # Métricas
         st.metric(
@@ -346,30 +389,18 @@ def mostrar_tempos_medios(dados, ano_selecionado, mostrar_tabelas=False):
         )
         
         # Estatísticas adicionais se houver dados
-        if len(tempos_tratamento) > 0:
+        if tempos_tratamento["casos"] > 0:
             st.markdown(f"""
-            - **Mediana**: {tempos_tratamento.median():.1f} dias
-            - **Mínimo**: {tempos_tratamento.min():.1f} dias 
-            - **Máximo**: {tempos_tratamento.max():.1f} dias
-            - **Número de casos**: {len(tempos_tratamento)} pacientes
+            - **Mediana**: {tempos_tratamento["mediana"]:.1f} dias
+            - **Mínimo**: {tempos_tratamento["minimo"]:.1f} dias 
+            - **Máximo**: {tempos_tratamento["maximo"]:.1f} dias
+            - **Número de casos**: {tempos_tratamento["casos"]} pacientes
             """)
     
     with col2:
         # 2. Médias de Tempo do primeiro diagnóstico até óbito
         st.markdown("### Tempo até óbito")
-        
-        # Calculando as diferenças de datas entre DTDIAGNO e DATAOBITO
-        data_pele["DIFF_DTDIAGNO_DATAOBITO"] = data_pele.apply(
-            lambda row: calcular_diferenca(
-                row["DTDIAGNO"].strftime('%d/%m/%Y') if pd.notna(row["DTDIAGNO"]) else None, 
-                row["DATAOBITO"].strftime('%d/%m/%Y') if pd.notna(row["DATAOBITO"]) else None
-            ), 
-            axis=1
-        )
-        
-        # Filtrar valores válidos para calcular as médias (remover NaN)
-        tempos_obito = data_pele["DIFF_DTDIAGNO_DATAOBITO"].dropna()
-        media_tempo_obito = tempos_obito.mean()
+        media_tempo_obito = tempos_obito["media"]
         
         # Métricas
         st.metric(
@@ -378,22 +409,22 @@ def mostrar_tempos_medios(dados, ano_selecionado, mostrar_tabelas=False):
         )
         
         # Estatísticas adicionais se houver dados
-        if len(tempos_obito) > 0:
+        if tempos_obito["casos"] > 0:
             st.markdown(f"""
-            - **Mediana**: {tempos_obito.median():.1f} dias
-            - **Mínimo**: {tempos_obito.min():.1f} dias 
-            - **Máximo**: {tempos_obito.max():.1f} dias
-            - **Número de óbitos**: {len(tempos_obito)} pacientes
+            - **Mediana**: {tempos_obito["mediana"]:.1f} dias
+            - **Mínimo**: {tempos_obito["minimo"]:.1f} dias 
+            - **Máximo**: {tempos_obito["maximo"]:.1f} dias
+            - **Número de óbitos**: {tempos_obito["casos"]} pacientes
             """)
     
     # Histograma de distribuição dos tempos (se houver dados suficientes)
-    if len(tempos_tratamento) > 10 or len(tempos_obito) > 10:
+    if tempos_tratamento["casos"] > 10 or tempos_obito["casos"] > 10:
         st.subheader("Distribuição dos Tempos")
         
         col1, col2 = st.columns(2)
         
         # Histograma para tempo até tratamento
-        if len(tempos_tratamento) > 10:
+        if tempos_tratamento["casos"] > 10:
             with col1:
                 fig_tempo_tratamento = px.histogram(
                     data_pele.dropna(subset=["DIFF_DTDIAGNO_DATAINITRT"]), 
@@ -408,7 +439,7 @@ def mostrar_tempos_medios(dados, ano_selecionado, mostrar_tabelas=False):
                 st.plotly_chart(fig_tempo_tratamento, use_container_width=True)
         
         # Histograma para tempo até óbito
-        if len(tempos_obito) > 10:
+        if tempos_obito["casos"] > 10:
             with col2:
                 fig_tempo_obito = px.histogram(
                     data_pele.dropna(subset=["DIFF_DTDIAGNO_DATAOBITO"]), 
@@ -0,0 +1,311 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+from intervalos import calcular_tempos
+from metricas import COLUNAS_PERFIL, FAIXAS_ETARIAS_LIMITES, FAIXAS_ETARIAS_ROTULOS
+from topografia import mascara_grupo
+
+# Tipo das faixas etárias, fixo para que cubos de anos diferentes sejam compatíveis
+TIPO_FAIXA_ETARIA = pd.CategoricalDtype(FAIXAS_ETARIAS_ROTULOS, ordered=True)
+
+# Dimensões guardadas para todos os casos
+DIMENSOES_GERAIS = ["UF", "GRUPO", "OBITO"]
+
+# Dimensões adicionais guardadas apenas para os casos de câncer de pele
+DIMENSOES_PELE = ["SEXO", "RACACOR", "FAIXA_ETARIA"]
+
+# Agregados marginais dos casos de câncer de pele, separados do cubo para que
+# nenhum deles cresça com o número de registros. A última coluna é o detalhe;
+# as anteriores são as usadas nos filtros.
+MARGINAIS = {
+    "idade": ["UF", "GRUPO", "SEXO", "OBITO", "IDADE"],
+    "instrucao": ["INSTRUC"],
+    "localizacao": ["LOUCTUPRI"],
+    "tipo": ["UF", "GRUPO", "OBITO", "TOPOGRAF", "LOCTUDET"]
+}
+
+def _base(df):
+    """Colunas usadas pelo cubo e pelos marginais, e a máscara dos casos de câncer de pele"""
+    c43 = mascara_grupo(df, "C43")
+    c44 = mascara_grupo(df, "C44")
+
+    base = pd.DataFrame({
+        "UF": df["UF"] if "UF" in df.columns else pd.Series(np.nan, index=df.index),
+        "GRUPO": np.where(c43, "C43", np.where(c44, "C44", "OUTROS")),
+        "OBITO": df["DATAOBITO"].notna() if "DATAOBITO" in df.columns else False
+    }, index=df.index)
+
+    detalhes = dict.fromkeys(DIMENSOES_PELE + [c for colunas in MARGINAIS.values() for c in colunas])
+    for coluna in detalhes:
+        if coluna in base.columns:
+            continue
+        if coluna == "FAIXA_ETARIA" and "IDADE" in df.columns:
+            base[coluna] = pd.cut(
+                pd.to_numeric(df["IDADE"], errors="coerce").astype("float64"),
+                bins=FAIXAS_ETARIAS_LIMITES, labels=FAIXAS_ETARIAS_ROTULOS, right=False
+            )
+        elif coluna in df.columns:
+            base[coluna] = df[coluna]
+    return base, c43 | c44
+
+def _tipo_com_ausentes(tipo):
+    """Tipo que aceita ausentes sem converter códigos inteiros em float (ex.: int8 -> Int8)"""
+    if pd.api.types.is_integer_dtype(tipo) and not pd.api.types.is_extension_array_dtype(tipo):
+        return pd.api.types.pandas_dtype(str(tipo).capitalize())
+    return tipo
+
+def _cubo_da_base(base, pele):
+    dimensoes_pele = DIMENSOES_GERAIS + [c for c in DIMENSOES_PELE if c in base.columns]
+    cubo_pele = base[pele].groupby(dimensoes_pele, dropna=False, observed=True).size().rename("CASOS").reset_index()
+    cubo_outros = base[~pele].groupby(DIMENSOES_GERAIS, dropna=False, observed=True).size()
+    cubo = pd.concat([cubo_pele, cubo_outros.rename("CASOS").reset_index()], ignore_index=True)
+    # As células dos demais casos não têm as dimensões da pele: manter os
+    # códigos com o tipo original (1, 2...) em vez de float (1.0, 2.0...)
+    for coluna in dimensoes_pele[len(DIMENSOES_GERAIS):]:
+        cubo[coluna] = cubo[coluna].astype(_tipo_com_ausentes(cubo_pele[coluna].dtype))
+    return cubo
+
+def _marginais_da_base(base, pele):
+    base_pele = base[pele]
+    marginais = {}
+    for nome, colunas in MARGINAIS.items():
+        colunas = [c for c in colunas if c in base_pele.columns]
+        if colunas and colunas[-1] == MARGINAIS[nome][-1]:
+            contagens = base_pele.groupby(colunas, dropna=False, observed=True).size()
+            marginais[nome] = contagens.rename("CASOS").reset_index()
+    return marginais
+
+def construir_cubo(df):
+    """
+    Pré-agrega os casos de um ano em um cubo de contagens (coluna CASOS).
+    Casos de câncer de pele são agregados por estado, grupo de topografia,
+    óbito, sexo, raça/cor e faixa etária; os demais casos apenas por estado
+    e óbito, que é o necessário para os totais.
+    """
+    return _cubo_da_base(*_base(df))
+
+def construir_marginais(df):
+    """
+    Agregados marginais dos casos de câncer de pele de um ano (ver MARGINAIS):
+    idade, instrução, localização e topografia detalhada, cada um com as
+    poucas dimensões necessárias para os filtros.
+    """
+    return _marginais_da_base(*_base(df))
+
+def resumir_tempos(df):
+    """Soma e contagem dos intervalos dos casos de câncer de pele de um ano"""
+    pele = mascara_grupo(df, "C43+C44")
+    intervalos, _ = calcular_tempos(df[pele])
+    return {
+        coluna: (float(intervalos[coluna].sum()), int(intervalos[coluna].count()))
+        for coluna in intervalos.columns
+    }
+
+def combinar_cubos(cubos_por_ano):
+    """Junta os cubos de vários anos, identificando o ano em cada célula"""
+    if not cubos_por_ano:
+        return pd.DataFrame(columns=["ANO"] + DIMENSOES_GERAIS + ["CASOS"])
+    return pd.concat(
+        [cubo.assign(ANO=ano) for ano, cubo in cubos_por_ano.items()],
+        ignore_index=True
+    )
+
+def somar_cubos(cubos):
+    """Soma as células iguais de vários cubos (ex.: de lotes diferentes do mesmo ano)"""
+    cubos = [c for c in cubos if c is not None]
+    if not cubos:
+        return None
+    if len(cubos) == 1:
+        return cubos[0]
+    cubo = pd.concat(cubos, ignore_index=True)
+    dimensoes = [c for c in cubo.columns if c != "CASOS"]
+    return cubo.groupby(dimensoes, dropna=False, observed=True)["CASOS"].sum().reset_index()
+
+def combinar_marginais(marginais_por_ano):
+    """Junta os marginais de vários anos, identificando o ano em cada célula"""
+    nomes = dict.fromkeys(nome for marginais in marginais_por_ano.values() for nome in marginais)
+    return {
+        nome: combinar_cubos({ano: m[nome] for ano, m in marginais_por_ano.items() if nome in m})
+        for nome in nomes
+    }
+
+def somar_marginais(marginais):
+    """Soma, para cada marginal, as células iguais de vários conjuntos de marginais"""
+    marginais = [m for m in marginais if m is not None]
+    nomes = dict.fromkeys(nome for m in marginais for nome in m)
+    return {nome: somar_cubos([m.get(nome) for m in marginais]) for nome in nomes}
+
+def selecionar_grupo(cubo, marginais, grupos):
+    """Mantém no cubo e nos marginais com a coluna GRUPO apenas as células dos grupos informados"""
+    marginais = {
+        nome: marginal[marginal["GRUPO"].isin(grupos)] if "GRUPO" in marginal.columns else marginal
+        for nome, marginal in marginais.items()
+    }
+    return cubo[cubo["GRUPO"].isin(grupos)], marginais
+
+def somar_tempos(tempos):
+    """Soma as somas e contagens dos intervalos de vários resumos de resumir_tempos"""
+    total = {}
+    for resumo in tempos:
+        for coluna, (soma, quantidade) in (resumo or {}).items():
+            soma_atual, quantidade_atual = total.get(coluna, (0.0, 0))
+            total[coluna] = (soma_atual + soma, quantidade_atual + quantidade)
+    return total
+
+def parciais_indicadores(df):
+    """Resultados parciais dos indicadores de uma parte dos dados: cubo, marginais e somas dos intervalos"""
+    base, pele = _base(df)
+    return {
+        "cubo": _cubo_da_base(base, pele),
+        "marginais": _marginais_da_base(base, pele),
+        "tempos": resumir_tempos(df)
+    }
+
+def combinar_parciais_indicadores(parciais):
+    """Combina os parciais de partes diferentes dos dados (anos ou lotes de linhas)"""
+    parciais = [p for p in parciais if p is not None]
+    if not parciais:
+        return None
+    return {
+        "cubo": somar_cubos([p["cubo"] for p in parciais]),
+        "marginais": somar_marginais([p["marginais"] for p in parciais]),
+        "tempos": somar_tempos([p["tempos"] for p in parciais])
+    }
+
+def indicadores_da_parcial(parcial, populacao_total, estados_selecionados):
+    """Calcula os indicadores a partir dos parciais já combinados"""
+    if parcial is None:
+        return indicadores_do_cubo(combinar_cubos({}), {}, populacao_total, estados_selecionados)
+    tempos_por_ano = {"total": parcial["tempos"]} if parcial["tempos"] else {}
+    return indicadores_do_cubo(
+        parcial["cubo"], tempos_por_ano, populacao_total, estados_selecionados, parcial["marginais"]
+    )
+
+def _somar(cubo, coluna):
+    """Soma os casos por valor da coluna (sem nome, como groupby().size())"""
+    if coluna not in cubo.columns:
+        return pd.Series(dtype="int64")
+    return cubo.groupby(coluna, observed=True)["CASOS"].sum().rename(None)
+
+def _obitos_marginal(marginais, nome, estados_selecionados):
+    """Células de óbitos de um marginal, nos estados selecionados (None se não houver o marginal)"""
+    marginal = marginais.get(nome)
+    if marginal is None:
+        return None
+    mascara = marginal["OBITO"].to_numpy(dtype=bool)
+    if estados_selecionados:
+        mascara = mascara & marginal["UF"].isin(estados_selecionados).to_numpy(dtype=bool)
+    return marginal[mascara]
+
+@medir("indicadores_do_cubo")
+def indicadores_do_cubo(cubo, tempos_por_ano, populacao_total, estados_selecionados, marginais=None):
+    """
+    Calcula os indicadores de incidência, mortalidade, tempos e perfil
+    apenas com fatias e somas do cubo e dos marginais (combinar_marginais),
+    que trazem as distribuições por idade, instrução, localização e
+    topografia detalhada.
+    Retorna os mesmos dicionários de metricas.calcular_todos_indicadores.
+    """
+    marginais = marginais or {}
+    casos = cubo["CASOS"].to_numpy()
+    grupo = cubo["GRUPO"].to_numpy()
+    c43 = grupo == "C43"
+    c44 = grupo == "C44"
+    pele = c43 | c44
+    obito = cubo["OBITO"].to_numpy(dtype=bool)
+    if estados_selecionados:
+        no_estado = cubo["UF"].isin(estados_selecionados).to_numpy(dtype=bool)
+    else:
+        no_estado = np.ones(len(cubo), dtype=bool)
+
+    def total(mascara):
+        return int(casos[mascara].sum())
+
+    # Incidência (estados selecionados)
+    casos_totais = total(no_estado)
+    casos_pele = total(no_estado & pele)
+    casos_c43 = total(no_estado & c43)
+    casos_c44 = total(no_estado & c44)
+    incidencia = {
+        "taxa_incidencia_geral": (casos_totais / populacao_total) * 100,
+        "taxa_incidencia_pele": (casos_pele / populacao_total) * 100,
+        "taxa_incidencia_c43": (casos_c43 / populacao_total) * 100,
+        "taxa_incidencia_c44": (casos_c44 / populacao_total) * 100,
+        "casos_totais": casos_totais,
+        "casos_pele": casos_pele,
+        "casos_c43": casos_c43,
+        "casos_c44": casos_c44
+    }
+
+    # Mortalidade (estados selecionados)
+    mascara_obitos_pele = no_estado & obito & pele
+    obitos_pele = total(mascara_obitos_pele)
+    if obitos_pele:
+        obitos = cubo[mascara_obitos_pele]
+        faixas_etarias = pd.Series(dtype="int64")
+        if "FAIXA_ETARIA" in obitos.columns:
+            # Todas as faixas aparecem, mesmo sem óbitos (como no cálculo original)
+            faixa = obitos["FAIXA_ETARIA"].astype(TIPO_FAIXA_ETARIA)
+            faixas_etarias = (
+                obitos["CASOS"].groupby(faixa, observed=False).sum()
+                .reindex(FAIXAS_ETARIAS_ROTULOS, fill_value=0).rename(None)
+            )
+            faixas_etarias.index.name = "FAIXA_ETARIA"
+        obitos_idade = _obitos_marginal(marginais, "idade", estados_selecionados)
+        obitos_tipo = _obitos_marginal(marginais, "tipo", estados_selecionados)
+        if obitos_tipo is not None:
+            colunas_tipo = [c for c in ["TOPOGRAF", "LOCTUDET"] if c in obitos_tipo.columns]
+            mortalidade_tipo = obitos_tipo.groupby(colunas_tipo, observed=True)["CASOS"].sum().rename(None)
+        else:
+            mortalidade_tipo = pd.Series(dtype="int64")
+        mortalidade = {
+            "mortalidade_sexo": _somar(obitos, "SEXO"),
+            "mortalidade_idade": _somar(obitos_idade, "IDADE") if obitos_idade is not None else pd.Series(dtype="int64"),
+            "faixas_etarias": faixas_etarias,
+            "mortalidade_raca": _somar(obitos, "RACACOR"),
+            "mortalidade_estado": _somar(obitos, "UF"),
+            "estados": sorted(obitos["UF"].dropna().unique().tolist()),
+            "mortalidade_c43_c44": mortalidade_tipo
+        }
+    else:
+        mortalidade = {
+            "mortalidade_sexo": {},
+            "mortalidade_idade": {},
+            "faixas_etarias": {},
+            "mortalidade_raca": {},
+            "mortalidade_estado": {},
+            "estados": [],
+            "mortalidade_c43_c44": {}
+        }
+
+    obitos_c43 = total(no_estado & obito & c43)
+    obitos_c44 = total(no_estado & obito & c44)
+    mortalidade = {
+        "obitos_total": total(no_estado & obito),
+        "obitos_pele": obitos_pele,
+        **mortalidade,
+        "letalidade": (obitos_pele / casos_pele) * 100 if casos_pele > 0 else 0,
+        "letalidade_c43": (obitos_c43 / casos_c43) * 100 if casos_c43 > 0 else 0,
+        "letalidade_c44": (obitos_c44 / casos_c44) * 100 if casos_c44 > 0 else 0
+    }
+
+    # Tempos: médias combinadas a partir das somas e contagens de cada ano
+    tempos = {}
+    for nome, coluna in [("tempo_ate_tratamento", "DIFF_DTDIAGNO_DATAINITRT"),
+                         ("tempo_ate_obito", "DIFF_DTDIAGNO_DATAOBITO")]:
+        soma = sum(t[coluna][0] for t in tempos_por_ano.values())
+        quantidade = sum(t[coluna][1] for t in tempos_por_ano.values())
+        tempos[nome] = soma / quantidade if quantidade else 0
+
+    # Perfil: todos os casos de câncer de pele (sem filtro de estado)
+    cubo_pele = cubo[pele]
+    perfil = {}
+    for nome, coluna in COLUNAS_PERFIL.items():
+        fonte = cubo_pele
+        if coluna not in fonte.columns:
+            fonte = next((m for m in marginais.values() if coluna in m.columns), fonte)
+        distribuicao = _somar(fonte, coluna).sort_values(ascending=False)
+        perfil[nome] = distribuicao[distribuicao > 0].rename("count")
+
+    return incidencia, mortalidade, tempos, perfil
@@ -0,0 +1,152 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from intervalos import DATA_INVALIDA
+from populacao import carregar_populacao
+from utils import extrair_ano_do_arquivo
+
+# Limite de linhas de uma planilha do Excel (sem o cabeçalho)
+MAX_LINHAS_EXCEL = 1048575
+
+# Distribuição aproximada das topografias nas bases hospitalares;
+# o restante é distribuído uniformemente entre as demais categorias C00-C97
+DISTRIBUICAO_TOPOGRAFIA = {
+    "C44": 0.28, "C50": 0.10, "C61": 0.09, "C53": 0.05, "C18": 0.04,
+    "C34": 0.04, "C16": 0.03, "C43": 0.03, "C20": 0.02, "C73": 0.02,
+    "C67": 0.02, "C15": 0.02, "C32": 0.02, "C54": 0.02, "C56": 0.01
+}
+
+# Distribuições das variáveis demográficas (códigos do RHC)
+DISTRIBUICAO_SEXO = {1: 0.48, 2: 0.52}
+DISTRIBUICAO_RACACOR = {1: 0.45, 2: 0.08, 3: 0.01, 4: 0.38, 5: 0.003, 9: 0.077}
+DISTRIBUICAO_INSTRUC = {1: 0.10, 2: 0.30, 3: 0.20, 4: 0.15, 5: 0.08, 6: 0.02, 9: 0.15}
+
+# Probabilidade de óbito registrado por tipo de câncer
+PROBABILIDADE_OBITO = {"C43": 0.15, "C44": 0.02}
+PROBABILIDADE_OBITO_OUTROS = 0.25
+
+# Proporção de datas preenchidas com o valor inválido '99/99/9999'
+PROPORCAO_DATA_INVALIDA = 0.02
+
+# Colunas do RHC que não são usadas pelo dashboard (descartadas na leitura)
+COLUNAS_EXTRAS = ["TPCASO", "BASMAIMP", "ESTDFIMT", "CLINIC"]
+
+# Nomes das colunas originais: padrão do RHC ou nomes alternativos aceitos em mapear_colunas
+NOMES_COLUNAS = {
+    False: {"DTDIAGNO": "DTDIAGNO", "DATAINITRT": "DATAINITRT", "UF": "ESTADRES"},
+    True: {"DTDIAGNO": "DATAPRICON", "DATAINITRT": "DTINITRT", "UF": "UFUH"}
+}
+
+def _sortear(gerador, distribuicao, tamanho):
+    """Sorteia valores de um dicionário {valor: probabilidade}"""
+    valores = np.array(list(distribuicao), dtype=object)
+    pesos = np.array(list(distribuicao.values()), dtype="float64")
+    return valores[gerador.choice(len(valores), size=tamanho, p=pesos / pesos.sum())]
+
+def _distribuicao_uf():
+    """Peso de cada UF proporcional à sua população"""
+    tabela = carregar_populacao()
+    por_uf = tabela.groupby("UF")["POPULACAO"].sum()
+    return (por_uf / por_uf.sum()).to_dict()
+
+def _formatar_datas(dias, inicio):
+    """
+    Converte deslocamentos em dias (NaN = vazio) em textos dd/mm/aaaa,
+    formatando cada data distinta uma única vez.
+    """
+    resultado = np.full(len(dias), "", dtype=object)
+    validos = ~np.isnan(dias)
+    distintos, inverso = np.unique(dias[validos].astype("int64"), return_inverse=True)
+    textos = (pd.Timestamp(inicio) + pd.to_timedelta(distintos, unit="D")).strftime("%d/%m/%Y")
+    resultado[validos] = np.asarray(textos, dtype=object)[inverso]
+    return resultado
+
+def gerar_dataframe(linhas, ano=2021, semente=None, nomes_alternativos=False):
+    """
+    Gera um DataFrame sintético no formato das bases do RHC, com as colunas
+    originais (antes de mapear_colunas), datas em texto dd/mm/aaaa com
+    valores '99/99/9999', óbitos ausentes e colunas não usadas pelo painel.
+    """
+    gerador = np.random.default_rng(semente)
+    nomes = NOMES_COLUNAS[nomes_alternativos]
+
+    # Topografia: categorias mais frequentes e o restante uniforme
+    outras = [f"C{i:02d}" for i in range(98) if f"C{i:02d}" not in DISTRIBUICAO_TOPOGRAFIA]
+    resto = 1 - sum(DISTRIBUICAO_TOPOGRAFIA.values())
+    distribuicao = {**DISTRIBUICAO_TOPOGRAFIA, **{c: resto / len(outras) for c in outras}}
+    categoria = _sortear(gerador, distribuicao, linhas)
+    subsitio = gerador.integers(0, 10, size=linhas).astype(str).astype(object)
+    detalhada = categoria + "." + subsitio
+
+    # Datas: diagnóstico no ano, tratamento e óbito depois do diagnóstico
+    inicio = pd.Timestamp(year=ano, month=1, day=1)
+    dias_no_ano = (pd.Timestamp(year=ano + 1, month=1, day=1) - inicio).days
+    diagnostico = gerador.integers(0, dias_no_ano, size=linhas).astype("float64")
+    tratamento = diagnostico + np.round(gerador.gamma(2.0, 30.0, size=linhas))
+    tratamento[gerador.random(linhas) < 0.10] = np.nan
+    probabilidade_obito = np.full(linhas, PROBABILIDADE_OBITO_OUTROS)
+    for tipo, probabilidade in PROBABILIDADE_OBITO.items():
+        probabilidade_obito[categoria == tipo] = probabilidade
+    obito = diagnostico + np.round(gerador.exponential(400.0, size=linhas))
+    obito[gerador.random(linhas) >= probabilidade_obito] = np.nan
+
+    colunas_data = {}
+    for coluna, dias in [("DTDIAGNO", diagnostico), ("DATAINITRT", tratamento), ("DATAOBITO", obito)]:
+        textos = _formatar_datas(dias, inicio)
+        if coluna != "DATAOBITO":
+            textos[gerador.random(linhas) < PROPORCAO_DATA_INVALIDA] = DATA_INVALIDA
+        colunas_data[nomes.get(coluna, coluna)] = textos
+
+    # Idade: maior frequência entre 50 e 80 anos
+    idade = np.clip(np.round(gerador.normal(60, 15, size=linhas)), 0, 105).astype("int64")
+
+    df = pd.DataFrame({
+        "LOCTUPRI": categoria,
+        "LOCTUDET": detalhada,
+        **colunas_data,
+        "SEXO": _sortear(gerador, DISTRIBUICAO_SEXO, linhas).astype("int64"),
+        "IDADE": idade,
+        "RACACOR": _sortear(gerador, DISTRIBUICAO_RACACOR, linhas).astype("int64"),
+        nomes["UF"]: _sortear(gerador, _distribuicao_uf(), linhas),
+        "INSTRUC": _sortear(gerador, DISTRIBUICAO_INSTRUC, linhas).astype("int64")
+    })
+    for coluna in COLUNAS_EXTRAS:
+        df[coluna] = gerador.integers(1, 10, size=linhas)
+    return df
+
+def salvar_arquivo(df, caminho):
+    """Grava o DataFrame como planilha (.xlsx) ou CSV (.csv), conforme a extensão"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == ".xlsx":
+        if len(df) > MAX_LINHAS_EXCEL:
+            raise ValueError(f"Planilhas do Excel comportam no máximo {MAX_LINHAS_EXCEL} linhas; use .csv")
+        df.to_excel(caminho, index=False)
+    elif extensao == ".csv":
+        df.to_csv(caminho, index=False, sep=";")
+    else:
+        raise ValueError(f"Formato não suportado para dados sintéticos: {extensao}")
+    return caminho
+
+def gerar_arquivo(caminho, linhas, ano=None, semente=None, nomes_alternativos=False):
+    """Gera e grava um arquivo sintético; o ano vem do nome do arquivo quando não informado"""
+    if ano is None:
+        ano = extrair_ano_do_arquivo(os.path.basename(caminho)) or 2021
+    return salvar_arquivo(gerar_dataframe(linhas, ano, semente, nomes_alternativos), caminho)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera arquivos sintéticos no formato das bases do RHC")
+    parser.add_argument("caminhos", nargs="+", help="arquivos a gerar (ex.: RHC_2021.csv); o ano vem do nome")
+    parser.add_argument("--linhas", type=int, default=10000, help="linhas por arquivo (de 10 mil a 10 milhões)")
+    parser.add_argument("--semente", type=int, default=None, help="semente para resultados reproduzíveis")
+    parser.add_argument("--nomes-alternativos", action="store_true", help="usar nomes alternativos das colunas")
+    args = parser.parse_args()
+    for i, caminho in enumerate(args.caminhos):
+        semente = None if args.semente is None else args.semente + i
+        gerar_arquivo(caminho, args.linhas, semente=semente, nomes_alternativos=args.nomes_alternativos)
+        print(f"{caminho}: {args.linhas} linhas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from cache_arquivos import carregar_do_cache, chave_arquivo, salvar_no_cache
+from instrumentacao import acrescentar_registros, iniciar_execucao, medir, registros_execucao
+from leitores import obter_leitor
+from utils import extrair_ano_do_arquivo, processar_dataframe
+
+# Número máximo de processos usados na leitura paralela
+MAX_PROCESSOS = os.cpu_count() or 1
+
+def ler_arquivo(nome_arquivo, conteudo):
+    """Lê e normaliza um arquivo anual a partir do seu conteúdo em bytes"""
+    leitor = obter_leitor(nome_arquivo)
+
+    # Reenvio do mesmo arquivo: carregar direto do cache, sem ler o arquivo
+    chave = chave_arquivo(conteudo)
+    with medir("carregar_do_cache", arquivo=nome_arquivo) as campos:
+        df = carregar_do_cache(chave)
+        campos["acerto"] = df is not None
+    if df is not None:
+        return df
+
+    with medir("leitura_arquivo", arquivo=nome_arquivo, bytes=len(conteudo)) as campos:
+        df = leitor(BytesIO(conteudo))
+        campos["linhas"] = len(df)
+    with medir("processar_dataframe", arquivo=nome_arquivo, linhas=len(df)):
+        df = processar_dataframe(df)
+    with medir("salvar_no_cache", arquivo=nome_arquivo):
+        salvar_no_cache(chave, df)
+    return df
+
+def _processar_item(item):
+    """Lê um arquivo e devolve (nome, df, erro)"""
+    nome_arquivo, conteudo = item
+    try:
+        return nome_arquivo, ler_arquivo(nome_arquivo, conteudo), None
+    except Exception as e:
+        return nome_arquivo, None, str(e)
+
+def _processar_item_medido(item):
+    """Executado em um processo separado: devolve também as etapas medidas"""
+    iniciar_execucao()
+    return _processar_item(item) + (registros_execucao(),)
+
+def processar_em_paralelo(arquivos, max_processos=None):
+    """
+    Lê e normaliza vários arquivos anuais em paralelo.
+    Recebe uma lista de tuplas (nome, bytes) e retorna uma lista de
+    tuplas (nome, ano, df, erro) na mesma ordem de entrada.
+    """
+    itens = []
+    resultados = []
+    for nome_arquivo, conteudo in arquivos:
+        ano = extrair_ano_do_arquivo(nome_arquivo)
+        if ano:
+            itens.append((nome_arquivo, conteudo))
+
+    if not itens:
+        return resultados
+
+    max_processos = min(max_processos or MAX_PROCESSOS, len(itens))
+    if max_processos <= 1:
+        processados = map(_processar_item, itens)
+    else:
+        with ProcessPoolExecutor(max_workers=max_processos) as executor:
+            processados = []
+            for nome_arquivo, df, erro, registros in executor.map(_processar_item_medido, itens):
+                # Trazer as medições dos processos para a execução atual
+                acrescentar_registros(registros)
+                processados.append((nome_arquivo, df, erro))
+
+    for nome_arquivo, df, erro in processados:
+        resultados.append((nome_arquivo, extrair_ano_do_arquivo(nome_arquivo), df, erro))
+
+    return resultados
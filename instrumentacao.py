@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Nível dos logs da aplicação (DEBUG, INFO, WARNING...), configurável pelo ambiente
+NIVEL_LOG = os.environ.get("LOG_NIVEL", "INFO").upper()
+
+# Quantidade máxima de etapas guardadas por execução
+MAX_REGISTROS = 500
+
+logger = logging.getLogger("instrumentacao")
+
+# Atributos padrão de um LogRecord, que não entram como campos extras
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Cada sessão do Streamlit executa o script em sua própria thread
+_local = threading.local()
+
+class FormatadorJSON(logging.Formatter):
+    """Formata cada registro como uma linha JSON, incluindo os campos extras"""
+
+    def format(self, record):
+        dados = {
+            "momento": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage()
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+def configurar_logging(nivel=NIVEL_LOG):
+    """Configura o logger raiz para emitir JSON no stderr (apenas uma vez)"""
+    raiz = logging.getLogger()
+    if any(isinstance(h.formatter, FormatadorJSON) for h in raiz.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(FormatadorJSON())
+    raiz.addHandler(handler)
+    raiz.setLevel(nivel)
+
+def _registros_atuais():
+    registros = getattr(_local, "registros", None)
+    if registros is None:
+        registros = _local.registros = []
+    return registros
+
+def iniciar_execucao():
+    """Descarta as etapas medidas na execução anterior do script"""
+    _local.registros = []
+
+def registros_execucao():
+    """Etapas medidas na execução atual, na ordem em que terminaram"""
+    return list(_registros_atuais())
+
+def acrescentar_registros(registros):
+    """Acrescenta à execução atual etapas medidas em outro processo"""
+    atuais = _registros_atuais()
+    atuais.extend(registros[:max(MAX_REGISTROS - len(atuais), 0)])
+
+def etapas_mais_lentas(limite=10, registros=None):
+    """As etapas mais demoradas da execução atual (ou dos registros informados)"""
+    registros = registros_execucao() if registros is None else registros
+    return sorted(registros, key=lambda r: r["duracao_ms"], reverse=True)[:limite]
+
+def resumir_execucao(mensagem="execução concluída", limite=5):
+    """
+    Emite um único registro INFO com o total medido na execução atual e as
+    etapas mais lentas; as etapas individuais saem apenas em DEBUG.
+    """
+    registros = registros_execucao()
+    logger.info(mensagem, extra={
+        "etapas": len(registros),
+        "duracao_total_ms": round(sum(r["duracao_ms"] for r in registros), 3),
+        "mais_lentas": [
+            {"etapa": r["etapa"], "duracao_ms": r["duracao_ms"]} for r in etapas_mais_lentas(limite, registros)
+        ]
+    })
+
+@contextmanager
+def medir(etapa, **campos):
+    """
+    Mede a duração de uma etapa e emite um registro estruturado (DEBUG) com
+    o nome, a duração em milissegundos e os campos informados.
+    Pode ser usado com `with medir(...)` ou como decorador.
+    """
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield campos
+    except Exception as e:
+        erro = type(e).__name__
+        raise
+    finally:
+        registro = {
+            "etapa": etapa,
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            **campos
+        }
+        if erro:
+            registro["erro"] = erro
+        registros = _registros_atuais()
+        if len(registros) < MAX_REGISTROS:
+            registros.append(registro)
+        logger.debug("etapa concluída", extra=registro)
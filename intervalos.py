@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Valor usado nas bases do RHC para datas desconhecidas
+DATA_INVALIDA = "99/99/9999"
+
+# Intervalos calculados: nome da coluna -> (data inicial, data final)
+INTERVALOS = {
+    "DIFF_DTDIAGNO_DATAINITRT": ("DTDIAGNO", "DATAINITRT"),
+    "DIFF_DTDIAGNO_DATAOBITO": ("DTDIAGNO", "DATAOBITO")
+}
+
+def _como_data(serie):
+    """Garante que a coluna seja datetime64; textos inválidos viram NaT"""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    serie = serie.where(serie.astype(str) != DATA_INVALIDA)
+    return pd.to_datetime(serie, errors="coerce", format="%d/%m/%Y")
+
+def calcular_intervalos(df, intervalos=INTERVALOS, descartar_negativos=True):
+    """
+    Calcula, de forma vetorizada, os intervalos em dias entre pares de datas.
+    Datas ausentes ou '99/99/9999' resultam em NaN; intervalos negativos
+    (data final anterior à inicial) também são descartados por padrão.
+    Retorna um DataFrame com uma coluna por intervalo, no índice de df.
+    """
+    datas = {}
+    colunas = {}
+    for nome, (inicio, fim) in intervalos.items():
+        if inicio not in df.columns or fim not in df.columns:
+            colunas[nome] = pd.Series(np.nan, index=df.index)
+            continue
+
+        # Converter cada coluna de data apenas uma vez
+        for coluna in (inicio, fim):
+            if coluna not in datas:
+                datas[coluna] = _como_data(df[coluna])
+
+        dias = (datas[fim] - datas[inicio]).dt.days
+        if descartar_negativos:
+            dias = dias.where(dias >= 0)
+        colunas[nome] = dias.astype("float64")
+
+    return pd.DataFrame(colunas, index=df.index)
+
+def resumir_intervalos(df_intervalos):
+    """
+    Calcula número de casos, média, mediana, mínimo e máximo de cada
+    intervalo em uma única agregação.
+    """
+    estatisticas = df_intervalos.agg(["count", "mean", "median", "min", "max"])
+    return {
+        nome: {
+            "casos": int(estatisticas.at["count", nome]),
+            "media": estatisticas.at["mean", nome],
+            "mediana": estatisticas.at["median", nome],
+            "minimo": estatisticas.at["min", nome],
+            "maximo": estatisticas.at["max", nome]
+        }
+        for nome in df_intervalos.columns
+    }
+
+def calcular_tempos(df, intervalos=INTERVALOS, descartar_negativos=True):
+    """Retorna as colunas de intervalos e o resumo estatístico de cada uma"""
+    df_intervalos = calcular_intervalos(df, intervalos, descartar_negativos)
+    return df_intervalos, resumir_intervalos(df_intervalos)
@@ -0,0 +1,229 @@
+import csv
+import os
+import struct
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from utils import colunas_necessarias
+
+# Quantidade de linhas lidas por bloco pelos leitores
+TAMANHO_BLOCO = 50000
+
+# Codificação usada pelos arquivos do DATASUS
+CODIFICACAO_DATASUS = "latin-1"
+
+def _montar_blocos(linhas, colunas, tamanho_bloco):
+    """
+    Monta um DataFrame a partir de um iterador de linhas (tuplas já
+    projetadas nas colunas informadas), convertendo cada bloco em arrays
+    compactos assim que ele é preenchido.
+    """
+    blocos = []
+    bloco = {c: [] for c in colunas}
+    quantidade = 0
+    for linha in linhas:
+        for coluna, valor in zip(colunas, linha):
+            bloco[coluna].append(valor)
+        quantidade += 1
+        if quantidade == tamanho_bloco:
+            blocos.append(pd.DataFrame(bloco))
+            bloco = {c: [] for c in colunas}
+            quantidade = 0
+    if quantidade or not blocos:
+        blocos.append(pd.DataFrame(bloco))
+
+    if len(blocos) == 1:
+        return blocos[0]
+    return pd.concat(blocos, ignore_index=True)
+
+def ler_excel_projetado(fonte, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê apenas as colunas usadas pelo dashboard de uma planilha Excel.
+    Usa o modo somente leitura do openpyxl e monta o DataFrame em blocos
+    de linhas, evitando carregar a planilha inteira na memória.
+    """
+    wb = load_workbook(fonte, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        cabecalho = next(ws.iter_rows(max_row=1, values_only=True), None)
+        if cabecalho is None:
+            return pd.DataFrame()
+
+        cabecalho = [str(c).strip() if c is not None else "" for c in cabecalho]
+        colunas = colunas_necessarias(cabecalho)
+        indices = [cabecalho.index(c) for c in colunas]
+        if not indices:
+            return pd.DataFrame()
+
+        # Ler somente o intervalo de colunas que contém as colunas necessárias
+        primeira, ultima = min(indices), max(indices)
+        posicoes = [i - primeira for i in indices]
+        linhas = (
+            # Linhas curtas aparecem quando as últimas células estão vazias
+            tuple(linha[p] if p < len(linha) else None for p in posicoes)
+            for linha in ws.iter_rows(min_row=2, min_col=primeira + 1, max_col=ultima + 1, values_only=True)
+        )
+        return _montar_blocos(linhas, colunas, tamanho_bloco)
+    finally:
+        wb.close()
+
+def _detectar_codificacao(amostra):
+    try:
+        amostra.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A amostra pode terminar no meio de um caractere multibyte
+        if e.start >= len(amostra) - 3:
+            return "utf-8"
+        return CODIFICACAO_DATASUS
+
+def _ler_blocos_csv(fonte, separador, codificacao, colunas, tamanho_bloco):
+    leitor = pd.read_csv(
+        fonte,
+        sep=separador,
+        encoding=codificacao,
+        usecols=lambda c: c.strip() in colunas,
+        chunksize=tamanho_bloco,
+        low_memory=False
+    )
+    return [bloco.rename(columns=str.strip) for bloco in leitor]
+
+def ler_csv_projetado(fonte, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê apenas as colunas usadas pelo dashboard de um arquivo CSV.
+    O separador (vírgula ou ponto e vírgula) e a codificação são detectados
+    a partir do início do arquivo, e a leitura é feita em blocos. Se um
+    caractere inválido em UTF-8 aparecer depois da amostra, o arquivo é
+    lido novamente em latin-1.
+    """
+    amostra = fonte.read(64 * 1024)
+    fonte.seek(0)
+    codificacao = _detectar_codificacao(amostra)
+    primeira_linha = amostra.decode(codificacao, errors="ignore").splitlines()[0] if amostra else ""
+    try:
+        separador = csv.Sniffer().sniff(primeira_linha, delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+
+    cabecalho = [c.strip().strip('"') for c in primeira_linha.split(separador)]
+    colunas = colunas_necessarias(cabecalho)
+    if not colunas:
+        return pd.DataFrame()
+
+    try:
+        blocos = _ler_blocos_csv(fonte, separador, codificacao, colunas, tamanho_bloco)
+    except UnicodeDecodeError:
+        if codificacao == CODIFICACAO_DATASUS:
+            raise
+        fonte.seek(0)
+        blocos = _ler_blocos_csv(fonte, separador, CODIFICACAO_DATASUS, colunas, tamanho_bloco)
+    if not blocos:
+        return pd.DataFrame(columns=colunas)
+    if len(blocos) == 1:
+        return blocos[0]
+    return pd.concat(blocos, ignore_index=True)
+
+def _converter_campo_dbf(bruto, tipo, decimais):
+    """Converte o valor bruto de um campo DBF para o tipo Python correspondente"""
+    texto = bruto.decode(CODIFICACAO_DATASUS, errors="replace").strip()
+    if not texto:
+        return None
+    if tipo in ("N", "F"):
+        try:
+            return float(texto) if decimais or "." in texto else int(texto)
+        except ValueError:
+            return None
+    if tipo == "D":
+        try:
+            return datetime.strptime(texto, "%Y%m%d")
+        except ValueError:
+            return None
+    if tipo == "L":
+        return texto.upper() in ("T", "Y", "S")
+    return texto
+
+def ler_dbf_projetado(fonte, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê apenas as colunas usadas pelo dashboard de um arquivo DBF (dBase III),
+    formato dos microdados do DATASUS. Os registros são decodificados um a
+    um, sem carregar o arquivo inteiro em memória.
+    """
+    cabecalho = fonte.read(32)
+    if len(cabecalho) < 32:
+        return pd.DataFrame()
+    num_registros, tamanho_cabecalho, tamanho_registro = struct.unpack("<IHH", cabecalho[4:12])
+
+    # Descritores dos campos: blocos de 32 bytes até o terminador 0x0D
+    campos = []
+    deslocamento = 1  # O primeiro byte de cada registro indica exclusão
+    descritores = fonte.read(tamanho_cabecalho - 32)
+    for inicio in range(0, len(descritores) - 31, 32):
+        descritor = descritores[inicio:inicio + 32]
+        if descritor[0] == 0x0D:
+            break
+        nome = descritor[:11].split(b"\x00")[0].decode("ascii", errors="ignore").strip()
+        tipo = chr(descritor[11])
+        tamanho, decimais = descritor[16], descritor[17]
+        campos.append((nome, tipo, deslocamento, tamanho, decimais))
+        deslocamento += tamanho
+
+    colunas = colunas_necessarias([c[0] for c in campos])
+    selecionados = [c for c in campos if c[0] in colunas]
+    colunas = [c[0] for c in selecionados]
+    if not colunas:
+        return pd.DataFrame()
+
+    def registros():
+        for _ in range(num_registros):
+            registro = fonte.read(tamanho_registro)
+            if len(registro) < tamanho_registro:
+                break
+            if registro[:1] == b"*":
+                continue
+            yield tuple(
+                _converter_campo_dbf(registro[inicio:inicio + tamanho], tipo, decimais)
+                for _, tipo, inicio, tamanho, decimais in selecionados
+            )
+
+    return _montar_blocos(registros(), colunas, tamanho_bloco)
+
+def ler_dbc_projetado(fonte, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Lê um arquivo DBC do DATASUS (DBF compactado). A descompactação usa o
+    pacote opcional datasus-dbc; o DBF resultante é lido pelo leitor de DBF.
+    """
+    try:
+        from datasus_dbc import decompress
+    except ImportError:
+        raise ValueError("Para ler arquivos .dbc instale o pacote 'datasus-dbc'.")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_dbc = os.path.join(diretorio, "arquivo.dbc")
+        caminho_dbf = os.path.join(diretorio, "arquivo.dbf")
+        with open(caminho_dbc, "wb") as destino:
+            destino.write(fonte.read())
+        decompress(caminho_dbc, caminho_dbf)
+        with open(caminho_dbf, "rb") as dbf:
+            return ler_dbf_projetado(dbf, tamanho_bloco)
+
+# Leitores disponíveis por extensão de arquivo
+LEITORES = {
+    ".xlsx": ler_excel_projetado,
+    ".csv": ler_csv_projetado,
+    ".dbf": ler_dbf_projetado,
+    ".dbc": ler_dbc_projetado
+}
+
+def registrar_leitor(extensao, leitor):
+    """Registra um leitor para uma nova extensão de arquivo"""
+    LEITORES[extensao.lower()] = leitor
+
+def obter_leitor(nome_arquivo):
+    """Retorna o leitor adequado para o arquivo, de acordo com a extensão"""
+    extensao = os.path.splitext(nome_arquivo)[1].lower()
+    if extensao not in LEITORES:
+        raise ValueError(f"Formato de arquivo não suportado: {extensao or nome_arquivo}")
+    return LEITORES[extensao]
@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import ConjuntoEmDisco, calcular_indicadores_em_disco
+from ingestao import MAX_PROCESSOS, processar_em_paralelo
+from instrumentacao import configurar_logging, medir, resumir_execucao
+from leitores import LEITORES
+from mapa_reducao import MAPA_REDUCAO, calcular_indicadores_paralelo, criar_executor
+from metricas import calcular_todos_indicadores
+from particoes import definir_ano, inicializar_estado, liberar_disco, obter_conjunto, usar_disco
+from populacao import populacao_selecao
+
+logger = logging.getLogger(__name__)
+
+# População usada quando a tabela de população não cobre a seleção (mesmo valor do dashboard)
+POPULACAO_PADRAO = 211000000
+
+# Seções dos resultados, na ordem retornada por calcular_todos_indicadores
+SECOES = ["incidencia", "mortalidade", "tempos", "perfil"]
+
+# Valor aceito em --anos e --estados para representar todos os anos ou estados
+TODOS = "todos"
+
+# Dados compartilhados com os processos que calculam os agrupamentos
+_conjunto = None
+
+def carregar_diretorio(diretorio, max_processos=None, estado=None, diretorio_particoes=None):
+    """
+    Lê todos os arquivos anuais de um diretório pelo mesmo caminho de
+    ingestão do dashboard (leitores, normalização e cache em disco).
+    Os dados e agregados de cada ano são guardados em `estado` (por padrão,
+    um dicionário novo). Com `diretorio_particoes`, os anos são gravados em
+    Parquet nesse diretório (modo fora da memória).
+    Retorna o conjunto particionado com todos os anos.
+    """
+    nomes = [n for n in sorted(os.listdir(diretorio)) if os.path.splitext(n)[1].lower() in LEITORES]
+
+    estado = {} if estado is None else estado
+    inicializar_estado(estado)
+    # Fora da memória, ler no máximo um arquivo por processo de cada vez
+    tamanho_grupo = len(nomes) or 1
+    if diretorio_particoes:
+        usar_disco(estado, diretorio_particoes)
+        tamanho_grupo = max_processos or MAX_PROCESSOS
+
+    for inicio in range(0, len(nomes), tamanho_grupo):
+        arquivos = []
+        for nome in nomes[inicio:inicio + tamanho_grupo]:
+            with open(os.path.join(diretorio, nome), "rb") as arquivo:
+                arquivos.append((nome, arquivo.read()))
+        for nome, ano, df, erro in processar_em_paralelo(arquivos, max_processos):
+            if erro:
+                logger.error("erro ao processar arquivo", extra={"arquivo": nome, "erro": erro})
+                continue
+            definir_ano(estado, ano, df)
+    return obter_conjunto(estado)
+
+def interpretar_anos(especificacao, anos_disponiveis):
+    """Converte '2019,2021', '2019-2021' ou 'todos' na lista de anos"""
+    if especificacao == TODOS:
+        return list(anos_disponiveis)
+    anos = []
+    for parte in especificacao.split(","):
+        if "-" in parte:
+            inicio, fim = (int(x) for x in parte.split("-"))
+            anos.extend(range(inicio, fim + 1))
+        else:
+            anos.append(int(parte))
+    return [ano for ano in anos if ano in anos_disponiveis]
+
+def interpretar_estados(especificacao):
+    """Converte 'SP,RJ' na lista de estados; 'todos' resulta em lista vazia (sem filtro)"""
+    if especificacao == TODOS:
+        return []
+    return [uf.strip().upper() for uf in especificacao.split(",") if uf.strip()]
+
+def montar_agrupamentos(especificacoes_anos, especificacoes_estados, anos_disponiveis):
+    """Combina cada grupo de anos com cada grupo de estados"""
+    if not especificacoes_anos:
+        especificacoes_anos = [str(ano) for ano in anos_disponiveis] + [TODOS]
+    agrupamentos = []
+    for anos, estados in itertools.product(especificacoes_anos, especificacoes_estados or [TODOS]):
+        agrupamentos.append({
+            "nome": f"anos={anos};estados={estados}",
+            "anos": interpretar_anos(anos, anos_disponiveis),
+            "estados": interpretar_estados(estados)
+        })
+    return [a for a in agrupamentos if a["anos"]]
+
+def _inicializar_processo(conjunto):
+    global _conjunto
+    _conjunto = conjunto
+
+def calcular_agrupamento(agrupamento, conjunto=None, executor=None):
+    """
+    Calcula todos os indicadores de metricas para um agrupamento de anos e
+    estados. Com `executor` (mapa-redução), cada ano é agregado em um processo.
+    """
+    conjunto = conjunto or _conjunto
+    with medir("calcular_agrupamento", agrupamento=agrupamento["nome"]):
+        populacao = populacao_selecao(agrupamento["anos"], agrupamento["estados"]) or POPULACAO_PADRAO
+        if executor is not None:
+            indicadores = calcular_indicadores_paralelo(
+                conjunto, agrupamento["anos"], populacao, agrupamento["estados"], executor=executor
+            )
+        elif isinstance(conjunto, ConjuntoEmDisco):
+            indicadores = calcular_indicadores_em_disco(conjunto, agrupamento["anos"], populacao, agrupamento["estados"])
+        else:
+            df = conjunto.selecionar(agrupamento["anos"])
+            indicadores = calcular_todos_indicadores(df, populacao, agrupamento["estados"])
+    return {**agrupamento, "populacao": populacao, **dict(zip(SECOES, indicadores))}
+
+def calcular_agrupamentos(conjunto, agrupamentos, max_processos=None, mapa_reducao=MAPA_REDUCAO):
+    """
+    Calcula os agrupamentos em paralelo, um processo por agrupamento.
+    No modo mapa-redução, os agrupamentos são calculados um de cada vez,
+    com os anos de cada um distribuídos entre os processos.
+    """
+    if mapa_reducao:
+        with criar_executor(conjunto, max_processos) as executor:
+            return [calcular_agrupamento(a, conjunto, executor) for a in agrupamentos]
+    max_processos = min(max_processos or MAX_PROCESSOS, len(agrupamentos))
+    if max_processos <= 1:
+        return [calcular_agrupamento(a, conjunto) for a in agrupamentos]
+    with ProcessPoolExecutor(
+        max_workers=max_processos, initializer=_inicializar_processo, initargs=(conjunto,)
+    ) as executor:
+        return list(executor.map(calcular_agrupamento, agrupamentos))
+
+def _chave(chave):
+    """Chaves compostas (ex.: TOPOGRAF e LOCTUDET) viram texto separado por '|'"""
+    if isinstance(chave, tuple):
+        return "|".join(str(c) for c in chave)
+    return str(chave)
+
+def _valor(valor):
+    """Converte valores do numpy/pandas em tipos do Python"""
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, np.floating):
+        return None if np.isnan(valor) else float(valor)
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    return valor
+
+def serializar(valor):
+    """Converte os resultados (dicionários, Series, listas) em estruturas JSON"""
+    if isinstance(valor, pd.DataFrame):
+        return {_chave(i): serializar(linha.to_dict()) for i, linha in valor.iterrows()}
+    if isinstance(valor, (pd.Series, dict)):
+        return {_chave(k): serializar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [serializar(v) for v in valor]
+    return _valor(valor)
+
+def para_tabela(resultados):
+    """
+    Converte os resultados em uma tabela longa (uma linha por valor), com as
+    colunas AGRUPAMENTO, SECAO, INDICADOR, CHAVE, VALOR (numérico) e TEXTO.
+    """
+    linhas = []
+    for resultado in resultados:
+        for secao in SECOES:
+            for indicador, valor in serializar(resultado[secao]).items():
+                if isinstance(valor, dict):
+                    for chave, item in valor.items():
+                        linhas.append((resultado["nome"], secao, indicador, chave, item))
+                elif isinstance(valor, list):
+                    linhas.append((resultado["nome"], secao, indicador, None, json.dumps(valor, ensure_ascii=False)))
+                else:
+                    linhas.append((resultado["nome"], secao, indicador, None, valor))
+    tabela = pd.DataFrame(linhas, columns=["AGRUPAMENTO", "SECAO", "INDICADOR", "CHAVE", "VALOR"])
+    # Valores textuais (ex.: listas de estados) ficam em uma coluna separada
+    numericos = pd.to_numeric(tabela["VALOR"], errors="coerce")
+    tabela["TEXTO"] = tabela["VALOR"].where(numericos.isna() & tabela["VALOR"].notna()).astype("string")
+    tabela["VALOR"] = numericos
+    return tabela
+
+def gravar_resultados(resultados, caminho):
+    """Grava os resultados em JSON ou Parquet, conforme a extensão do arquivo"""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == ".json":
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(serializar(resultados), arquivo, ensure_ascii=False, indent=2, default=str)
+    elif extensao == ".parquet":
+        para_tabela(resultados).to_parquet(caminho, index=False)
+    else:
+        raise ValueError(f"Formato de saída não suportado: {extensao} (use .json ou .parquet)")
+    return caminho
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula os indicadores sem a interface do Streamlit")
+    parser.add_argument("diretorio", help="diretório com os arquivos anuais (xlsx, csv, dbf, dbc)")
+    parser.add_argument("--saida", required=True, help="arquivo de saída (.json ou .parquet)")
+    parser.add_argument("--anos", nargs="+", default=None,
+                        help="grupos de anos (ex.: 2019 2019-2021 2019,2021 todos); padrão: cada ano e todos")
+    parser.add_argument("--estados", nargs="+", default=None,
+                        help="grupos de estados (ex.: SP SP,RJ todos); padrão: todos")
+    parser.add_argument("--processos", type=int, default=None, help="número máximo de processos")
+    parser.add_argument("--disco", default=None,
+                        help="diretório das partições em Parquet (modo fora da memória, para bases maiores que a RAM)")
+    parser.add_argument("--mapa-reducao", action="store_true", default=MAPA_REDUCAO,
+                        help="agregar cada ano em um processo e combinar os parciais de cada agrupamento")
+    args = parser.parse_args()
+
+    configurar_logging()
+    estado = {}
+    try:
+        conjunto = carregar_diretorio(args.diretorio, args.processos, estado, args.disco)
+        if not conjunto.anos:
+            parser.error(f"nenhum arquivo anual encontrado em {args.diretorio}")
+
+        agrupamentos = montar_agrupamentos(args.anos, args.estados, conjunto.anos)
+        resultados = calcular_agrupamentos(conjunto, agrupamentos, args.processos, args.mapa_reducao)
+        gravar_resultados(resultados, args.saida)
+    finally:
+        liberar_disco(estado)
+    resumir_execucao("lote concluído")
+    logger.info("resultados gravados", extra={"saida": args.saida, "agrupamentos": len(resultados)})
+
+if __name__ == "__main__":
+    main()
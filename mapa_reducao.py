@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from armazenamento import COLUNAS_INDICADORES, ParticaoEmDisco, reduzir_lotes
+from cubo import combinar_parciais_indicadores, indicadores_da_parcial, parciais_indicadores
+from ingestao import MAX_PROCESSOS
+from instrumentacao import acrescentar_registros, iniciar_execucao, medir, registros_execucao
+from tendencias import COLUNAS_TENDENCIAS, agregar_tendencias, combinar_agregados_tendencias, tendencias_do_agregado
+
+# Modo mapa-redução: cada ano é agregado em um processo e os parciais são combinados
+MAPA_REDUCAO = os.environ.get("MAPA_REDUCAO", "0") == "1"
+
+# Conjunto compartilhado com os processos (herdado na criação, sem cópia por tarefa)
+_conjunto = None
+
+def _inicializar_processo(conjunto):
+    global _conjunto
+    _conjunto = conjunto
+
+def criar_executor(conjunto, max_processos=None):
+    """
+    Cria o pool de processos com o conjunto já carregado, para reaproveitá-lo
+    em várias chamadas de mapear_reduzir sobre o mesmo conjunto.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_processos or MAX_PROCESSOS, initializer=_inicializar_processo, initargs=(conjunto,)
+    )
+
+def mapear_ano(conjunto, ano, mapear, reduzir, argumentos=(), colunas=None):
+    """
+    Aplica `mapear` aos dados de um ano. Partições em disco são lidas em
+    lotes, combinados com `reduzir` dentro do próprio processo.
+    """
+    dados = conjunto.particao(ano)
+    with medir("mapear_ano", ano=ano, tarefa=mapear.__name__, linhas=len(dados)):
+        if isinstance(dados, ParticaoEmDisco):
+            return reduzir_lotes(dados.lotes(colunas), mapear, reduzir, argumentos)
+        return mapear(dados, *argumentos)
+
+def _mapear_ano_no_processo(ano, mapear, reduzir, argumentos, colunas):
+    """Executado em um processo separado: devolve também as etapas medidas"""
+    iniciar_execucao()
+    return mapear_ano(_conjunto, ano, mapear, reduzir, argumentos, colunas), registros_execucao()
+
+def mapear_reduzir(conjunto, anos, mapear, reduzir, argumentos=(), colunas=None, max_processos=None, executor=None):
+    """
+    Agrega cada ano selecionado em um processo (`mapear`) e combina os
+    parciais no processo atual (`reduzir`, que recebe a lista de parciais).
+    `executor`, quando informado, deve ter sido criado por criar_executor
+    com o mesmo conjunto.
+    """
+    anos = [ano for ano in sorted(set(anos)) if ano in conjunto.anos]
+    max_processos = min(max_processos or MAX_PROCESSOS, len(anos))
+    with medir("mapear_reduzir", tarefa=mapear.__name__, anos=len(anos)):
+        if executor is None and max_processos <= 1:
+            parciais = [mapear_ano(conjunto, ano, mapear, reduzir, argumentos, colunas) for ano in anos]
+        else:
+            proprio = executor is None
+            if proprio:
+                executor = criar_executor(conjunto, max_processos)
+            try:
+                parciais = []
+                for parcial, registros in executor.map(
+                    _mapear_ano_no_processo, anos,
+                    repeat(mapear), repeat(reduzir), repeat(argumentos), repeat(colunas)
+                ):
+                    # Trazer as medições dos processos para a execução atual
+                    acrescentar_registros(registros)
+                    parciais.append(parcial)
+            finally:
+                if proprio:
+                    executor.shutdown()
+        return reduzir(parciais)
+
+def calcular_indicadores_paralelo(conjunto, anos, populacao_total, estados_selecionados,
+                                  max_processos=None, executor=None):
+    """
+    Calcula os indicadores de metricas.calcular_todos_indicadores com um
+    cubo e as somas dos intervalos por ano, combinados ao final.
+    """
+    parcial = mapear_reduzir(
+        conjunto, anos, parciais_indicadores, combinar_parciais_indicadores,
+        colunas=COLUNAS_INDICADORES, max_processos=max_processos, executor=executor
+    )
+    return indicadores_da_parcial(parcial, populacao_total, estados_selecionados)
+
+def calcular_tendencias_paralelo(conjunto, anos, estados_selecionados=None, populacao_total=None,
+                                 max_processos=None, executor=None):
+    """Calcula as séries anuais somando os agregados de cada ano"""
+    agregado = mapear_reduzir(
+        conjunto, anos, agregar_tendencias, combinar_agregados_tendencias, (estados_selecionados,),
+        COLUNAS_TENDENCIAS, max_processos, executor
+    )
+    return tendencias_do_agregado(agregado, estados_selecionados, populacao_total)
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+# Quantidade padrão de combinações de filtros mantidas em cache
+MAX_ITENS_CACHE = 32
+
+# Marca de chave ausente (o valor guardado pode ser None)
+_AUSENTE = object()
+
+class CacheLRU:
+    """
+    Cache em memória com descarte do item usado há mais tempo (LRU).
+    Mantém contadores de acertos e falhas.
+    """
+
+    def __init__(self, max_itens=MAX_ITENS_CACHE):
+        self.max_itens = max_itens
+        self.itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, calcular):
+        """Retorna o valor da chave, calculando-o apenas se não estiver no cache"""
+        valor = self.buscar(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = calcular()
+            self.guardar(chave, valor)
+        return valor
+
+    def buscar(self, chave, padrao=None):
+        """Retorna o valor da chave (contando o acerto ou a falha), ou `padrao` se não estiver no cache"""
+        if chave in self.itens:
+            self.acertos += 1
+            self.itens.move_to_end(chave)
+            return self.itens[chave]
+        self.falhas += 1
+        return padrao
+
+    def guardar(self, chave, valor):
+        """Guarda o valor da chave, descartando os itens usados há mais tempo"""
+        self.itens[chave] = valor
+        self.itens.move_to_end(chave)
+        while len(self.itens) > self.max_itens:
+            self.itens.popitem(last=False)
+
+    def invalidar(self, condicao):
+        """Remove as entradas cujas chaves satisfazem a condição"""
+        for chave in [c for c in self.itens if condicao(c)]:
+            del self.itens[chave]
+
+    def limpar(self):
+        self.itens.clear()
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self.itens),
+            "max_itens": self.max_itens,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acertos": self.acertos / total if total else 0.0
+        }
+
+def normalizar_filtros(anos_selecionados, estados_selecionados):
+    """Converte a seleção de anos e estados em uma tupla estável para uso como chave"""
+    return (
+        tuple(sorted(set(anos_selecionados or []))),
+        tuple(sorted(set(estados_selecionados or [])))
+    )
+
+def chave_indicadores(versao_dados, anos_selecionados, estados_selecionados, *parametros):
+    """
+    Monta a chave do cache de indicadores: a versão dos dados dos anos
+    selecionados, os filtros normalizados e parâmetros adicionais.
+    """
+    return (versao_dados, normalizar_filtros(anos_selecionados, estados_selecionados)) + parametros
+
+def contem_ano(ano):
+    """Condição para invalidar as entradas que usam dados do ano informado"""
+    return lambda chave: ano in chave[1][0]
@@ -1,6 +1,21 @@
+import logging
+
 import pandas as pd
 import numpy as np
 
+from backends import obter_backend
+from instrumentacao import medir
+from intervalos import calcular_tempos
+from topografia import mascara_grupo
+
+logger = logging.getLogger(__name__)
+
+def _contar(serie):
+    """Conta os valores de uma coluna, ignorando categorias sem ocorrências"""
+    contagem = serie.value_counts()
+    return contagem[contagem > 0]
+
+@medir("calcular_indicadores_incidencia")
 def calcular_indicadores_incidencia(df, populacao_total, estados_selecionados):
     """Calcula indicadores de incidência considerando estados selecionados"""
     # Filtrar por estados selecionados
@@ -37,6 +52,7 @@ def calcular_indicadores_incidencia(df, populacao_total, estados_selecionados):
         "casos_c44": casos_c44
     }
 
+@medir("calcular_indicadores_mortalidade")
 def calcular_indicadores_mortalidade(df, estados_selecionados):
     """Calcula indicadores de mortalidade considerando estados selecionados"""
     # Filtrar por estados selecionados
@@ -60,10 +76,10 @@ def calcular_indicadores_mortalidade(df, estados_selecionados):
     obitos_pele = len(df_obitos_pele)
 
     # Mortalidade por sexo
-    mortalidade_sexo = df_obitos_pele.groupby("SEXO").size() if not df_obitos_pele.empty else {}
+    mortalidade_sexo = df_obitos_pele.groupby("SEXO", observed=True).size() if not df_obitos_pele.empty else {}
 
     # Mortalidade por idade
-    mortalidade_idade = df_obitos_pele.groupby("IDADE").size() if not df_obitos_pele.empty else {}
+    mortalidade_idade = df_obitos_pele.groupby("IDADE", observed=True).size() if not df_obitos_pele.empty else {}
 
     # Criar faixas etárias
     bins = [0, 18, 35, 50, 65, 80, 100]
@@ -79,23 +95,24 @@ def calcular_indicadores_mortalidade(df, estados_selecionados):
         mortalidade_faixas_etarias = {}
 
     # Mortalidade por raça/cor
-    mortalidade_raca = df_obitos_pele.groupby("RACACOR").size() if not df_obitos_pele.empty else {}
+    mortalidade_raca = df_obitos_pele.groupby("RACACOR", observed=True).size() if not df_obitos_pele.empty else {}
 
     # Mortalidade por estado (usando ESTADRES)
-    mortalidade_estado = df_obitos_pele.groupby("UF").size() if not df_obitos_pele.empty else {}
+    mortalidade_estado = df_obitos_pele.groupby("UF", observed=True).size() if not df_obitos_pele.empty else {}
 
     # Lista de estados únicos
-    estados = df_obitos_pele['UF'].unique().tolist() if not df_obitos_pele.empty else []
+    estados = sorted(df_obitos_pele['UF'].dropna().unique().tolist()) if not df_obitos_pele.empty else []
 
     # Mortalidade por tipo de câncer (C43 e C44)
-    mortalidade_c43_c44 = df_obitos_pele.groupby(["TOPOGRAF", "LOCTUDET", "LOCTUPRI"]).size() if not df_obitos_pele.empty else {}
-    print("Log: Agrupamento de mortalidade por TOPOGRAF, LOCTUDET e LOCTUPRI:")
-    print(mortalidade_c43_c44)
+    # LOCTUPRI já está em TOPOGRAF; LOCTUDET só existe quando veio no arquivo
+    colunas_tipo = [c for c in ["TOPOGRAF", "LOCTUDET"] if c in df_obitos_pele.columns]
+    mortalidade_c43_c44 = df_obitos_pele.groupby(colunas_tipo, observed=True).size() if not df_obitos_pele.empty else {}
+    logger.debug("agrupamento de mortalidade por tipo", extra={"grupos": len(mortalidade_c43_c44)})
 
     # Letalidade (óbitos/casos totais)
     df_pele = df[df["TOPOGRAF"].str.match("C4[34]", na=False)]
     if df_pele.empty:
-        print("Aviso: Nenhum caso encontrado para C43 ou C44.")
+        logger.warning("nenhum caso encontrado para C43 ou C44")
     else:
         # Filtrar óbitos
         df_obitos_pele = df_pele[df_pele["DATAOBITO"].notna()]
@@ -106,30 +123,31 @@ def calcular_indicadores_mortalidade(df, estados_selecionados):
 
         # Validar DataFrames
         if df_c43.empty:
-            print("Aviso: Nenhum caso encontrado para C43. Verifique os dados de entrada ou os filtros aplicados.")
+            logger.warning("nenhum caso encontrado para C43; verifique os dados de entrada ou os filtros aplicados")
         if df_c44.empty:
-            print("Aviso: Nenhum caso encontrado para C44. Verifique os dados de entrada ou os filtros aplicados.")
+            logger.warning("nenhum caso encontrado para C44; verifique os dados de entrada ou os filtros aplicados")
 
-        # Logs detalhados para validação
-        print("Casos totais de C43:", len(df_c43))
-        print("Óbitos por C43:", len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C43", na=False)]))
-        print("Casos totais de C44:", len(df_c44))
-        print("Óbitos por C44:", len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C44", na=False)]))
+        obitos_c43 = len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C43", na=False)])
+        obitos_c44 = len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C44", na=False)])
+        logger.debug("casos e óbitos por tipo", extra={
+            "casos_c43": len(df_c43), "obitos_c43": obitos_c43,
+            "casos_c44": len(df_c44), "obitos_c44": obitos_c44
+        })
 
         # Calcular letalidade
-        letalidade_c43 = (len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C43", na=False)]) / len(df_c43)) * 100 if len(df_c43) > 0 else 0
-        letalidade_c44 = (len(df_obitos_pele[df_obitos_pele["TOPOGRAF"].str.contains("C44", na=False)]) / len(df_c44)) * 100 if len(df_c44) > 0 else 0
+        letalidade_c43 = (obitos_c43 / len(df_c43)) * 100 if len(df_c43) > 0 else 0
+        letalidade_c44 = (obitos_c44 / len(df_c44)) * 100 if len(df_c44) > 0 else 0
 
         # Calcular letalidade geral
         letalidade = (len(df_obitos_pele) / len(df_pele)) * 100 if len(df_pele) > 0 else 0
 
         # Validar intervalos de letalidade
         if letalidade_c43 < 0 or letalidade_c43 > 100:
-            print("Erro: Letalidade de C43 fora do intervalo válido (0% a 100%).")
+            logger.error("letalidade de C43 fora do intervalo válido (0% a 100%)", extra={"letalidade": letalidade_c43})
         if letalidade_c44 < 0 or letalidade_c44 > 100:
-            print("Erro: Letalidade de C44 fora do intervalo válido (0% a 100%).")
+            logger.error("letalidade de C44 fora do intervalo válido (0% a 100%)", extra={"letalidade": letalidade_c44})
         if letalidade < 0 or letalidade > 100:
-            print("Erro: Letalidade geral fora do intervalo válido (0% a 100%).")
+            logger.error("letalidade geral fora do intervalo válido (0% a 100%)", extra={"letalidade": letalidade})
 
     # Retornar resultados
     return {
@@ -147,32 +165,173 @@ def calcular_indicadores_mortalidade(df, estados_selecionados):
         "letalidade_c44": letalidade_c44
     }
 
+@medir("calcular_tempos_medios")
 def calcular_tempos_medios(df):
     """Calcula tempos médios entre eventos"""
     df_pele = df[df["TOPOGRAF"].str.match("C4[34]", na=False)]
     
+    # Mesmo cálculo de intervalos usado na seção de tempos médios
+    _, resumo = calcular_tempos(df_pele)
+    
     # Tempo até início do tratamento
-    tempo_ate_tratamento = (df_pele["DATAINITRT"] - df_pele["DTDIAGNO"]).dt.days.mean()
+    tempo_ate_tratamento = resumo["DIFF_DTDIAGNO_DATAINITRT"]["media"]
     
     # Tempo até óbito
-    tempo_ate_obito = (df_pele["DATAOBITO"] - df_pele["DTDIAGNO"]).dt.days.mean()
+    tempo_ate_obito = resumo["DIFF_DTDIAGNO_DATAOBITO"]["media"]
     
     return {
         "tempo_ate_tratamento": tempo_ate_tratamento if not pd.isna(tempo_ate_tratamento) else 0,
         "tempo_ate_obito": tempo_ate_obito if not pd.isna(tempo_ate_obito) else 0
     }
 
+@medir("calcular_perfil_demografico")
 def calcular_perfil_demografico(df):
     """Calcula distribuições demográficas"""
     df_pele = df[df["TOPOGRAF"].str.match("C4[34]", na=False)]
     
     distribuicoes = {
-        "raca": df_pele["RACACOR"].value_counts(),
-        "idade": df_pele["IDADE"].value_counts(),
-        "sexo": df_pele["SEXO"].value_counts(),
-        "estado": df_pele["UF"].value_counts(),
-        "instrucao": df_pele["INSTRUC"].value_counts(),
-        "localizacao": df_pele["LOUCTUPRI"].value_counts()
+        "raca": _contar(df_pele["RACACOR"]),
+        "idade": _contar(df_pele["IDADE"]),
+        "sexo": _contar(df_pele["SEXO"]),
+        "estado": _contar(df_pele["UF"]),
+        "instrucao": _contar(df_pele["INSTRUC"]),
+        "localizacao": _contar(df_pele["LOUCTUPRI"])
     }
     
     return distribuicoes
+
+# Faixas etárias usadas nos indicadores de mortalidade
+FAIXAS_ETARIAS_LIMITES = [0, 18, 35, 50, 65, 80, 100]
+FAIXAS_ETARIAS_ROTULOS = ["0-17", "18-34", "35-49", "50-64", "65-79", "80+"]
+
+# Colunas das distribuições do perfil demográfico
+COLUNAS_PERFIL = {
+    "raca": "RACACOR",
+    "idade": "IDADE",
+    "sexo": "SEXO",
+    "estado": "UF",
+    "instrucao": "INSTRUC",
+    "localizacao": "LOUCTUPRI"
+}
+
+def marcar_cancer_pele(df):
+    """Retorna as máscaras de C43 e C44 a partir do índice de topografia"""
+    return mascara_grupo(df, "C43"), mascara_grupo(df, "C44")
+
+def _contagens(df, mascara, colunas, backend=None):
+    """Conta as combinações das colunas nas linhas selecionadas em um único agrupamento"""
+    return obter_backend(backend).contar(df, mascara, colunas)
+
+def _marginal(contagens, coluna):
+    """Soma as contagens combinadas para uma única coluna (ignorando ausentes)"""
+    if coluna not in (contagens.index.names or []):
+        return pd.Series(dtype="int64")
+    return contagens.groupby(level=coluna, observed=True).sum()
+
+@medir("calcular_todos_indicadores")
+def calcular_todos_indicadores(df, populacao_total, estados_selecionados, backend=None):
+    """
+    Calcula os indicadores de incidência, mortalidade, tempos e perfil com
+    as máscaras de câncer de pele calculadas uma única vez e um agrupamento
+    por conjunto de indicadores.
+    Os agrupamentos e médias são executados pelo backend informado
+    (nome ou objeto de backends.py; por padrão, backends.BACKEND_PADRAO).
+    Retorna os mesmos dicionários das funções individuais, nesta ordem.
+    """
+    backend = obter_backend(backend)
+    n = len(df)
+    c43, c44 = marcar_cancer_pele(df)
+    pele = c43 | c44
+    if estados_selecionados:
+        no_estado = df["UF"].isin(estados_selecionados).to_numpy(dtype=bool)
+    else:
+        no_estado = np.ones(n, dtype=bool)
+    if "DATAOBITO" in df.columns:
+        obito = df["DATAOBITO"].notna().to_numpy(dtype=bool)
+    else:
+        obito = np.zeros(n, dtype=bool)
+
+    # Incidência (estados selecionados)
+    casos_totais = int(no_estado.sum())
+    casos_pele = int((no_estado & pele).sum())
+    casos_c43 = int((no_estado & c43).sum())
+    casos_c44 = int((no_estado & c44).sum())
+    incidencia = {
+        "taxa_incidencia_geral": (casos_totais / populacao_total) * 100,
+        "taxa_incidencia_pele": (casos_pele / populacao_total) * 100,
+        "taxa_incidencia_c43": (casos_c43 / populacao_total) * 100,
+        "taxa_incidencia_c44": (casos_c44 / populacao_total) * 100,
+        "casos_totais": casos_totais,
+        "casos_pele": casos_pele,
+        "casos_c43": casos_c43,
+        "casos_c44": casos_c44
+    }
+
+    # Mortalidade (estados selecionados): um agrupamento sobre os óbitos por câncer de pele
+    mascara_obitos_pele = no_estado & obito & pele
+    obitos_pele = int(mascara_obitos_pele.sum())
+    colunas_tipo = [c for c in ["TOPOGRAF", "LOCTUDET"] if c in df.columns]
+    colunas_mortalidade = [c for c in ["SEXO", "IDADE", "RACACOR", "UF"] if c in df.columns]
+    if obitos_pele:
+        contagens = _contagens(df, mascara_obitos_pele, colunas_mortalidade + colunas_tipo, backend)
+        mortalidade_idade = _marginal(contagens, "IDADE")
+        faixas = pd.cut(
+            pd.Series(mortalidade_idade.index, dtype="float64"),
+            bins=FAIXAS_ETARIAS_LIMITES, labels=FAIXAS_ETARIAS_ROTULOS, right=False
+        )
+        # Todas as faixas aparecem, mesmo sem óbitos
+        mortalidade_faixas_etarias = (
+            pd.Series(mortalidade_idade.to_numpy()).groupby(faixas, observed=False).sum()
+            .reindex(FAIXAS_ETARIAS_ROTULOS, fill_value=0)
+        )
+        mortalidade_faixas_etarias.index.name = "FAIXA_ETARIA"
+        mortalidade_c43_c44 = contagens.groupby(level=colunas_tipo, observed=True).sum()
+        mortalidade = {
+            "mortalidade_sexo": _marginal(contagens, "SEXO"),
+            "mortalidade_idade": mortalidade_idade,
+            "faixas_etarias": mortalidade_faixas_etarias,
+            "mortalidade_raca": _marginal(contagens, "RACACOR"),
+            "mortalidade_estado": _marginal(contagens, "UF"),
+            "estados": sorted(df.loc[mascara_obitos_pele, "UF"].dropna().unique().tolist()) if "UF" in df.columns else [],
+            "mortalidade_c43_c44": mortalidade_c43_c44
+        }
+    else:
+        mortalidade = {
+            "mortalidade_sexo": {},
+            "mortalidade_idade": {},
+            "faixas_etarias": {},
+            "mortalidade_raca": {},
+            "mortalidade_estado": {},
+            "estados": [],
+            "mortalidade_c43_c44": {}
+        }
+
+    # Letalidade (óbitos/casos) por tipo de câncer
+    obitos_c43 = int((no_estado & obito & c43).sum())
+    obitos_c44 = int((no_estado & obito & c44).sum())
+    mortalidade = {
+        "obitos_total": int((no_estado & obito).sum()),
+        "obitos_pele": obitos_pele,
+        **mortalidade,
+        "letalidade": (obitos_pele / casos_pele) * 100 if casos_pele > 0 else 0,
+        "letalidade_c43": (obitos_c43 / casos_c43) * 100 if casos_c43 > 0 else 0,
+        "letalidade_c44": (obitos_c44 / casos_c44) * 100 if casos_c44 > 0 else 0
+    }
+
+    # Tempos e perfil: todos os casos de câncer de pele (sem filtro de estado)
+    medias = backend.medias_intervalos(df, pele)
+    tempo_ate_tratamento = medias["DIFF_DTDIAGNO_DATAINITRT"]
+    tempo_ate_obito = medias["DIFF_DTDIAGNO_DATAOBITO"]
+    tempos = {
+        "tempo_ate_tratamento": tempo_ate_tratamento if not pd.isna(tempo_ate_tratamento) else 0,
+        "tempo_ate_obito": tempo_ate_obito if not pd.isna(tempo_ate_obito) else 0
+    }
+
+    colunas_perfil = [c for c in dict.fromkeys(COLUNAS_PERFIL.values()) if c in df.columns]
+    contagens_perfil = _contagens(df, pele, colunas_perfil, backend)
+    perfil = {}
+    for nome, coluna in COLUNAS_PERFIL.items():
+        distribuicao = _marginal(contagens_perfil, coluna).sort_values(ascending=False)
+        perfil[nome] = distribuicao[distribuicao > 0].rename("count")
+
+    return incidencia, mortalidade, tempos, perfil
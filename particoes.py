@@ -0,0 +1,171 @@
+import itertools
+
+import pandas as pd
+
+from armazenamento import (
+    DIRETORIO_PARTICOES,
+    ConjuntoEmDisco,
+    DiretorioSessao,
+    gravar_particao,
+    remover_particao
+)
+from instrumentacao import medir
+
+# Agregados derivados de cada ano: nome -> função que recebe o DataFrame do ano
+DERIVADOS = {}
+
+# Contador global de versões: cada alteração de um ano recebe um número novo
+_versoes = itertools.count(1)
+
+def registrar_derivado(nome, funcao):
+    """Registra uma função que calcula um agregado a partir dos dados de um ano"""
+    DERIVADOS[nome] = funcao
+
+def inicializar_estado(estado):
+    """Cria as chaves usadas para guardar os dados por ano, se necessário"""
+    if "dados_por_ano" not in estado:
+        estado["dados_por_ano"] = {}
+    if "anos_disponiveis" not in estado:
+        estado["anos_disponiveis"] = []
+    if "versoes_por_ano" not in estado:
+        estado["versoes_por_ano"] = {}
+    if "derivados_por_ano" not in estado:
+        estado["derivados_por_ano"] = {}
+
+def usar_disco(estado, diretorio=DIRETORIO_PARTICOES):
+    """
+    Ativa o modo fora da memória: os dados de cada ano passam a ser gravados
+    em Parquet, em um subdiretório próprio do estado, e apenas os agregados
+    ficam na memória.
+    """
+    inicializar_estado(estado)
+    if not estado.get("diretorio_particoes"):
+        estado["diretorio_particoes"] = DiretorioSessao(diretorio)
+
+def liberar_disco(estado):
+    """Remove do disco as partições do estado e desativa o modo fora da memória"""
+    diretorio = estado.pop("diretorio_particoes", None)
+    if diretorio is not None:
+        diretorio.liberar()
+
+def _diretorio_particoes(estado):
+    """Caminho das partições do estado, ou None fora do modo em disco"""
+    diretorio = estado.get("diretorio_particoes")
+    return diretorio.caminho if diretorio is not None else None
+
+def definir_ano(estado, ano, df):
+    """
+    Adiciona ou substitui os dados de um ano.
+    Apenas os agregados desse ano são recalculados.
+    """
+    inicializar_estado(estado)
+    derivados = {}
+    for nome, funcao in DERIVADOS.items():
+        with medir(f"derivado.{nome}", ano=ano, linhas=len(df)):
+            derivados[nome] = funcao(df)
+    diretorio = _diretorio_particoes(estado)
+    if diretorio:
+        # Modo fora da memória: guardar apenas a referência ao arquivo do ano
+        with medir("gravar_particao", ano=ano, linhas=len(df)):
+            df = gravar_particao(diretorio, ano, df)
+    estado["dados_por_ano"][ano] = df
+    estado["versoes_por_ano"][ano] = next(_versoes)
+    estado["derivados_por_ano"][ano] = derivados
+    estado["anos_disponiveis"] = sorted(estado["dados_por_ano"])
+
+def remover_ano(estado, ano):
+    """Remove os dados e agregados de um ano"""
+    inicializar_estado(estado)
+    diretorio = _diretorio_particoes(estado)
+    if diretorio:
+        remover_particao(diretorio, ano)
+    estado["dados_por_ano"].pop(ano, None)
+    estado["versoes_por_ano"].pop(ano, None)
+    estado["derivados_por_ano"].pop(ano, None)
+    estado["anos_disponiveis"] = sorted(estado["dados_por_ano"])
+
+def obter_derivado(estado, nome, anos):
+    """Retorna o agregado registrado com o nome informado para cada ano"""
+    derivados = estado.get("derivados_por_ano", {})
+    return {ano: derivados[ano][nome] for ano in anos if nome in derivados.get(ano, {})}
+
+def versao_dos_dados(estado, anos=None):
+    """Identifica a versão dos dados dos anos informados (ou de todos)"""
+    versoes = estado.get("versoes_por_ano", {})
+    anos = sorted(versoes) if anos is None else sorted(anos)
+    return tuple((ano, versoes.get(ano)) for ano in anos)
+
+class ConjuntoParticionado:
+    """
+    Guarda os DataFrames de cada ano sem copiá-los. Adicionar, substituir
+    ou remover um ano não toca nos demais; a seleção de um único ano
+    devolve o próprio DataFrame e a de vários anos concatena apenas os
+    anos pedidos. A concatenação não fica guardada no conjunto (que vive
+    no session_state): quem a pede a descarta ao terminar o cálculo.
+    """
+
+    def __init__(self, dados_por_ano, versao=None):
+        self.anos = sorted(dados_por_ano)
+        self.versao = versao
+        self.particoes = dict(dados_por_ano)
+
+    def particao(self, ano):
+        """Retorna as linhas de um ano"""
+        return self.particoes[ano]
+
+    def selecionar(self, anos):
+        """
+        Retorna as linhas dos anos selecionados. Um único ano não é copiado;
+        vários anos são concatenados a cada chamada.
+        """
+        anos = tuple(sorted(a for a in set(anos) if a in self.particoes))
+        if not anos:
+            return next(iter(self.particoes.values()), pd.DataFrame()).iloc[0:0]
+        if len(anos) == 1:
+            return self.particoes[anos[0]]
+        with medir("concatenar_anos", anos=len(anos)):
+            partes = _unificar_categorias([self.particoes[ano] for ano in anos])
+            return pd.concat(partes, ignore_index=True)
+
+def _unificar_categorias(partes):
+    """
+    Usa as mesmas categorias em todos os anos, para que a concatenação
+    mantenha as colunas categóricas em vez de convertê-las para texto.
+    """
+    if len(partes) < 2:
+        return partes
+    colunas = [
+        coluna for coluna in partes[0].columns
+        if isinstance(partes[0][coluna].dtype, pd.CategoricalDtype)
+    ]
+    for coluna in colunas:
+        if not all(coluna in p.columns and isinstance(p[coluna].dtype, pd.CategoricalDtype) for p in partes):
+            continue
+        categorias = pd.Index([])
+        for parte in partes:
+            categorias = categorias.union(parte[coluna].cat.categories, sort=False)
+        tipo = pd.CategoricalDtype(categorias)
+        partes = [
+            p if p[coluna].dtype == tipo else p.assign(**{coluna: p[coluna].astype(tipo)})
+            for p in partes
+        ]
+    return partes
+
+def obter_conjunto(estado):
+    """
+    Retorna o conjunto particionado com todos os anos, recriando-o apenas
+    quando algum ano foi adicionado, substituído ou removido. A recriação
+    só referencia os DataFrames de cada ano, sem copiar dados.
+    No modo fora da memória, retorna um ConjuntoEmDisco com as partições.
+    """
+    inicializar_estado(estado)
+    versao = versao_dos_dados(estado)
+    conjunto = estado.get("conjunto")
+    if conjunto is not None and conjunto.versao == versao:
+        return conjunto
+    if _diretorio_particoes(estado):
+        conjunto = ConjuntoEmDisco(estado["dados_por_ano"], versao)
+    else:
+        conjunto = ConjuntoParticionado(estado["dados_por_ano"], versao)
+    estado["conjunto"] = conjunto
+    return conjunto
@@ -0,0 +1,214 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+from topografia import GRUPOS
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Tabela local de população por UF, ano, sexo e faixa etária.
+# O arquivo distribuído traz a população residente do Censo 2022 (IBGE) por UF,
+# sem estratificação (SEXO = 0, FAIXA_ETARIA = TOTAL); projeções por sexo e
+# faixa etária podem ser acrescentadas no mesmo formato.
+ARQUIVO_POPULACAO = os.environ.get("POPULACAO_ARQUIVO", os.path.join(DIRETORIO, "populacao.csv"))
+
+# População padrão mundial de Segi (por 100.000), usada na padronização por idade
+ARQUIVO_POPULACAO_PADRAO = os.path.join(DIRETORIO, "populacao_padrao.csv")
+
+# Faixas etárias quinquenais da população padrão
+FAIXAS_QUINQUENAIS_LIMITES = list(range(0, 85, 5)) + [np.inf]
+FAIXAS_QUINQUENAIS_ROTULOS = [f"{i:02d}-{i + 4:02d}" for i in range(0, 80, 5)] + ["80+"]
+
+FAIXA_TOTAL = "TOTAL"
+SEXO_TODOS = 0
+
+# Códigos IBGE das UFs, usados quando os dados trazem o código em vez da sigla
+CODIGOS_UF = {
+    11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
+    21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL",
+    28: "SE", 29: "BA", 31: "MG", 32: "ES", 33: "RJ", 35: "SP",
+    41: "PR", 42: "SC", 43: "RS", 50: "MS", 51: "MT", 52: "GO", 53: "DF"
+}
+
+# Taxas expressas por 100.000 habitantes
+POR_HABITANTES = 100000
+
+def normalizar_uf(serie):
+    """Converte códigos IBGE ou siglas em minúsculas para a sigla da UF"""
+    serie = pd.Series(serie, copy=False).astype(object)
+    codigos = pd.to_numeric(serie, errors="coerce")
+    siglas = serie.astype(str).str.strip().str.upper().where(serie.notna())
+    return siglas.where(codigos.isna(), codigos.map(CODIGOS_UF))
+
+@lru_cache(maxsize=None)
+def carregar_populacao(caminho=ARQUIVO_POPULACAO):
+    """Lê a tabela de população (UF, ANO, SEXO, FAIXA_ETARIA, POPULACAO)"""
+    tabela = pd.read_csv(caminho, dtype={"FAIXA_ETARIA": str})
+    tabela["UF"] = normalizar_uf(tabela["UF"])
+    tabela["ANO"] = tabela["ANO"].astype("int64")
+    tabela["SEXO"] = tabela["SEXO"].astype("int64")
+    tabela["POPULACAO"] = tabela["POPULACAO"].astype("float64")
+    return tabela
+
+@lru_cache(maxsize=None)
+def carregar_populacao_padrao(caminho=ARQUIVO_POPULACAO_PADRAO):
+    """Lê os pesos da população padrão por faixa etária quinquenal"""
+    padrao = pd.read_csv(caminho, dtype={"FAIXA_ETARIA": str})
+    return padrao.set_index("FAIXA_ETARIA")["POPULACAO"].astype("float64")
+
+def _linhas_populacao(tabela, por_sexo, por_faixa):
+    """
+    Seleciona as linhas da tabela no nível de detalhe pedido e as agrega
+    por UF, ANO e, se for o caso, SEXO e FAIXA_ETARIA.
+    """
+    tem_sexo = (tabela["SEXO"] != SEXO_TODOS).any()
+    tem_faixa = (tabela["FAIXA_ETARIA"] != FAIXA_TOTAL).any()
+    if (por_sexo and not tem_sexo) or (por_faixa and not tem_faixa):
+        return None
+
+    if por_sexo or not (tabela["SEXO"] == SEXO_TODOS).any():
+        tabela = tabela[tabela["SEXO"] != SEXO_TODOS]
+    else:
+        tabela = tabela[tabela["SEXO"] == SEXO_TODOS]
+    if por_faixa or not (tabela["FAIXA_ETARIA"] == FAIXA_TOTAL).any():
+        tabela = tabela[tabela["FAIXA_ETARIA"] != FAIXA_TOTAL]
+    else:
+        tabela = tabela[tabela["FAIXA_ETARIA"] == FAIXA_TOTAL]
+
+    chaves = ["UF", "ANO"] + (["SEXO"] if por_sexo else []) + (["FAIXA_ETARIA"] if por_faixa else [])
+    populacao = tabela.groupby(chaves, as_index=False)["POPULACAO"].sum()
+    if por_sexo:
+        # Mesmo tipo dos códigos de sexo dos casos
+        populacao["SEXO"] = populacao["SEXO"].astype("float64")
+    return populacao
+
+def _resolver_anos(combinacoes, populacao):
+    """
+    Associa cada combinação (UF, ANO) ao ano mais próximo disponível na
+    tabela de população daquela UF.
+    """
+    anos_tabela = populacao[["UF", "ANO"]].drop_duplicates().rename(columns={"ANO": "ANO_POPULACAO"})
+    anos_tabela["ANO"] = anos_tabela["ANO_POPULACAO"]
+    resolvidos = pd.merge_asof(
+        combinacoes.astype({"ANO": "int64"}).sort_values("ANO"),
+        anos_tabela.sort_values("ANO"),
+        on="ANO", by="UF", direction="nearest"
+    )
+    return resolvidos
+
+def populacao_selecao(anos, estados=None, caminho=ARQUIVO_POPULACAO):
+    """
+    Soma a população (pessoas-ano) dos estados e anos selecionados.
+    Retorna None quando a tabela não cobre a seleção.
+    """
+    populacao = _linhas_populacao(carregar_populacao(caminho), False, False)
+    ufs = normalizar_uf(pd.Series(list(estados))).unique() if estados else populacao["UF"].unique()
+    combinacoes = pd.MultiIndex.from_product([ufs, list(anos)], names=["UF", "ANO"]).to_frame(index=False)
+    if combinacoes.empty:
+        return None
+    resolvidos = _resolver_anos(combinacoes, populacao).merge(
+        populacao.rename(columns={"ANO": "ANO_POPULACAO"}), on=["UF", "ANO_POPULACAO"], how="left"
+    )
+    if resolvidos["POPULACAO"].isna().any():
+        return None
+    return float(resolvidos["POPULACAO"].sum())
+
+def anos_substituidos(anos, estados=None, caminho=ARQUIVO_POPULACAO):
+    """
+    Anos selecionados sem população na tabela, associados ao ano usado no
+    lugar (o mais próximo disponível). Retorna {ano: ano_populacao}.
+    """
+    populacao = _linhas_populacao(carregar_populacao(caminho), False, False)
+    ufs = normalizar_uf(pd.Series(list(estados))).unique() if estados else populacao["UF"].unique()
+    combinacoes = pd.MultiIndex.from_product([ufs, list(anos)], names=["UF", "ANO"]).to_frame(index=False)
+    if combinacoes.empty:
+        return {}
+    resolvidos = _resolver_anos(combinacoes, populacao).dropna(subset=["ANO_POPULACAO"])
+    resolvidos = resolvidos[resolvidos["ANO"] != resolvidos["ANO_POPULACAO"]]
+    return {
+        int(ano): int(grupo.mode().iloc[0])
+        for ano, grupo in resolvidos.groupby("ANO")["ANO_POPULACAO"]
+    }
+
+def _casos_por_estrato(cubo, estados_selecionados, grupo, por):
+    """Casos do grupo de topografia por UF, ANO e SEXO, com a faixa quinquenal quando há IDADE"""
+    cubo = cubo[cubo["GRUPO"].isin(GRUPOS[grupo])]
+    casos = pd.DataFrame({
+        "UF": normalizar_uf(cubo["UF"]).to_numpy(),
+        "ANO": cubo["ANO"].to_numpy(),
+        "CASOS": cubo["CASOS"].to_numpy()
+    })
+    if "SEXO" in por:
+        casos["SEXO"] = pd.to_numeric(cubo["SEXO"], errors="coerce").astype("float64").to_numpy()
+    casos["FAIXA_ETARIA"] = pd.cut(
+        pd.to_numeric(cubo["IDADE"], errors="coerce").astype("float64").to_numpy(),
+        bins=FAIXAS_QUINQUENAIS_LIMITES, labels=FAIXAS_QUINQUENAIS_ROTULOS, right=False
+    ).astype(object) if "IDADE" in cubo.columns else np.nan
+    if estados_selecionados:
+        casos = casos[casos["UF"].isin(normalizar_uf(pd.Series(list(estados_selecionados))))]
+    return casos
+
+def padronizacao_disponivel(caminho=ARQUIVO_POPULACAO):
+    """Indica se a tabela de população tem as faixas etárias exigidas pela taxa padronizada por idade"""
+    return bool((carregar_populacao(caminho)["FAIXA_ETARIA"] != FAIXA_TOTAL).any())
+
+@medir("calcular_taxas")
+def calcular_taxas(cubo, estados_selecionados=None, grupo="C43+C44", por=("UF",), caminho=ARQUIVO_POPULACAO,
+                   idades=None):
+    """
+    Calcula, para cada estrato (combinação das colunas em `por`, entre UF,
+    ANO e SEXO), os casos do grupo de topografia, a população, a taxa bruta
+    e a taxa padronizada por idade (método direto, população padrão de
+    Segi), ambas por 100.000 habitantes.
+    As idades vêm de `idades` (ex.: o marginal "idade" de cubo.combinar_marginais)
+    ou, se omitido, do próprio cubo. Sem idades, ou quando a tabela de
+    população não tem faixas etárias (caso da tabela distribuída, ver
+    padronizacao_disponivel), TAXA_PADRONIZADA fica vazia (NaN): a taxa é
+    indisponível, não zero.
+    """
+    por = list(por)
+    casos = _casos_por_estrato(cubo, estados_selecionados, grupo, por)
+    idades = cubo if idades is None else idades
+
+    tabela = carregar_populacao(caminho)
+    anos = sorted(cubo["ANO"].unique().tolist()) if "ANO" in cubo.columns else []
+    ufs = casos["UF"].dropna().unique()
+    combinacoes = pd.MultiIndex.from_product([ufs, anos], names=["UF", "ANO"]).to_frame(index=False)
+
+    # Taxa bruta: casos e população no nível do estrato
+    populacao = _linhas_populacao(tabela, "SEXO" in por, False)
+    casos_estrato = casos.groupby(por, dropna=True)["CASOS"].sum()
+    if populacao is not None and not combinacoes.empty:
+        resolvidos = _resolver_anos(combinacoes, populacao).merge(
+            populacao.rename(columns={"ANO": "ANO_POPULACAO"}), on=["UF", "ANO_POPULACAO"], how="left"
+        )
+        populacao_estrato = resolvidos.groupby(por)["POPULACAO"].sum(min_count=1)
+    else:
+        populacao_estrato = pd.Series(np.nan, index=casos_estrato.index)
+    taxas = pd.DataFrame({"CASOS": casos_estrato, "POPULACAO": populacao_estrato})
+    taxas["CASOS"] = taxas["CASOS"].fillna(0).astype("int64")
+    taxas["TAXA_BRUTA"] = taxas["CASOS"] / taxas["POPULACAO"] * POR_HABITANTES
+    taxas["TAXA_PADRONIZADA"] = np.nan
+
+    # Taxa padronizada: taxas específicas por faixa ponderadas pela população padrão
+    populacao_faixas = _linhas_populacao(tabela, "SEXO" in por, True)
+    if populacao_faixas is not None and "IDADE" in idades.columns and not combinacoes.empty:
+        casos_faixas = _casos_por_estrato(idades, estados_selecionados, grupo, por)
+        padrao = carregar_populacao_padrao()
+        resolvidos = _resolver_anos(combinacoes, populacao_faixas).merge(
+            populacao_faixas.rename(columns={"ANO": "ANO_POPULACAO"}), on=["UF", "ANO_POPULACAO"], how="left"
+        )
+        chaves = por + ["FAIXA_ETARIA"]
+        especificas = resolvidos.groupby(chaves)["POPULACAO"].sum().to_frame().join(
+            casos_faixas.groupby(chaves, dropna=True)["CASOS"].sum(), how="left"
+        ).fillna({"CASOS": 0})
+        pesos = especificas.index.get_level_values("FAIXA_ETARIA").map(padrao).to_numpy()
+        especificas["PONDERADA"] = especificas["CASOS"] / especificas["POPULACAO"] * pesos
+        taxas["TAXA_PADRONIZADA"] = (
+            especificas.groupby(level=por)["PONDERADA"].sum() / padrao.sum() * POR_HABITANTES
+        )
+
+    return taxas
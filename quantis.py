@@ -0,0 +1,178 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+from intervalos import calcular_intervalos
+from topografia import mascara_grupo
+
+# Precisão relativa dos esboços de quantis.
+# Garantia: para qualquer q, o valor estimado x' e o valor exato x do
+# elemento de posição floor(q * (n - 1)) na amostra ordenada satisfazem
+# |x' - x| <= PRECISAO_RELATIVA * |x| (verificado em tests/test_quantis.py).
+# Com 1%, intervalos de até 50 dias
+# ficam com erro menor que meio dia, e a precisão não depende de quantos
+# esboços foram combinados nem da ordem da combinação.
+# Memória: cerca de ln(max / min) / (2 * precisão) baldes por esboço
+# (uns 530 baldes para intervalos de 1 a 40.000 dias).
+PRECISAO_RELATIVA = 0.01
+
+# Percentis exibidos na aba Tempo
+PERCENTIS = [25, 50, 75, 90]
+
+# Chave usada para casos sem estado informado
+SEM_UF = "NI"
+
+class EsbocoQuantis:
+    """
+    Esboço de quantis combinável, com baldes em escala logarítmica
+    (no estilo do DDSketch). Zeros são contados à parte e valores
+    negativos ficam em baldes espelhados, pelo valor absoluto.
+    Esboços de partições diferentes são combinados somando as contagens
+    dos baldes, sem precisar das linhas originais.
+    """
+
+    def __init__(self, precisao=PRECISAO_RELATIVA):
+        self.precisao = precisao
+        self.gama = (1 + precisao) / (1 - precisao)
+        self._log_gama = math.log(self.gama)
+        # Balde i guarda os valores em (gama^(i-1), gama^i]
+        self.baldes = {}
+        self.baldes_negativos = {}
+        self.zeros = 0
+        self.contagem = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def adicionar(self, valores):
+        """Acrescenta valores ao esboço (NaN é ignorado)"""
+        valores = np.asarray(valores, dtype="float64")
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return self
+
+        positivos = valores[valores > 0]
+        negativos = -valores[valores < 0]
+        self.zeros += int(valores.size - positivos.size - negativos.size)
+        self._contar(self.baldes, positivos)
+        self._contar(self.baldes_negativos, negativos)
+
+        self.contagem += int(valores.size)
+        self.soma += float(valores.sum())
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        return self
+
+    def _contar(self, baldes, valores):
+        """Soma os valores positivos informados às contagens dos baldes"""
+        if valores.size == 0:
+            return
+        indices, quantidades = np.unique(
+            np.ceil(np.log(valores) / self._log_gama).astype("int64"), return_counts=True
+        )
+        for indice, quantidade in zip(indices.tolist(), quantidades.tolist()):
+            baldes[indice] = baldes.get(indice, 0) + quantidade
+
+    def mesclar(self, outro):
+        """Soma outro esboço, de mesma precisão, a este"""
+        if outro.precisao != self.precisao:
+            raise ValueError("Só é possível combinar esboços com a mesma precisão")
+        for baldes, outros in [(self.baldes, outro.baldes), (self.baldes_negativos, outro.baldes_negativos)]:
+            for indice, quantidade in outros.items():
+                baldes[indice] = baldes.get(indice, 0) + quantidade
+        self.zeros += outro.zeros
+        self.contagem += outro.contagem
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        return self
+
+    def quantil(self, q):
+        """Estimativa do quantil q (entre 0 e 1); NaN se o esboço estiver vazio"""
+        if not self.contagem:
+            return np.nan
+        posicao = math.floor(q * (self.contagem - 1))
+        # Ordem crescente: negativos (do maior valor absoluto ao menor), zeros e positivos
+        acumulado = 0
+        for indice in sorted(self.baldes_negativos, reverse=True):
+            acumulado += self.baldes_negativos[indice]
+            if acumulado > posicao:
+                return self._limitar(-self._representante(indice))
+        acumulado += self.zeros
+        if acumulado > posicao:
+            return 0.0
+        for indice in sorted(self.baldes):
+            acumulado += self.baldes[indice]
+            if acumulado > posicao:
+                return self._limitar(self._representante(indice))
+        return self.maximo
+
+    def _representante(self, indice):
+        """Valor do balde com erro relativo de no máximo `precisao` para todo o balde"""
+        return 2 * self.gama ** indice / (self.gama + 1)
+
+    def _limitar(self, estimativa):
+        # O valor exato está entre o mínimo e o máximo; limitar não aumenta o erro
+        return min(max(estimativa, self.minimo), self.maximo)
+
+    def media(self):
+        return self.soma / self.contagem if self.contagem else np.nan
+
+def combinar_esbocos(esbocos, precisao=PRECISAO_RELATIVA):
+    """Retorna um novo esboço com a combinação de todos os esboços informados"""
+    combinado = EsbocoQuantis(precisao)
+    for esboco in esbocos:
+        combinado.mesclar(esboco)
+    return combinado
+
+def esbocos_intervalos(df, precisao=PRECISAO_RELATIVA):
+    """
+    Constrói, para os casos de câncer de pele de um ano, um esboço por
+    estado e por intervalo (diagnóstico→tratamento e diagnóstico→óbito).
+    Retorna {uf: {coluna_intervalo: EsbocoQuantis}}.
+    """
+    df = df[mascara_grupo(df, "C43+C44")]
+    intervalos = calcular_intervalos(df)
+    if "UF" in df.columns:
+        ufs = df["UF"].astype(object).fillna(SEM_UF)
+    else:
+        ufs = pd.Series(SEM_UF, index=df.index)
+
+    esbocos = {}
+    for uf, linhas in intervalos.groupby(ufs, sort=False):
+        esbocos[uf] = {
+            coluna: EsbocoQuantis(precisao).adicionar(linhas[coluna].to_numpy())
+            for coluna in intervalos.columns
+        }
+    return esbocos
+
+@medir("resumir_esbocos")
+def resumir_esbocos(esbocos_por_ano, estados_selecionados=None, percentis=PERCENTIS):
+    """
+    Combina os esboços dos anos e estados selecionados e resume cada
+    intervalo com os mesmos campos de intervalos.resumir_intervalos,
+    mais os percentis pedidos.
+    """
+    por_intervalo = {}
+    for esbocos in esbocos_por_ano.values():
+        for uf, esbocos_uf in esbocos.items():
+            if estados_selecionados and uf not in estados_selecionados:
+                continue
+            for coluna, esboco in esbocos_uf.items():
+                por_intervalo.setdefault(coluna, []).append(esboco)
+
+    resumo = {}
+    for coluna, esbocos in por_intervalo.items():
+        combinado = combinar_esbocos(esbocos)
+        vazio = not combinado.contagem
+        resumo[coluna] = {
+            "casos": combinado.contagem,
+            "media": combinado.media(),
+            "mediana": combinado.quantil(0.5),
+            "minimo": np.nan if vazio else combinado.minimo,
+            "maximo": np.nan if vazio else combinado.maximo,
+            "percentis": {p: combinado.quantil(p / 100) for p in percentis}
+        }
+    return resumo
@@ -0,0 +1,157 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+from metricas import FAIXAS_ETARIAS_LIMITES, FAIXAS_ETARIAS_ROTULOS
+from topografia import mascara_grupo
+
+# Estratificações disponíveis na aba Tempo
+ESTRATIFICACOES = {
+    "tipo": "Tipo de câncer (C43 x C44)",
+    "sexo": "Sexo",
+    "uf": "Estado",
+    "faixa_etaria": "Faixa etária"
+}
+
+# Colunas lidas para calcular as curvas (topografia, datas e estratos)
+COLUNAS_SOBREVIDA = ["TOPOGRAF", "GRUPO_TOPOGRAF", "DTDIAGNO", "DATAINITRT", "DATAOBITO", "SEXO", "UF", "IDADE"]
+
+# Menor valor usado no logaritmo da sobrevida, para evitar log(0)
+_MINIMO_LOG = 1e-300
+
+def preparar_tempos(df, data_censura=None):
+    """
+    Calcula o tempo de seguimento (dias desde o diagnóstico) e o indicador
+    de óbito de cada caso. Casos sem óbito são censurados na data de censura,
+    que por padrão é a data mais recente registrada na base.
+    Retorna (tempos, eventos, mascara_validos).
+    """
+    diagnostico = df["DTDIAGNO"]
+    obito = df["DATAOBITO"] if "DATAOBITO" in df.columns else pd.Series(pd.NaT, index=df.index)
+    if data_censura is None:
+        datas = [df[c].max() for c in ["DTDIAGNO", "DATAINITRT", "DATAOBITO"] if c in df.columns]
+        datas = [d for d in datas if pd.notna(d)]
+        data_censura = max(datas) if datas else pd.Timestamp.today()
+
+    eventos = obito.notna().to_numpy()
+    fim = obito.fillna(pd.Timestamp(data_censura))
+    tempos = (fim - diagnostico).dt.days.to_numpy(dtype="float64")
+    validos = ~np.isnan(tempos) & (tempos >= 0)
+    return tempos, eventos, validos
+
+def estrato_por(df, estratificacao):
+    """Retorna a série com o rótulo do estrato de cada caso"""
+    if estratificacao == "tipo":
+        c43 = mascara_grupo(df, "C43")
+        c44 = mascara_grupo(df, "C44")
+        rotulos = np.where(c43, "C43", np.where(c44, "C44", None))
+        return pd.Series(rotulos, index=df.index)
+    if estratificacao == "sexo":
+        return df["SEXO"]
+    if estratificacao == "uf":
+        return df["UF"]
+    if estratificacao == "faixa_etaria":
+        return pd.cut(
+            pd.to_numeric(df["IDADE"], errors="coerce").astype("float64"),
+            bins=FAIXAS_ETARIAS_LIMITES, labels=FAIXAS_ETARIAS_ROTULOS, right=False
+        )
+    raise ValueError(f"Estratificação desconhecida: {estratificacao}")
+
+def _somar_por_estrato(valores, inicio_estrato):
+    """Soma acumulada que recomeça no início de cada estrato"""
+    acumulado = np.cumsum(valores)
+    base = np.where(inicio_estrato > 0, acumulado[inicio_estrato - 1], 0.0)
+    return acumulado - base
+
+def kaplan_meier(tempos, eventos, estratos=None, confianca=0.95):
+    """
+    Estima as curvas de Kaplan-Meier de todos os estratos de uma só vez,
+    com operações sobre arrays ordenados.
+    O intervalo de confiança usa a variância de Greenwood com a
+    transformação log(-log).
+    Retorna (curvas, resumo): as curvas com uma linha por estrato e tempo
+    com óbito ou censura, e o resumo com casos, óbitos e mediana (com
+    intervalo de confiança) de cada estrato.
+    """
+    tempos = np.asarray(tempos, dtype="float64")
+    eventos = np.asarray(eventos, dtype=bool)
+    if estratos is None:
+        estratos = np.zeros(len(tempos), dtype=object)
+        estratos[:] = "Todos"
+    rotulos, codigos = np.unique(np.asarray(estratos, dtype=str), return_inverse=True)
+
+    # Ordenar por estrato e tempo
+    ordem = np.lexsort((tempos, codigos))
+    codigos, tempos, eventos = codigos[ordem], tempos[ordem], eventos[ordem]
+
+    # Um grupo por par (estrato, tempo) distinto
+    novo = np.ones(len(tempos), dtype=bool)
+    novo[1:] = (codigos[1:] != codigos[:-1]) | (tempos[1:] != tempos[:-1])
+    inicio = np.flatnonzero(novo)
+    estrato_grupo = codigos[inicio]
+    tempo_grupo = tempos[inicio]
+    obitos = np.add.reduceat(eventos.astype("int64"), inicio) if len(inicio) else np.array([], dtype="int64")
+
+    # Em risco: casos do mesmo estrato com tempo maior ou igual
+    fim_estrato = np.searchsorted(codigos, estrato_grupo, side="right")
+    em_risco = fim_estrato - inicio
+    inicio_estrato = np.searchsorted(estrato_grupo, estrato_grupo, side="left")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_sobrevida = _somar_por_estrato(
+            np.log(np.maximum(1.0 - obitos / em_risco, _MINIMO_LOG)), inicio_estrato
+        )
+        sobrevida = np.exp(log_sobrevida)
+        sobrevida[sobrevida < _MINIMO_LOG * 1e10] = 0.0
+        termo_greenwood = np.where(em_risco > obitos, obitos / (em_risco * (em_risco - obitos)), 0.0)
+        variancia = _somar_por_estrato(termo_greenwood, inicio_estrato)
+
+        z = NormalDist().inv_cdf(0.5 + confianca / 2)
+        erro = np.sqrt(variancia) / np.abs(log_sobrevida)
+        ic_inferior = sobrevida ** np.exp(z * erro)
+        ic_superior = sobrevida ** np.exp(-z * erro)
+    # Sobrevida 1 (nenhum óbito ainda) ou 0: intervalo degenerado
+    sem_variacao = (sobrevida >= 1.0) | (sobrevida <= 0.0) | ~np.isfinite(erro)
+    ic_inferior = np.where(sem_variacao, sobrevida, ic_inferior)
+    ic_superior = np.where(sem_variacao, sobrevida, ic_superior)
+
+    curvas = pd.DataFrame({
+        "ESTRATO": rotulos[estrato_grupo],
+        "TEMPO": tempo_grupo,
+        "EM_RISCO": em_risco,
+        "OBITOS": obitos,
+        "SOBREVIDA": sobrevida,
+        "IC_INFERIOR": ic_inferior,
+        "IC_SUPERIOR": ic_superior
+    })
+
+    def primeiro_tempo(mascara):
+        """Primeiro tempo de cada estrato em que a máscara é verdadeira"""
+        resultado = np.full(len(rotulos), np.nan)
+        estratos_mascara, posicoes = np.unique(estrato_grupo[mascara], return_index=True)
+        resultado[estratos_mascara] = tempo_grupo[mascara][posicoes]
+        return resultado
+
+    resumo = pd.DataFrame({
+        "CASOS": np.bincount(codigos, minlength=len(rotulos)),
+        "OBITOS": np.bincount(codigos, weights=eventos, minlength=len(rotulos)).astype("int64"),
+        "MEDIANA": primeiro_tempo(sobrevida <= 0.5),
+        "MEDIANA_IC_INFERIOR": primeiro_tempo(ic_inferior <= 0.5),
+        "MEDIANA_IC_SUPERIOR": primeiro_tempo(ic_superior <= 0.5)
+    }, index=pd.Index(rotulos, name="ESTRATO"))
+
+    return curvas, resumo
+
+@medir("calcular_sobrevida")
+def calcular_sobrevida(df, estratificacao="tipo", data_censura=None, confianca=0.95):
+    """
+    Calcula as curvas de sobrevida dos casos de câncer de pele (C43 + C44)
+    para a estratificação escolhida.
+    """
+    df = df[mascara_grupo(df, "C43+C44")]
+    tempos, eventos, validos = preparar_tempos(df, data_censura)
+    estratos = estrato_por(df, estratificacao)
+    validos &= estratos.notna().to_numpy()
+    return kaplan_meier(tempos[validos], eventos[validos], estratos[validos].to_numpy(), confianca)
@@ -1,7 +1,23 @@
+import logging
+
 import streamlit as st
+import pandas as pd
 import plotly.express as px
-from visualizations import criar_grafico_pizza, criar_grafico_barras, criar_card_estatistico
+from visualizations import (
+    criar_grafico_pizza,
+    criar_grafico_barras,
+    criar_card_estatistico,
+    criar_grafico_sobrevida,
+    criar_grafico_linha
+)
+from cache_figuras import figura_em_cache
+from instrumentacao import medir
+from sobrevida import ESTRATIFICACOES
+from tendencias import INDICADORES_TENDENCIA, variacao_anual
+
+logger = logging.getLogger(__name__)
 
+@medir("mostrar_tab_letalidade")
 def mostrar_tab_letalidade(indicadores_mortalidade):
     """Aba Letalidade"""
     st.header("Letalidade")
@@ -24,6 +40,7 @@ def mostrar_tab_letalidade(indicadores_mortalidade):
             f"{indicadores_mortalidade['letalidade_c44'] * 100:.2f}%"
         )
 
+@medir("mostrar_tab_incidencia")
 def mostrar_tab_incidencia(indicadores_incidencia):
     """Tab para indicadores de incidência"""
     st.header("Indicadores de Incidência")
@@ -60,6 +77,30 @@ def mostrar_tab_incidencia(indicadores_incidencia):
             f"{indicadores_incidencia['taxa_incidencia_c44'] * 100:.2f}%"
         )
 
+    # Taxas por 100.000 habitantes calculadas com a tabela de população
+    taxas = indicadores_incidencia.get('taxas_por_estado')
+    if taxas is not None and not taxas.empty:
+        st.subheader("Taxas por estado (C43 + C44, por 100.000 habitantes)")
+        st.dataframe(taxas.rename(columns={
+            "CASOS": "Casos",
+            "POPULACAO": "População",
+            "TAXA_BRUTA": "Taxa bruta",
+            "TAXA_PADRONIZADA": "Taxa padronizada por idade"
+        }))
+        if not indicadores_incidencia.get('padronizacao_disponivel', True):
+            st.caption(
+                "Taxa padronizada por idade indisponível: a tabela de população não tem "
+                "faixas etárias (informe uma tabela por sexo e faixa etária em POPULACAO_ARQUIVO)."
+            )
+
+    # Anos sem população na tabela usam o ano disponível mais próximo
+    substituidos = indicadores_incidencia.get('anos_populacao_substituidos')
+    if substituidos:
+        st.caption("População estimada com o ano mais próximo disponível: " + ", ".join(
+            f"{ano} → {ano_populacao}" for ano, ano_populacao in sorted(substituidos.items())
+        ))
+
+@medir("mostrar_tab_mortalidade")
 def mostrar_tab_mortalidade(indicadores_mortalidade):
     """Tab para indicadores de mortalidade"""
     st.header("Mortalidade")
@@ -75,7 +116,8 @@ def mostrar_tab_mortalidade(indicadores_mortalidade):
 
     # Gráfico por sexo
     st.markdown("<h4 style='color:#fff;'>Por sexo</h4>", unsafe_allow_html=True)
-    fig_sexo = criar_grafico_pizza(
+    fig_sexo = figura_em_cache(
+        criar_grafico_pizza,
         indicadores_mortalidade['mortalidade_sexo'],
         'SEXO',
         'Mortalidade por Sexo'
@@ -84,7 +126,8 @@ def mostrar_tab_mortalidade(indicadores_mortalidade):
 
     # Gráfico de coluna para C43 e C44
     st.markdown("<h4 style='color:#fff;'>Mortalidade por Câncer de Pele (C43 e C44)</h4>", unsafe_allow_html=True)
-    fig_c43_c44 = criar_grafico_barras(
+    fig_c43_c44 = figura_em_cache(
+        criar_grafico_barras,
         indicadores_mortalidade['mortalidade_c43_c44'].reset_index(),
         'TOPOGRAF',
         0,
@@ -92,23 +135,24 @@ def mostrar_tab_mortalidade(indicadores_mortalidade):
     )
     st.plotly_chart(fig_c43_c44)
 
-def mostrar_tab_tempos(indicadores_tempos):
-    """Tab para tempos médios"""
+@medir("mostrar_tab_tempos")
+def mostrar_tab_tempos(indicadores_tempos, calcular_sobrevida=None):
+    """
+    Tab para tempos médios e curvas de sobrevida.
+    calcular_sobrevida recebe a estratificação escolhida e retorna (curvas, resumo).
+    """
     st.header("Tempo")
 
-    # Adicionar logs para validação
-    print("Log: Tempo médio até tratamento (dias):", indicadores_tempos['tempo_ate_tratamento'])
-    print("Log: Tempo médio até óbito (dias):", indicadores_tempos['tempo_ate_obito'])
-
     # Converter tempos médios para dias e horas
     tempo_tratamento_dias = int(indicadores_tempos['tempo_ate_tratamento'])
     tempo_tratamento_horas = int((indicadores_tempos['tempo_ate_tratamento'] % 1) * 24)
     tempo_obito_dias = int(indicadores_tempos['tempo_ate_obito'])
     tempo_obito_horas = int((indicadores_tempos['tempo_ate_obito'] % 1) * 24)
 
-    # Logs detalhados
-    print(f"Tempo médio até tratamento: {tempo_tratamento_dias} dias e {tempo_tratamento_horas} horas")
-    print(f"Tempo médio até óbito: {tempo_obito_dias} dias e {tempo_obito_horas} horas")
+    logger.debug("tempos médios", extra={
+        "tempo_ate_tratamento": indicadores_tempos['tempo_ate_tratamento'],
+        "tempo_ate_obito": indicadores_tempos['tempo_ate_obito']
+    })
 
     # Exibir tempos médios em dias e horas
     st.metric(
@@ -120,18 +164,63 @@ def mostrar_tab_tempos(indicadores_tempos):
         f"{tempo_obito_dias} dias e {tempo_obito_horas} horas"
     )
 
+    # Mediana e percentis (estimados por esboços de quantis, erro relativo de até 1%)
+    distribuicao = indicadores_tempos.get("distribuicao", {})
+    if distribuicao:
+        st.subheader("Distribuição dos tempos (dias)")
+        nomes = {
+            "DIFF_DTDIAGNO_DATAINITRT": "Diagnóstico → tratamento",
+            "DIFF_DTDIAGNO_DATAOBITO": "Diagnóstico → óbito"
+        }
+        linhas = {}
+        for coluna, resumo_intervalo in distribuicao.items():
+            linha = {"Casos": resumo_intervalo["casos"], "Mínimo": resumo_intervalo["minimo"]}
+            linha.update({f"P{p}": valor for p, valor in resumo_intervalo["percentis"].items()})
+            linha["Máximo"] = resumo_intervalo["maximo"]
+            linhas[nomes.get(coluna, coluna)] = linha
+        st.dataframe(pd.DataFrame.from_dict(linhas, orient="index").round(1))
+        st.caption("Percentis estimados com erro relativo de até 1% (P50 = mediana), respeitando o filtro de estados.")
+
+    if calcular_sobrevida is None:
+        return
+
+    # Curvas de sobrevida (Kaplan-Meier); casos sem óbito são censurados na data mais recente da base
+    st.subheader("Sobrevida após o diagnóstico (Kaplan-Meier)")
+    estratificacao = st.selectbox(
+        "Comparar curvas por",
+        list(ESTRATIFICACOES),
+        format_func=ESTRATIFICACOES.get,
+        key="estratificacao_sobrevida"
+    )
+    curvas, resumo = calcular_sobrevida(estratificacao)
+    if curvas.empty:
+        st.info("Não há casos de câncer de pele com datas suficientes para estimar a sobrevida.")
+        return
+    st.plotly_chart(criar_grafico_sobrevida(curvas, "Curvas de sobrevida"))
+    st.dataframe(resumo.rename(columns={
+        "CASOS": "Casos",
+        "OBITOS": "Óbitos",
+        "MEDIANA": "Mediana (dias)",
+        "MEDIANA_IC_INFERIOR": "IC 95% inferior",
+        "MEDIANA_IC_SUPERIOR": "IC 95% superior"
+    }))
+    st.caption("Mediana vazia: a sobrevida do estrato não chegou a 50% no período observado.")
+
+@medir("mostrar_tab_perfil")
 def mostrar_tab_perfil(indicadores_perfil):
     """Tab para perfil demográfico"""
     st.header("Mapeamento de Perfil de Pacientes")
     st.subheader("Distribuição por raça/cor")
-    fig_raca = criar_grafico_pizza(
+    fig_raca = figura_em_cache(
+        criar_grafico_pizza,
         indicadores_perfil['raca'],
         'RACACOR',
         'Distribuição por Raça/Cor'
     )
     st.plotly_chart(fig_raca)
     st.subheader("Distribuição por idade")
-    fig_idade = criar_grafico_barras(
+    fig_idade = figura_em_cache(
+        criar_grafico_barras,
         indicadores_perfil['idade'],
         'IDADE',
         0,
@@ -139,14 +228,16 @@ def mostrar_tab_perfil(indicadores_perfil):
     )
     st.plotly_chart(fig_idade)
     st.subheader("Distribuição por sexo")
-    fig_sexo = criar_grafico_pizza(
+    fig_sexo = figura_em_cache(
+        criar_grafico_pizza,
         indicadores_perfil['sexo'],
         'SEXO',
         'Distribuição por Sexo'
     )
     st.plotly_chart(fig_sexo)
     st.subheader("Distribuição por estado")
-    fig_estado = criar_grafico_barras(
+    fig_estado = figura_em_cache(
+        criar_grafico_barras,
         indicadores_perfil['estado'],
         'UF',
         0,
@@ -154,7 +245,8 @@ def mostrar_tab_perfil(indicadores_perfil):
     )
     st.plotly_chart(fig_estado)
     st.subheader("Distribuição por grau de instrução")
-    fig_instrucao = criar_grafico_barras(
+    fig_instrucao = figura_em_cache(
+        criar_grafico_barras,
         indicadores_perfil['instrucao'],
         'INSTRUC',
         0,
@@ -162,10 +254,48 @@ def mostrar_tab_perfil(indicadores_perfil):
     )
     st.plotly_chart(fig_instrucao)
     st.subheader("Localização do Tumor")
-    fig_localizacao = criar_grafico_barras(
+    fig_localizacao = figura_em_cache(
+        criar_grafico_barras,
         indicadores_perfil['localizacao'],
         'LOUCTUPRI',
         0,
         'Localização do Tumor'
     )
     st.plotly_chart(fig_localizacao)
+
+@medir("mostrar_tab_tendencias")
+def mostrar_tab_tendencias(tendencias):
+    """Tab com a evolução anual dos indicadores e a variação entre anos"""
+    st.header("Tendências")
+
+    if len(tendencias) < 2:
+        st.info("São necessários dados de pelo menos dois anos para analisar tendências.")
+        return
+
+    selecionados = st.multiselect(
+        "Indicadores",
+        list(INDICADORES_TENDENCIA),
+        default=["casos_pele", "obitos_pele"],
+        format_func=INDICADORES_TENDENCIA.get,
+        key="indicadores_tendencia"
+    )
+    if not selecionados:
+        st.warning("Selecione pelo menos um indicador.")
+        return
+
+    series = tendencias[selecionados].rename(columns=INDICADORES_TENDENCIA).reset_index()
+    rotulos = [INDICADORES_TENDENCIA[i] for i in selecionados]
+    fig = criar_grafico_linha(series, "ANO", rotulos, "Evolução anual dos indicadores")
+    st.plotly_chart(fig)
+
+    # Variação em relação ao ano anterior
+    absoluta, percentual = variacao_anual(tendencias[selecionados])
+    st.subheader("Variação em relação ao ano anterior")
+    variacoes = {}
+    for indicador in selecionados:
+        rotulo = INDICADORES_TENDENCIA[indicador]
+        variacoes[(rotulo, "Valor")] = tendencias[indicador]
+        variacoes[(rotulo, "Variação")] = absoluta[indicador]
+        variacoes[(rotulo, "Variação (%)")] = percentual[indicador]
+    st.dataframe(pd.DataFrame(variacoes).round(2))
+    st.caption("Casos, letalidade e tempos pelo ano do diagnóstico; óbitos pelo ano do óbito.")
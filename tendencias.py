@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacao import medir
+from intervalos import calcular_intervalos
+from populacao import populacao_selecao
+from topografia import mascara_grupo
+
+# Indicadores das séries anuais, na ordem das colunas, com o rótulo exibido
+INDICADORES_TENDENCIA = {
+    "casos_totais": "Casos (todos os tipos)",
+    "casos_pele": "Casos de câncer de pele",
+    "casos_c43": "Casos C43",
+    "casos_c44": "Casos C44",
+    "taxa_incidencia_pele": "Taxa de incidência de câncer de pele",
+    "taxa_incidencia_c43": "Taxa de incidência C43",
+    "taxa_incidencia_c44": "Taxa de incidência C44",
+    "obitos_total": "Óbitos (todos os tipos)",
+    "obitos_pele": "Óbitos por câncer de pele",
+    "obitos_c43": "Óbitos C43",
+    "obitos_c44": "Óbitos C44",
+    "letalidade": "Letalidade do câncer de pele (%)",
+    "letalidade_c43": "Letalidade C43 (%)",
+    "letalidade_c44": "Letalidade C44 (%)",
+    "tempo_ate_tratamento": "Tempo médio até o tratamento (dias)",
+    "tempo_ate_obito": "Tempo médio até o óbito (dias)"
+}
+
+def _razao(numerador, denominador, fator=1):
+    """Divisão por ano que resulta em 0 quando não há denominador"""
+    return (numerador / denominador.where(denominador > 0) * fator).fillna(0)
+
+# Colunas lidas para calcular as séries anuais
+COLUNAS_TENDENCIAS = ["ANO_DIAGNO", "ANO_OBITO", "UF", "TOPOGRAF", "GRUPO_TOPOGRAF",
+                      "DTDIAGNO", "DATAINITRT", "DATAOBITO"]
+
+def agregar_tendencias(df, estados_selecionados=None):
+    """
+    Soma, por (ANO_DIAGNO, ANO_OBITO), os casos, óbitos e intervalos usados
+    nas séries anuais, em um único groupby. Os agregados de partes
+    diferentes dos dados podem ser somados com combinar_agregados_tendencias.
+    """
+    if estados_selecionados and "UF" in df.columns:
+        df = df[df["UF"].isin(estados_selecionados)]
+    if df.empty or "ANO_DIAGNO" not in df.columns:
+        return None
+
+    c43 = mascara_grupo(df, "C43")
+    c44 = mascara_grupo(df, "C44")
+    pele = c43 | c44
+    obito = df["DATAOBITO"].notna().to_numpy() if "DATAOBITO" in df.columns else np.zeros(len(df), dtype=bool)
+    intervalos = calcular_intervalos(df[pele])
+    tratamento = intervalos["DIFF_DTDIAGNO_DATAINITRT"].reindex(df.index)
+    ate_obito = intervalos["DIFF_DTDIAGNO_DATAOBITO"].reindex(df.index)
+
+    base = pd.DataFrame({
+        "ANO_DIAGNO": df["ANO_DIAGNO"],
+        "ANO_OBITO": df["ANO_OBITO"] if "ANO_OBITO" in df.columns else np.nan,
+        "casos_totais": 1,
+        "casos_pele": pele,
+        "casos_c43": c43,
+        "casos_c44": c44,
+        "obitos_total": obito,
+        "obitos_pele": obito & pele,
+        "obitos_c43": obito & c43,
+        "obitos_c44": obito & c44,
+        "soma_tratamento": tratamento,
+        "n_tratamento": tratamento.notna(),
+        "soma_obito": ate_obito,
+        "n_obito": ate_obito.notna()
+    }, index=df.index)
+
+    return base.groupby(["ANO_DIAGNO", "ANO_OBITO"], dropna=False).sum()
+
+def combinar_agregados_tendencias(agregados):
+    """Soma os agregados de partes diferentes dos dados (ex.: anos ou lotes de linhas)"""
+    agregados = [a for a in agregados if a is not None]
+    if not agregados:
+        return None
+    if len(agregados) == 1:
+        return agregados[0]
+    return pd.concat(agregados).reset_index().groupby(["ANO_DIAGNO", "ANO_OBITO"], dropna=False).sum()
+
+def tendencias_do_agregado(agregado, estados_selecionados=None, populacao_total=None):
+    """
+    Calcula as séries anuais a partir do agregado por (ANO_DIAGNO, ANO_OBITO).
+    Casos, letalidade e tempos são contados no ano do diagnóstico; óbitos,
+    no ano do óbito. A série cobre apenas os anos de diagnóstico: óbitos
+    em anos posteriores, sem casos diagnosticados, não viram anos com zero
+    caso. A população de cada ano vem da tabela de população (ou de
+    populacao_total, quando a tabela não cobre o ano).
+    Retorna um DataFrame indexado por ANO com uma coluna por indicador.
+    """
+    if agregado is None or agregado.empty:
+        return pd.DataFrame(columns=list(INDICADORES_TENDENCIA), index=pd.Index([], name="ANO"))
+
+    # Os dois anos são obtidos somando as margens do agregado
+    por_diagnostico = agregado.groupby(level="ANO_DIAGNO").sum()
+    por_obito = agregado.groupby(level="ANO_OBITO").sum()
+
+    por_diagnostico = por_diagnostico[por_diagnostico.index.notna()]
+    por_obito = por_obito[por_obito.index.notna()]
+    anos = por_diagnostico.index.astype("int64")
+    por_diagnostico = por_diagnostico.set_axis(anos)
+    por_obito = por_obito.set_axis(por_obito.index.astype("int64")).reindex(anos, fill_value=0)
+
+    populacao = pd.Series(
+        [populacao_selecao([ano], estados_selecionados) or populacao_total or np.nan for ano in anos],
+        index=anos, dtype="float64"
+    )
+
+    tendencias = pd.DataFrame(index=pd.Index(anos, name="ANO"))
+    for coluna in ["casos_totais", "casos_pele", "casos_c43", "casos_c44"]:
+        tendencias[coluna] = por_diagnostico[coluna].astype("int64")
+    for sufixo in ["pele", "c43", "c44"]:
+        tendencias[f"taxa_incidencia_{sufixo}"] = _razao(por_diagnostico[f"casos_{sufixo}"], populacao, 100)
+    for coluna in ["obitos_total", "obitos_pele", "obitos_c43", "obitos_c44"]:
+        tendencias[coluna] = por_obito[coluna].astype("int64")
+    # Letalidade da coorte diagnosticada no ano
+    tendencias["letalidade"] = _razao(por_diagnostico["obitos_pele"], por_diagnostico["casos_pele"], 100)
+    tendencias["letalidade_c43"] = _razao(por_diagnostico["obitos_c43"], por_diagnostico["casos_c43"], 100)
+    tendencias["letalidade_c44"] = _razao(por_diagnostico["obitos_c44"], por_diagnostico["casos_c44"], 100)
+    tendencias["tempo_ate_tratamento"] = _razao(por_diagnostico["soma_tratamento"], por_diagnostico["n_tratamento"])
+    tendencias["tempo_ate_obito"] = _razao(por_diagnostico["soma_obito"], por_diagnostico["n_obito"])
+    return tendencias
+
+@medir("calcular_tendencias")
+def calcular_tendencias(df, estados_selecionados=None, populacao_total=None):
+    """
+    Calcula a série anual de cada indicador de incidência, mortalidade,
+    letalidade e tempo com um único groupby por (ANO_DIAGNO, ANO_OBITO).
+    Retorna um DataFrame indexado por ANO com uma coluna por indicador.
+    """
+    agregado = agregar_tendencias(df, estados_selecionados)
+    return tendencias_do_agregado(agregado, estados_selecionados, populacao_total)
+
+def variacao_anual(tendencias):
+    """
+    Variação de cada indicador em relação ao ano anterior, absoluta e
+    percentual. Retorna (absoluta, percentual); anos ausentes da série são
+    pulados, e a comparação é feita com o ano anterior disponível.
+    """
+    absoluta = tendencias.diff()
+    anterior = tendencias.shift(1)
+    percentual = (absoluta / anterior.where(anterior != 0)) * 100
+    return absoluta, percentual
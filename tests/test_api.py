@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from api import ServicoIndicadores
+from memoizacao import CacheLRU
+
+class _ServicoDeTeste(ServicoIndicadores):
+    """Serviço sem dados: cada cálculo espera `duracao` segundos e é registrado"""
+
+    def __init__(self, duracao):
+        self.estado = {"versoes_por_ano": {2020: 1, 2021: 1}}
+        self.anos = [2020, 2021]
+        self.cache = CacheLRU(8)
+        self._trava = threading.Lock()
+        self._travas_chaves = {}
+        self.duracao = duracao
+        self.calculos = []
+
+    def _calcular(self, anos, ufs, grupo):
+        self.calculos.append(tuple(anos))
+        time.sleep(self.duracao)
+        return repr((anos, ufs, grupo)).encode("utf-8")
+
+def _consultar_em_paralelo(servico, consultas):
+    respostas = [None] * len(consultas)
+
+    def consultar(i):
+        respostas[i] = servico.consultar(consultas[i])
+
+    threads = [threading.Thread(target=consultar, args=(i,)) for i in range(len(consultas))]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return respostas, time.perf_counter() - inicio
+
+def test_consultas_diferentes_calculam_em_paralelo():
+    servico = _ServicoDeTeste(duracao=0.3)
+    consultas = [{"anos": "2020"}, {"anos": "2021"}, {"anos": "2020,2021"}, {"ufs": "SP"}]
+    respostas, duracao = _consultar_em_paralelo(servico, consultas)
+    assert len(set(respostas)) == len(consultas)
+    # Em série seriam 1,2 s; com a trava geral durante o cálculo, também
+    assert duracao < 0.9
+
+def test_consultas_iguais_calculam_uma_vez():
+    servico = _ServicoDeTeste(duracao=0.2)
+    respostas, _ = _consultar_em_paralelo(servico, [{"anos": "2020", "ufs": "SP"}] * 6)
+    assert len(set(respostas)) == 1
+    assert len(servico.calculos) == 1
+    estatisticas = servico.cache.estatisticas()
+    assert (estatisticas["falhas"], estatisticas["acertos"]) == (1, 5)
+    assert servico._travas_chaves == {}
+
+def test_erro_no_calculo_nao_fica_no_cache():
+    servico = _ServicoDeTeste(duracao=0)
+    servico._calcular = lambda anos, ufs, grupo: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        servico.consultar({"anos": "2020"})
+    assert servico.cache.itens == {}
+    assert servico._travas_chaves == {}
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("duckdb")
+
+from backends import obter_backend, verificar_paridade
+from dados_sinteticos import gerar_dataframe
+from utils import processar_dataframe
+
+POPULACAO = 211000000
+
+@pytest.fixture(scope="module")
+def dados():
+    return processar_dataframe(gerar_dataframe(20000, 2021, semente=0))
+
+@pytest.mark.parametrize("estados", [[], ["SP"], ["SP", "RJ", "MG"]])
+def test_paridade_pandas_duckdb(dados, estados):
+    assert verificar_paridade(dados, POPULACAO, estados) == []
+
+def test_paridade_nomes_alternativos():
+    dados = processar_dataframe(gerar_dataframe(5000, 2020, semente=1, nomes_alternativos=True))
+    assert verificar_paridade(dados, POPULACAO, ["SP"]) == []
+
+def test_paridade_sem_casos(dados):
+    vazio = dados.iloc[0:0]
+    assert verificar_paridade(vazio, POPULACAO, []) == []
+
+def test_contagens_identicas(dados):
+    mascara = (dados["IDADE"] >= 50).to_numpy()
+    colunas = ["UF", "SEXO"]
+    esperado = obter_backend("pandas").contar(dados, mascara, colunas)
+    obtido = obter_backend("duckdb").contar(dados, mascara, colunas)
+    assert esperado.to_dict() == obtido.to_dict()
+
+def test_backend_desconhecido():
+    with pytest.raises(ValueError):
+        obter_backend("inexistente")
@@ -0,0 +1,37 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from cache_figuras import estatisticas_figuras, figura_em_cache, hash_dados, limpar_figuras
+
+@pytest.fixture(autouse=True)
+def cache_vazio():
+    limpar_figuras()
+    yield
+    limpar_figuras()
+
+def _grafico(dados, titulo, estados=()):
+    """Figura de teste: registra cada construção"""
+    _grafico.construcoes += 1
+    return {"dados": dados.to_dict(), "titulo": titulo, "estados": list(estados)}
+
+def test_figura_construida_uma_vez():
+    _grafico.construcoes = 0
+    dados = pd.Series([3, 1], index=["SP", "RJ"], name="casos")
+    primeira = figura_em_cache(_grafico, dados, "Casos", ["SP", "RJ"])
+    # Mesmo conteúdo em outro objeto (ex.: nova execução do script)
+    segunda = figura_em_cache(_grafico, dados.copy(), "Casos", ["SP", "RJ"])
+    assert segunda is primeira
+    assert _grafico.construcoes == 1
+    figura_em_cache(_grafico, dados, "Óbitos", ["SP", "RJ"])
+    figura_em_cache(_grafico, dados.rename("obitos"), "Casos", ["SP", "RJ"])
+    assert _grafico.construcoes == 3
+    assert estatisticas_figuras()["acertos"] == 1
+
+def test_hash_considera_valores_ordem_e_tipos():
+    dados = pd.Series([3, 1], index=["SP", "RJ"])
+    assert hash_dados(dados) == hash_dados(pd.Series([3, 1], index=["SP", "RJ"]))
+    assert hash_dados(dados) != hash_dados(dados.iloc[::-1])
+    assert hash_dados(dados) != hash_dados(dados.astype("float64"))
+    assert hash_dados(dados) != hash_dados(dados.to_frame())
+    assert hash_dados(pd.DataFrame({"A": [[1], [2]]})) != hash_dados(pd.DataFrame({"A": [[1], [3]]}))
@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from cubo import (combinar_cubos, combinar_marginais, construir_cubo, construir_marginais,
+                  indicadores_do_cubo, resumir_tempos)
+from metricas import calcular_todos_indicadores
+from utils import processar_dataframe
+
+def _dados(linhas, semente):
+    """Registros com nomes do RHC; cerca de um terço de câncer de pele e parte com óbito"""
+    gerador = np.random.default_rng(semente)
+    topografias = np.array(["C439", "C449", "C509", "C619", "C180"])
+    diagnostico = pd.Timestamp("2021-01-01") + pd.to_timedelta(gerador.integers(0, 365, linhas), unit="D")
+    tratamento = diagnostico + pd.to_timedelta(gerador.integers(0, 120, linhas), unit="D")
+    obito = (diagnostico + pd.to_timedelta(gerador.integers(30, 900, linhas), unit="D")).strftime("%d/%m/%Y")
+    obito = np.where(gerador.random(linhas) < 0.3, obito, "")
+    return processar_dataframe(pd.DataFrame({
+        "LOCTUPRI": topografias[gerador.choice(5, linhas, p=[0.15, 0.2, 0.25, 0.2, 0.2])],
+        "LOCTUDET": [f"C{gerador.integers(0, 97):02d}.{gerador.integers(0, 9)}" for _ in range(linhas)],
+        "DTDIAGNO": diagnostico.strftime("%d/%m/%Y"),
+        "DATAINITRT": tratamento.strftime("%d/%m/%Y"),
+        "DATAOBITO": obito,
+        "SEXO": gerador.choice([1, 2], linhas),
+        # Nenhum caso antes dos 30 anos: as faixas vazias também devem aparecer
+        "IDADE": gerador.integers(30, 95, linhas),
+        "RACACOR": gerador.choice([1, 2, 3, 4, 5, 9], linhas),
+        "ESTADRES": gerador.choice(["SP", "RJ", "MG", "BA"], linhas),
+        "INSTRUC": gerador.choice([1, 2, 3, 4, 9], linhas)
+    }))
+
+def _normalizar(valor):
+    """Estrutura comparável: chaves em texto (1 e 1.0 diferem) e números em float"""
+    if isinstance(valor, (pd.Series, dict)):
+        return {str(chave): _normalizar(item) for chave, item in dict(valor).items()}
+    if isinstance(valor, list):
+        return [_normalizar(item) for item in valor]
+    if isinstance(valor, (int, float, np.number)):
+        return pytest.approx(float(valor))
+    return valor
+
+@pytest.mark.parametrize("estados", [[], ["SP", "BA"]])
+def test_indicadores_do_cubo_iguais_aos_de_metricas(estados):
+    df = _dados(2000, semente=0)
+    esperado = calcular_todos_indicadores(df, 1e6, estados)
+    obtido = indicadores_do_cubo(
+        combinar_cubos({2021: construir_cubo(df)}), {2021: resumir_tempos(df)},
+        1e6, estados, combinar_marginais({2021: construir_marginais(df)})
+    )
+    for secao_obtida, secao_esperada in zip(obtido, esperado):
+        assert secao_obtida.keys() == secao_esperada.keys()
+        for chave in secao_esperada:
+            assert _normalizar(secao_obtida[chave]) == _normalizar(secao_esperada[chave]), chave
+
+def test_codigos_sem_conversao_para_float():
+    cubo = construir_cubo(_dados(500, semente=1))
+    pele = cubo["GRUPO"].isin(["C43", "C44"])
+    for coluna in ["SEXO", "RACACOR"]:
+        assert pd.api.types.is_integer_dtype(cubo[coluna])
+        assert cubo.loc[~pele, coluna].isna().all()
+    incidencia, mortalidade, _, _ = indicadores_do_cubo(combinar_cubos({2021: cubo}), {}, 1e6, [])
+    assert set(mortalidade["mortalidade_sexo"].index) <= {1, 2}
+    assert mortalidade["faixas_etarias"]["0-17"] == 0
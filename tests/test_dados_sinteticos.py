@@ -0,0 +1,32 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from dados_sinteticos import COLUNAS_EXTRAS, gerar_arquivo, gerar_dataframe
+from utils import processar_dataframe
+
+def test_mesma_semente_mesmos_dados():
+    pd.testing.assert_frame_equal(gerar_dataframe(500, 2020, semente=3), gerar_dataframe(500, 2020, semente=3))
+    assert not gerar_dataframe(500, 2020, semente=3).equals(gerar_dataframe(500, 2020, semente=4))
+
+def test_formato_do_rhc():
+    df = gerar_dataframe(2000, 2020, semente=0)
+    assert len(df) == 2000
+    assert set(COLUNAS_EXTRAS) <= set(df.columns)
+    assert {"LOCTUPRI", "DTDIAGNO", "ESTADRES", "DATAOBITO"} <= set(df.columns)
+    processado = processar_dataframe(df)
+    diagnosticos = processado["DTDIAGNO"].dropna()
+    assert (diagnosticos.dt.year == 2020).all()
+    # Datas '99/99/9999' e óbitos vazios viram ausentes
+    assert 0 < processado["DTDIAGNO"].isna().sum() < 200
+    assert processado["DATAOBITO"].isna().mean() > 0.5
+
+def test_nomes_alternativos_equivalentes():
+    padrao = processar_dataframe(gerar_dataframe(300, 2021, semente=1))
+    alternativo = processar_dataframe(gerar_dataframe(300, 2021, semente=1, nomes_alternativos=True))
+    pd.testing.assert_frame_equal(padrao, alternativo)
+
+def test_ano_do_nome_do_arquivo(tmp_path):
+    caminho = gerar_arquivo(str(tmp_path / "rhc_2018.csv"), 100, semente=2)
+    df = pd.read_csv(caminho, sep=";")
+    assert df["DTDIAGNO"].str[-4:].isin(["2018", "9999"]).all()
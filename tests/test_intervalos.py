@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from intervalos import DATA_INVALIDA, calcular_intervalos, calcular_tempos
+
+def _dados():
+    return pd.DataFrame({
+        "DTDIAGNO": ["01/01/2021", "01/01/2021", DATA_INVALIDA, "10/03/2021", None],
+        "DATAINITRT": ["11/01/2021", "31/12/2020", "01/02/2021", "", "01/01/2021"],
+        "DATAOBITO": ["01/03/2021", None, None, "10/03/2021", None]
+    })
+
+def test_intervalos_em_dias():
+    intervalos = calcular_intervalos(_dados())
+    tratamento = intervalos["DIFF_DTDIAGNO_DATAINITRT"].tolist()
+    # Datas inválidas, vazias e intervalos negativos viram NaN
+    assert tratamento[0] == 10
+    assert all(math.isnan(v) for v in tratamento[1:])
+    obito = intervalos["DIFF_DTDIAGNO_DATAOBITO"]
+    assert obito.iloc[0] == 59 and obito.iloc[3] == 0
+    assert obito.isna().sum() == 3
+
+def test_negativos_mantidos_quando_pedido():
+    intervalos = calcular_intervalos(_dados(), descartar_negativos=False)
+    assert intervalos["DIFF_DTDIAGNO_DATAINITRT"].iloc[1] == -1
+
+def test_datas_ja_convertidas_e_colunas_ausentes():
+    df = pd.DataFrame({
+        "DTDIAGNO": pd.to_datetime(["2021-01-01", "2021-02-01"]),
+        "DATAINITRT": pd.to_datetime(["2021-01-05", None])
+    }, index=[10, 20])
+    intervalos = calcular_intervalos(df)
+    assert intervalos.index.tolist() == [10, 20]
+    assert intervalos["DIFF_DTDIAGNO_DATAINITRT"].iloc[0] == 4
+    assert intervalos["DIFF_DTDIAGNO_DATAOBITO"].isna().all()
+
+def test_resumo():
+    _, resumo = calcular_tempos(_dados())
+    assert resumo["DIFF_DTDIAGNO_DATAOBITO"] == {
+        "casos": 2, "media": 29.5, "mediana": 29.5, "minimo": 0, "maximo": 59
+    }
+    assert resumo["DIFF_DTDIAGNO_DATAINITRT"]["casos"] == 1
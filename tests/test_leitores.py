@@ -0,0 +1,22 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+from leitores import ler_csv_projetado
+
+def _csv(linhas, codificacao):
+    return BytesIO("\n".join(["ESTADRES;LOCTUPRI;CIDADE"] + linhas).encode(codificacao))
+
+def test_latin1_depois_da_amostra():
+    # Amostra de 64 KB válida em UTF-8; o primeiro acento em latin-1 vem depois
+    linhas = ["SP;C439;Sao Paulo"] * 5000 + ["PR;C441 pálpebra;Maringá"]
+    df = ler_csv_projetado(_csv(linhas, "latin-1"), tamanho_bloco=1000)
+    assert len(df) == 5001
+    assert df["LOCTUPRI"].iloc[-1] == "C441 pálpebra"
+
+def test_utf8():
+    df = ler_csv_projetado(_csv(["PR;C449;Maringá"], "utf-8"))
+    assert df["LOCTUPRI"].tolist() == ["C449"]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import cache_arquivos
+from armazenamento import ConjuntoEmDisco
+from dados_sinteticos import gerar_arquivo
+from lote import calcular_agrupamentos, carregar_diretorio, gravar_resultados, montar_agrupamentos, serializar
+from particoes import liberar_disco
+
+@pytest.fixture
+def diretorio(tmp_path, monkeypatch):
+    """Três anos sintéticos em CSV, com o cache de arquivos isolado no diretório temporário"""
+    monkeypatch.setattr(cache_arquivos, "DIRETORIO_CACHE", str(tmp_path / "cache"))
+    dados = tmp_path / "dados"
+    dados.mkdir()
+    for semente, ano in enumerate([2019, 2020, 2021]):
+        gerar_arquivo(str(dados / f"rhc_{ano}.csv"), 1500, semente=semente)
+    return str(dados)
+
+def _calcular(conjunto, processos, **opcoes):
+    agrupamentos = montar_agrupamentos(None, ["todos", "SP,RJ"], conjunto.anos)
+    return calcular_agrupamentos(conjunto, agrupamentos, processos, **opcoes)
+
+def _resultados(conjunto, processos, **opcoes):
+    """Resultados serializados como na saída JSON do lote"""
+    return json.dumps(serializar(_calcular(conjunto, processos, **opcoes)), ensure_ascii=False, default=str)
+
+def test_processos_iguais_a_sequencial(diretorio):
+    conjunto = carregar_diretorio(diretorio, 2)
+    sequencial = _resultados(conjunto, 1)
+    # Cada ano e todos os anos, com e sem filtro de estados
+    assert len(json.loads(sequencial)) == 8
+    assert _resultados(conjunto, 2) == sequencial
+
+def test_mapa_reducao_igual_ao_sequencial(diretorio):
+    conjunto = carregar_diretorio(diretorio, 2)
+    assert _resultados(conjunto, 2, mapa_reducao=True) == _resultados(conjunto, 1, mapa_reducao=False)
+
+def test_modo_em_disco_igual_ao_em_memoria(diretorio, tmp_path):
+    em_memoria = _resultados(carregar_diretorio(diretorio, 2), 2)
+    particoes = tmp_path / "particoes"
+    estado = {}
+    try:
+        conjunto = carregar_diretorio(diretorio, 2, estado, str(particoes))
+        assert isinstance(conjunto, ConjuntoEmDisco)
+        assert _resultados(conjunto, 2) == em_memoria
+    finally:
+        liberar_disco(estado)
+    # As partições da execução são removidas ao final
+    assert not any(particoes.iterdir())
+
+def test_gravar_resultados(diretorio, tmp_path):
+    resultados = _calcular(carregar_diretorio(diretorio, 2), 1)
+    with open(gravar_resultados(resultados, str(tmp_path / "saida.json")), encoding="utf-8") as arquivo:
+        assert json.load(arquivo) == json.loads(json.dumps(serializar(resultados), default=str))
+    tabela = pd.read_parquet(gravar_resultados(resultados, str(tmp_path / "saida.parquet")))
+    assert set(tabela["AGRUPAMENTO"]) == {r["nome"] for r in resultados}
+    casos = tabela[(tabela["INDICADOR"] == "casos_totais") & (tabela["AGRUPAMENTO"] == "anos=todos;estados=todos")]
+    assert casos["VALOR"].tolist() == [4500]
+    with pytest.raises(ValueError):
+        gravar_resultados(resultados, str(tmp_path / "saida.txt"))
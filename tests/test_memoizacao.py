@@ -0,0 +1,30 @@
+from memoizacao import CacheLRU, chave_indicadores, contem_ano
+
+def test_descarta_o_item_usado_ha_mais_tempo():
+    cache = CacheLRU(2)
+    calculos = []
+
+    def calcular(valor):
+        return lambda: calculos.append(valor) or valor
+
+    cache.obter("a", calcular(1))
+    cache.obter("b", calcular(2))
+    assert cache.obter("a", calcular(10)) == 1
+    cache.obter("c", calcular(3))
+    assert list(cache.itens) == ["a", "c"]
+    assert cache.obter("b", calcular(20)) == 20
+    assert calculos == [1, 2, 3, 20]
+    assert cache.estatisticas() == {"itens": 2, "max_itens": 2, "acertos": 1, "falhas": 4, "taxa_acertos": 0.2}
+
+def test_chave_independe_da_ordem_dos_filtros():
+    versao = ((2020, 1), (2021, 3))
+    assert chave_indicadores(versao, [2021, 2020], ["RJ", "SP"]) == chave_indicadores(versao, [2020, 2021, 2020], ["SP", "RJ"])
+    assert chave_indicadores(versao, [2020], []) != chave_indicadores(versao, [2020], [], "sobrevida")
+    assert chave_indicadores(versao, [2020], None) == chave_indicadores(versao, [2020], [])
+
+def test_invalidar_entradas_de_um_ano():
+    cache = CacheLRU()
+    for anos in ([2020], [2021], [2020, 2021]):
+        cache.obter(chave_indicadores(None, anos, []), lambda: anos)
+    cache.invalidar(contem_ano(2020))
+    assert list(cache.itens) == [chave_indicadores(None, [2021], [])]
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from metricas import (calcular_indicadores_incidencia, calcular_indicadores_mortalidade, calcular_perfil_demografico,
+                      calcular_tempos_medios, calcular_todos_indicadores)
+from utils import processar_dataframe
+
+def _dados():
+    registros = [
+        # (UF, topografia, diagnóstico, tratamento, óbito, sexo, idade, raça/cor, instrução)
+        ("SP", "C439", "10/01/2021", "20/01/2021", "10/06/2021", 1, 70, 1, 2),
+        ("SP", "C449", "10/02/2021", "10/04/2021", "", 2, 55, 1, 3),
+        ("SP", "C449", "15/02/2021", "", "15/02/2022", 2, 82, 4, 9),
+        ("RJ", "C439", "10/03/2021", "01/03/2021", "10/03/2023", 1, 40, 2, 4),
+        ("RJ", "C449", "99/99/9999", "10/05/2021", "", 1, 66, 1, 2),
+        ("RJ", "C509", "10/03/2021", "10/04/2021", "10/09/2021", 2, 58, 4, 1),
+        ("MG", "C619", "10/04/2021", "", "", 1, 75, 9, 9),
+        ("MG", "C44.1", "10/05/2021", "10/06/2021", "10/07/2021", 2, 33, 1, 5),
+    ]
+    return processar_dataframe(pd.DataFrame(registros, columns=[
+        "ESTADRES", "LOCTUPRI", "DTDIAGNO", "DATAINITRT", "DATAOBITO", "SEXO", "IDADE", "RACACOR", "INSTRUC"
+    ]))
+
+def _normalizar(valor):
+    """Estrutura comparável: chaves em texto e números em float"""
+    if isinstance(valor, (pd.Series, dict)):
+        return {str(chave): _normalizar(item) for chave, item in dict(valor).items()}
+    if isinstance(valor, list):
+        return [_normalizar(item) for item in valor]
+    if isinstance(valor, (int, float, np.number)):
+        return pytest.approx(float(valor))
+    return valor
+
+@pytest.mark.parametrize("estados", [[], ["SP", "MG"]])
+def test_agregacao_unica_igual_as_funcoes_individuais(estados):
+    df = _dados()
+    esperado = (
+        calcular_indicadores_incidencia(df, 1000, estados),
+        calcular_indicadores_mortalidade(df, estados),
+        calcular_tempos_medios(df),
+        calcular_perfil_demografico(df)
+    )
+    for secao_obtida, secao_esperada in zip(calcular_todos_indicadores(df, 1000, estados), esperado):
+        assert secao_obtida.keys() == secao_esperada.keys()
+        for chave in secao_esperada:
+            assert _normalizar(secao_obtida[chave]) == _normalizar(secao_esperada[chave]), chave
+
+def test_valores_calculados_a_mao():
+    incidencia, mortalidade, tempos, perfil = calcular_todos_indicadores(_dados(), 1000, [])
+    assert (incidencia["casos_totais"], incidencia["casos_c43"], incidencia["casos_c44"]) == (8, 2, 4)
+    assert incidencia["taxa_incidencia_pele"] == pytest.approx(0.6)
+    assert (mortalidade["obitos_total"], mortalidade["obitos_pele"]) == (5, 4)
+    assert mortalidade["estados"] == ["MG", "RJ", "SP"]
+    assert mortalidade["faixas_etarias"].to_dict() == {"0-17": 0, "18-34": 1, "35-49": 1, "50-64": 0, "65-79": 1, "80+": 1}
+    assert mortalidade["letalidade_c43"] == pytest.approx(100.0)
+    # Tratamento antes do diagnóstico e data '99/99/9999' ficam fora das médias
+    assert tempos["tempo_ate_tratamento"] == pytest.approx((10 + 59 + 31) / 3)
+    assert perfil["sexo"].to_dict() == {1: 3, 2: 3}
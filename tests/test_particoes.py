@@ -0,0 +1,43 @@
+import gc
+import weakref
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from particoes import ConjuntoParticionado, definir_ano, obter_conjunto, remover_ano
+
+def _ano(ano, linhas):
+    return pd.DataFrame({
+        "ANO": [ano] * linhas,
+        "UF": pd.Categorical(["SP", "RJ"] * (linhas // 2)),
+        "CASOS": range(linhas)
+    })
+
+def test_um_ano_sem_copia():
+    df = _ano(2020, 4)
+    conjunto = ConjuntoParticionado({2020: df, 2021: _ano(2021, 2)})
+    assert conjunto.selecionar([2020]) is df
+    assert conjunto.selecionar([2019]).empty
+
+def test_varios_anos_concatenados_sem_guardar_copia():
+    conjunto = ConjuntoParticionado({2020: _ano(2020, 4), 2021: _ano(2021, 2)})
+    df = conjunto.selecionar([2021, 2020])
+    assert df["ANO"].tolist() == [2020] * 4 + [2021] * 2
+    assert isinstance(df["UF"].dtype, pd.CategoricalDtype)
+    # A concatenação é liberada assim que quem a pediu deixa de usá-la
+    referencia = weakref.ref(df)
+    del df
+    gc.collect()
+    assert referencia() is None
+
+def test_conjunto_recriado_apenas_quando_os_dados_mudam():
+    estado = {}
+    definir_ano(estado, 2020, _ano(2020, 4))
+    definir_ano(estado, 2021, _ano(2021, 2))
+    conjunto = obter_conjunto(estado)
+    assert obter_conjunto(estado) is conjunto
+    remover_ano(estado, 2021)
+    novo = obter_conjunto(estado)
+    assert novo is not conjunto
+    assert novo.anos == [2020]
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from populacao import FAIXAS_QUINQUENAIS_ROTULOS, calcular_taxas, padronizacao_disponivel, populacao_selecao
+
+def _tabela(tmp_path, populacao_por_faixa):
+    """Tabela de população de 2021 com a mesma população em todas as faixas de cada UF"""
+    caminho = tmp_path / "populacao.csv"
+    pd.DataFrame([
+        (uf, 2021, 0, faixa, populacao)
+        for uf, populacao in populacao_por_faixa.items()
+        for faixa in FAIXAS_QUINQUENAIS_ROTULOS
+    ], columns=["UF", "ANO", "SEXO", "FAIXA_ETARIA", "POPULACAO"]).to_csv(caminho, index=False)
+    return str(caminho)
+
+def _cubo(ano=2021):
+    return pd.DataFrame([
+        # (UF, grupo, idade, casos)
+        ("SP", "C43", 62, 3),
+        ("SP", "C44", 67, 2),
+        ("SP", "C50", 70, 1),
+        ("RJ", "C44", 20, 4),
+    ], columns=["UF", "GRUPO", "IDADE", "CASOS"]).assign(ANO=ano)
+
+def test_padronizacao_direta(tmp_path):
+    caminho = _tabela(tmp_path, {"SP": 1000, "RJ": 2000})
+    assert padronizacao_disponivel(caminho)
+    taxas = calcular_taxas(_cubo(), caminho=caminho)
+    assert taxas["CASOS"].to_dict() == {"RJ": 4, "SP": 5}
+    assert taxas["POPULACAO"].to_dict() == {"RJ": 34000, "SP": 17000}
+    assert taxas.loc["SP", "TAXA_BRUTA"] == pytest.approx(5 / 17000 * 100000)
+    # Segi (soma 100.000): SP = 3/1000 * 4000 (60-64) + 2/1000 * 3000 (65-69);
+    # RJ = 4/2000 * 8000 (20-24); por 100.000 habitantes
+    assert taxas.loc["SP", "TAXA_PADRONIZADA"] == pytest.approx(18.0)
+    assert taxas.loc["RJ", "TAXA_PADRONIZADA"] == pytest.approx(16.0)
+
+def test_filtro_de_estados_e_ano_mais_proximo(tmp_path):
+    caminho = _tabela(tmp_path, {"SP": 1000, "RJ": 2000})
+    taxas = calcular_taxas(_cubo(ano=2023), ["SP"], grupo="C43", caminho=caminho)
+    assert taxas.index.tolist() == ["SP"]
+    assert taxas.loc["SP", "CASOS"] == 3
+    assert taxas.loc["SP", "TAXA_PADRONIZADA"] == pytest.approx(12.0)
+
+def test_padronizacao_indisponivel_sem_faixas_etarias():
+    assert not padronizacao_disponivel()
+    taxas = calcular_taxas(_cubo(ano=2022))
+    assert taxas["TAXA_PADRONIZADA"].isna().all()
+    populacao_sp = populacao_selecao([2022], ["SP"])
+    assert taxas.loc["SP", "TAXA_BRUTA"] == pytest.approx(5 / populacao_sp * 100000)
@@ -0,0 +1,95 @@
+import itertools
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from quantis import PRECISAO_RELATIVA, EsbocoQuantis, combinar_esbocos
+
+QUANTIS = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+def _verificar_precisao(esboco, valores):
+    """Compara cada quantil estimado com o elemento exato de posição floor(q * (n - 1))"""
+    for q in QUANTIS:
+        exato = float(np.quantile(valores, q, method="lower"))
+        estimado = esboco.quantil(q)
+        # Folga mínima apenas para o arredondamento do ponto flutuante
+        assert abs(estimado - exato) <= PRECISAO_RELATIVA * abs(exato) * (1 + 1e-9), (q, estimado, exato)
+
+def _dividir(valores, partes, semente):
+    embaralhados = np.random.default_rng(semente).permutation(valores)
+    return np.array_split(embaralhados, partes)
+
+def _esbocos(partes):
+    return [EsbocoQuantis().adicionar(parte) for parte in partes]
+
+def test_precisao_valores_positivos():
+    valores = np.random.default_rng(0).lognormal(4, 1.5, size=20000)
+    _verificar_precisao(EsbocoQuantis().adicionar(valores), valores)
+
+def test_precisao_intervalos_em_dias():
+    valores = np.round(np.random.default_rng(1).gamma(2.0, 30.0, size=20000))
+    _verificar_precisao(EsbocoQuantis().adicionar(valores), valores)
+
+def test_combinacao_independe_da_ordem():
+    valores = np.random.default_rng(2).lognormal(3, 1, size=10000)
+    esbocos = _esbocos(_dividir(valores, 4, semente=3))
+    referencia = None
+    for ordem in itertools.permutations(range(len(esbocos))):
+        combinado = combinar_esbocos([esbocos[i] for i in ordem])
+        _verificar_precisao(combinado, valores)
+        estado = (combinado.baldes, combinado.zeros, combinado.contagem, combinado.minimo, combinado.maximo)
+        if referencia is None:
+            referencia = estado
+        assert estado == referencia
+
+def test_combinacao_em_arvore_igual_a_sequencial():
+    valores = np.random.default_rng(4).exponential(400.0, size=8000)
+    a, b, c, d = _esbocos(_dividir(valores, 4, semente=5))
+    em_arvore = combinar_esbocos([combinar_esbocos([a, b]), combinar_esbocos([c, d])])
+    sequencial = combinar_esbocos([d, c, b, a])
+    assert em_arvore.baldes == sequencial.baldes
+    for q in QUANTIS:
+        assert em_arvore.quantil(q) == sequencial.quantil(q)
+    _verificar_precisao(em_arvore, valores)
+
+def test_zeros():
+    gerador = np.random.default_rng(6)
+    valores = np.round(gerador.gamma(1.0, 10.0, size=5000))
+    valores[gerador.random(5000) < 0.4] = 0
+    esbocos = _esbocos(_dividir(valores, 3, semente=7))
+    combinado = combinar_esbocos(esbocos[::-1])
+    assert combinado.zeros == int((valores == 0).sum())
+    _verificar_precisao(combinado, valores)
+
+def test_apenas_zeros():
+    esboco = EsbocoQuantis().adicionar(np.zeros(100))
+    assert all(esboco.quantil(q) == 0.0 for q in QUANTIS)
+
+def test_valores_negativos():
+    valores = np.random.default_rng(8).normal(0, 100, size=10000)
+    valores[::50] = 0
+    for ordem in ([0, 1, 2], [2, 0, 1], [1, 2, 0]):
+        esbocos = _esbocos(_dividir(valores, 3, semente=9))
+        _verificar_precisao(combinar_esbocos([esbocos[i] for i in ordem]), valores)
+
+def test_apenas_negativos():
+    valores = -np.random.default_rng(10).lognormal(2, 1, size=5000)
+    _verificar_precisao(EsbocoQuantis().adicionar(valores), valores)
+
+def test_nan_ignorado_e_esboco_vazio():
+    esboco = EsbocoQuantis().adicionar([np.nan, np.nan])
+    assert esboco.contagem == 0
+    assert math.isnan(esboco.quantil(0.5))
+    assert math.isnan(esboco.media())
+
+def test_media_exata():
+    valores = np.random.default_rng(11).lognormal(3, 1, size=1000)
+    combinado = combinar_esbocos(_esbocos(_dividir(valores, 3, semente=12)))
+    assert combinado.media() == pytest.approx(valores.mean())
+
+def test_precisoes_diferentes_nao_combinam():
+    with pytest.raises(ValueError):
+        EsbocoQuantis(0.01).mesclar(EsbocoQuantis(0.02))
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from sobrevida import calcular_sobrevida, kaplan_meier
+
+def test_curva_sem_censura():
+    # Dez óbitos nos dias 1 a 10: S(t) = 1 - t / 10
+    curvas, resumo = kaplan_meier(np.arange(1, 11), np.ones(10, dtype=bool))
+    assert curvas["SOBREVIDA"].to_numpy() == pytest.approx(1 - np.arange(1, 11) / 10)
+    assert curvas["EM_RISCO"].tolist() == list(range(10, 0, -1))
+    # Greenwood com log(-log), calculado à mão: a banda inferior cruza 0,5
+    # no dia 1 (0,473) e a superior no dia 8 (0,475)
+    linha = resumo.loc["Todos"]
+    assert linha["MEDIANA"] == 5
+    assert linha["MEDIANA_IC_INFERIOR"] == 1
+    assert linha["MEDIANA_IC_SUPERIOR"] == 8
+    assert curvas["IC_INFERIOR"].iloc[0] == pytest.approx(0.4730, abs=1e-4)
+    assert curvas["IC_SUPERIOR"].iloc[7] == pytest.approx(0.4747, abs=1e-4)
+
+def test_intervalo_contem_a_curva():
+    gerador = np.random.default_rng(0)
+    tempos = np.round(gerador.exponential(300, size=500))
+    eventos = gerador.random(500) < 0.7
+    curvas, resumo = kaplan_meier(tempos, eventos, np.where(gerador.random(500) < 0.5, "A", "B"))
+    assert (curvas["IC_INFERIOR"] <= curvas["SOBREVIDA"] + 1e-12).all()
+    assert (curvas["SOBREVIDA"] <= curvas["IC_SUPERIOR"] + 1e-12).all()
+    assert (resumo["MEDIANA_IC_INFERIOR"] <= resumo["MEDIANA"]).all()
+    assert (resumo["MEDIANA"] <= resumo["MEDIANA_IC_SUPERIOR"]).all()
+
+def test_censura_e_estratos():
+    # Estrato A: óbitos em 2 e 4, censura em 3 -> S = 2/3 em 2 e 0 em 4
+    tempos = [2, 3, 4, 5, 6]
+    eventos = [True, False, True, False, False]
+    curvas, resumo = kaplan_meier(tempos, eventos, ["A", "A", "A", "B", "B"])
+    a = curvas[curvas["ESTRATO"] == "A"]
+    assert a["SOBREVIDA"].tolist() == pytest.approx([2 / 3, 2 / 3, 0.0])
+    assert resumo.loc["A", "MEDIANA"] == 4
+    assert resumo.loc["B", "OBITOS"] == 0
+    assert math.isnan(resumo.loc["B", "MEDIANA"])
+
+def test_calcular_sobrevida_por_tipo():
+    df = pd.DataFrame({
+        "TOPOGRAF": ["C439", "C449", "C449", "C509"],
+        "DTDIAGNO": pd.to_datetime(["2021-01-01"] * 4),
+        "DATAINITRT": pd.NaT,
+        "DATAOBITO": pd.to_datetime(["2021-01-11", None, "2021-01-21", "2021-01-05"])
+    })
+    curvas, resumo = calcular_sobrevida(df, "tipo")
+    assert sorted(resumo.index) == ["C43", "C44"]
+    assert resumo.loc["C43", "MEDIANA"] == 10
+    assert resumo.loc["C44", "CASOS"] == 2
@@ -0,0 +1,43 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from tendencias import calcular_tendencias, variacao_anual
+from utils import processar_dataframe
+
+def _dados():
+    """Casos diagnosticados de 2019 a 2021; parte dos óbitos ocorre em 2022 e 2023"""
+    registros = [
+        # (UF, topografia, diagnóstico, óbito)
+        ("SP", "C439", "10/01/2019", "10/06/2019"),
+        ("SP", "C449", "10/02/2019", ""),
+        ("RJ", "C509", "10/03/2019", "10/03/2022"),
+        ("SP", "C439", "10/01/2020", "10/01/2023"),
+        ("RJ", "C449", "10/02/2020", ""),
+        ("SP", "C449", "10/01/2021", "10/12/2021"),
+        ("SP", "C449", "10/02/2021", ""),
+        ("SP", "C509", "10/03/2021", ""),
+    ]
+    return processar_dataframe(pd.DataFrame(registros, columns=["ESTADRES", "LOCTUPRI", "DTDIAGNO", "DATAOBITO"]))
+
+def test_anos_apenas_de_diagnostico():
+    tendencias = calcular_tendencias(_dados(), [], 1000)
+    assert tendencias.index.tolist() == [2019, 2020, 2021]
+    assert tendencias["casos_totais"].tolist() == [3, 2, 3]
+    assert tendencias["casos_pele"].tolist() == [2, 2, 2]
+    # Óbitos contados no ano do óbito; 2022 e 2023 ficam fora da série
+    assert tendencias["obitos_total"].tolist() == [1, 0, 1]
+    # Letalidade da coorte: o óbito de 2023 pertence aos diagnósticos de 2020
+    assert tendencias["letalidade"].tolist() == pytest.approx([50.0, 50.0, 50.0])
+
+def test_filtro_de_estados():
+    tendencias = calcular_tendencias(_dados(), ["RJ"], 1000)
+    assert tendencias.index.tolist() == [2019, 2020]
+    assert tendencias["casos_totais"].tolist() == [1, 1]
+
+def test_variacao_anual_sem_queda_artificial():
+    tendencias = calcular_tendencias(_dados(), [], 1000)
+    absoluta, percentual = variacao_anual(tendencias)
+    assert absoluta["casos_totais"].tolist()[1:] == [-1, 1]
+    assert percentual["casos_totais"].iloc[2] == pytest.approx(50.0)
+    assert (percentual["casos_pele"].dropna() == 0).all()
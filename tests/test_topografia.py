@@ -0,0 +1,31 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from topografia import GRUPOS, TIPO_GRUPO, agrupar_topografia, indexar_topografia, mascara_grupo
+
+TOPOGRAFIAS = ["C439", "C43.9", " c449 ", "C44", "C509", "D091", "X999", None, "C4"]
+
+def test_agrupar_topografia():
+    grupos = agrupar_topografia(pd.Series(TOPOGRAFIAS, index=range(10, 19)))
+    assert grupos.dtype == TIPO_GRUPO
+    assert grupos.index.tolist() == list(range(10, 19))
+    assert grupos.astype(object).where(grupos.notna(), None).tolist() == [
+        "C43", "C43", "C44", "C44", "C50", "D09", "OUTROS", None, "OUTROS"
+    ]
+
+@pytest.mark.parametrize("grupo", list(GRUPOS))
+def test_mascara_igual_a_comparacao_de_textos(grupo):
+    df = pd.DataFrame({"TOPOGRAF": TOPOGRAFIAS})
+    esperado = np.array([
+        isinstance(t, str) and t.strip().upper().replace(".", "")[:3] in GRUPOS[grupo] for t in TOPOGRAFIAS
+    ])
+    assert (mascara_grupo(df, grupo) == esperado).all()
+    assert (mascara_grupo(indexar_topografia(df.copy()), grupo) == esperado).all()
+
+def test_mascara_apos_concatenacao_e_sem_topografia():
+    partes = [indexar_topografia(pd.DataFrame({"TOPOGRAF": t})) for t in (["C439"], ["C449", "C509"])]
+    df = pd.concat(partes, ignore_index=True).astype({"GRUPO_TOPOGRAF": object})
+    assert mascara_grupo(df, "C43+C44").tolist() == [True, True, False]
+    assert not mascara_grupo(pd.DataFrame({"UF": ["SP"]}), "C43").any()
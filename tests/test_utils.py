@@ -0,0 +1,59 @@
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from utils import mapear_colunas, processar_dataframe
+
+def _dados(nomes):
+    """Três registros com os nomes de colunas informados para UF, topografia e localização"""
+    uf, topografia, localizacao = nomes
+    return pd.DataFrame({
+        uf: ["SP", "RJ", "MG"],
+        topografia: ["C439", "C449", "C509"],
+        localizacao: ["C439", "C449", "C509"],
+        "DTDIAGNO": ["01/02/2021", "15/03/2021", "99/99/9999"],
+        "SEXO": [1, 2, 2],
+        "IDADE": [50, 61, 72],
+        "TPCASO": [1, 1, 2]
+    })
+
+def test_colunas_com_nomes_padrao():
+    novo, relatorio = mapear_colunas(_dados(["UF", "TOPOGRAF", "LOUCTUPRI"]))
+    assert novo["UF"].tolist() == ["SP", "RJ", "MG"]
+    assert novo["TOPOGRAF"].tolist() == ["C439", "C449", "C509"]
+    assert novo["LOUCTUPRI"].tolist() == ["C439", "C449", "C509"]
+    assert relatorio["colunas_encontradas"]["UF"] == "UF"
+    assert "TPCASO" in relatorio["colunas_descartadas"]
+
+def test_colunas_com_nomes_do_rhc():
+    novo, relatorio = mapear_colunas(_dados(["ESTADRES", "LOCTUPRI", "LOCTUDET"]))
+    assert novo["UF"].tolist() == ["SP", "RJ", "MG"]
+    assert novo["TOPOGRAF"].tolist() == ["C439", "C449", "C509"]
+    assert relatorio["colunas_encontradas"]["TOPOGRAF"] == "LOCTUPRI"
+    assert "INSTRUC" in relatorio["colunas_ausentes"]
+
+def test_processar_dataframe_mantem_colunas_padrao():
+    df = processar_dataframe(_dados(["UF", "TOPOGRAF", "LOUCTUPRI"]))
+    assert {"UF", "TOPOGRAF", "LOUCTUPRI", "DTDIAGNO"} <= set(df.columns)
+    assert df["DTDIAGNO"].isna().tolist() == [False, False, True]
+
+def test_projecao_sem_copia():
+    linhas = 200000
+    df = pd.DataFrame({
+        "ESTADRES": np.repeat(["SP", "RJ"], linhas // 2),
+        "LOCTUPRI": np.repeat(["C439", "C449"], linhas // 2),
+        "IDADE": np.arange(linhas, dtype="int64"),
+        "EXTRA": np.zeros(linhas)
+    })
+    tracemalloc.start()
+    try:
+        novo, _ = mapear_colunas(df)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert np.shares_memory(novo["IDADE"].to_numpy(), df["IDADE"].to_numpy())
+    # A cópia completa (como df.copy()) alocaria ao menos as colunas numéricas
+    assert pico < df["IDADE"].nbytes / 4
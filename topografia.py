@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Categorias de três caracteres do capítulo II da CID-10 (neoplasias: C00-D48)
+CATEGORIAS_CID = (
+    [f"C{i:02d}" for i in range(98)] +
+    [f"D{i:02d}" for i in range(49)] +
+    ["OUTROS"]
+)
+
+# Tipo categórico fixo: anos diferentes compartilham os mesmos códigos
+TIPO_GRUPO = pd.CategoricalDtype(CATEGORIAS_CID)
+
+# Grupos de topografia consultados pelo dashboard
+GRUPOS = {
+    "C43": ["C43"],
+    "C44": ["C44"],
+    "C43+C44": ["C43", "C44"]
+}
+
+# Tabelas de consulta: para cada grupo, um booleano por código de categoria.
+# A última posição corresponde ao código -1 (topografia ausente).
+_TABELAS_GRUPOS = {
+    grupo: np.append(np.isin(CATEGORIAS_CID, categorias), False)
+    for grupo, categorias in GRUPOS.items()
+}
+
+def agrupar_topografia(topografia):
+    """
+    Converte a coluna TOPOGRAF (ex.: 'C439', 'C43.9') na categoria de três
+    caracteres da CID-10, com tipo categórico fixo.
+    O texto é avaliado apenas uma vez por valor distinto.
+    """
+    if not isinstance(topografia.dtype, pd.CategoricalDtype):
+        topografia = topografia.astype("category")
+    categorias = pd.Series(topografia.cat.categories.astype(str))
+    grupos = categorias.str.strip().str.upper().str.replace(".", "", regex=False).str[:3]
+    grupos = grupos.where(grupos.isin(CATEGORIAS_CID), "OUTROS")
+    codigos_grupos = np.append(
+        pd.Categorical(grupos, dtype=TIPO_GRUPO).codes, -1
+    ).astype("int16")
+    codigos = codigos_grupos[topografia.cat.codes.to_numpy()]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, dtype=TIPO_GRUPO),
+        index=topografia.index,
+        name="GRUPO_TOPOGRAF"
+    )
+
+def indexar_topografia(df):
+    """Adiciona ao DataFrame a coluna GRUPO_TOPOGRAF, usada pelas máscaras"""
+    if "TOPOGRAF" in df.columns:
+        df["GRUPO_TOPOGRAF"] = agrupar_topografia(df["TOPOGRAF"])
+    return df
+
+def mascara_grupo(df, grupo):
+    """
+    Retorna a máscara booleana das linhas do grupo de topografia
+    (ex.: 'C43', 'C44' ou 'C43+C44') por consulta em tabela, sem
+    percorrer os textos.
+    """
+    if "GRUPO_TOPOGRAF" not in df.columns:
+        if "TOPOGRAF" not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        grupos = agrupar_topografia(df["TOPOGRAF"])
+    else:
+        grupos = df["GRUPO_TOPOGRAF"]
+    if grupos.dtype != TIPO_GRUPO:
+        # Ex.: concatenação que perdeu o tipo categórico
+        grupos = grupos.astype(TIPO_GRUPO)
+    return _TABELAS_GRUPOS[grupo][grupos.cat.codes.to_numpy()]
@@ -1,67 +1,80 @@
 import pandas as pd
+import numpy as np
 import re
 from datetime import datetime
+from intervalos import calcular_tempos
+from topografia import indexar_topografia, mascara_grupo
 
-def mapear_colunas(df):
+# Variações conhecidas dos nomes de cada coluna padrão
+MAPEAMENTO_COLUNAS = {
+    # Cada coluna padrão é aceita com o próprio nome antes das variações
+    # Variações para TOPOGRAF
+    'TOPOGRAF': ['TOPOGRAF', 'LOCTUPRI', 'LOCTUDET', 'LOCTUMORPRIM', 'CID'],
+    
+    # Variações para datas
+    'DTDIAGNO': ['DTDIAGNO', 'DATAPRICON', 'DTPRICON'],
+    'DATAINITRT': ['DATAINITRT', 'DTINITRT'],
+    'DATAOBITO': ['DATAOBITO'],
+    
+    # Variações para dados demográficos
+    'SEXO': ['SEXO'],
+    'IDADE': ['IDADE'],
+    'RACACOR': ['RACACOR'],
+    'UF': ['UF', 'ESTADRES', 'UFUH'],  # Usando ESTADRES ou UFUH como UF
+    'INSTRUC': ['INSTRUC'],
+    'LOUCTUPRI': ['LOUCTUPRI', 'LOCTUPRI', 'LOCTUDET']
+}
+
+# Colunas originais usadas diretamente pela interface, além das colunas padrão
+COLUNAS_AUXILIARES = ['LOCTUDET', 'NUMDOC']
+
+def resolver_colunas(colunas):
     """
-    Mapeia as colunas do DataFrame para os nomes padrão esperados.
-    Verifica variações comuns dos nomes das colunas.
+    Resolve, para cada coluna padrão, qual coluna original será usada.
+    Retorna um dicionário {coluna_padrao: coluna_original}.
     """
-    mapeamento = {
-        # Variações para TOPOGRAF
-        'TOPOGRAF': ['LOCTUPRI', 'LOCTUDET', 'LOCTUMORPRIM', 'CID'],
-        
-        # Variações para datas
-        'DTDIAGNO': ['DTDIAGNO', 'DATAPRICON', 'DTPRICON'],
-        'DATAINITRT': ['DATAINITRT', 'DTINITRT'],
-        'DATAOBITO': ['DATAOBITO'],
-        
-        # Variações para dados demográficos
-        'SEXO': ['SEXO'],
-        'IDADE': ['IDADE'],
-        'RACACOR': ['RACACOR'],
-        'UF': ['ESTADRES', 'UFUH'],  # Usando ESTADRES ou UFUH como UF
-        'INSTRUC': ['INSTRUC'],
-        'LOUCTUPRI': ['LOCTUPRI', 'LOCTUDET']
-    }
-
-    novo_df = df.copy()
+    colunas = set(colunas)
     colunas_encontradas = {}
-
-    # Para cada coluna padrão que precisamos
-    for coluna_padrao, variacoes in mapeamento.items():
-        # Procura por todas as variações possíveis
+    for coluna_padrao, variacoes in MAPEAMENTO_COLUNAS.items():
+        # Procura pela primeira variação disponível
         for variacao in variacoes:
-            if variacao in df.columns:
-                novo_df[coluna_padrao] = df[variacao]
+            if variacao in colunas:
                 colunas_encontradas[coluna_padrao] = variacao
                 break
-    
-    # Verificar colunas ausentes
-    colunas_ausentes = set(mapeamento.keys()) - set(colunas_encontradas.keys())
-    if colunas_ausentes:
-        print(f"Aviso: As seguintes colunas não foram encontradas: {colunas_ausentes}")
-        print(f"Colunas disponíveis no arquivo: {df.columns.tolist()}")
-    
-    return novo_df
+    return colunas_encontradas
 
-# Função para calcular a diferença entre datas
-def calcular_diferenca(data1, data2):
-    # Verificar se alguma das datas é '99/99/9999'
-    if data1 == '99/99/9999' or data2 == '99/99/9999':
-        return None  # Ignorar o cálculo se encontrar '99/99/9999'
-    
-    # Tentar converter as datas para o formato datetime e ignorar erros
-    try:
-        d1 = pd.to_datetime(data1, errors='coerce', format='%d/%m/%Y')
-        d2 = pd.to_datetime(data2, errors='coerce', format='%d/%m/%Y')
-        # Verificar se ambas as datas são válidas antes de calcular a diferença
-        if pd.notna(d1) and pd.notna(d2):
-            return (d2 - d1).days
-        else:
-            return None  # Retornar None se qualquer data não for válida
-    except Exception as e:
-        return None  # Retornar None se ocorrer qualquer erro
+def colunas_necessarias(colunas):
+    """Lista as colunas originais que precisam ser lidas do arquivo"""
+    colunas_encontradas = resolver_colunas(colunas)
+    necessarias = list(dict.fromkeys(colunas_encontradas.values()))
+    necessarias += [c for c in COLUNAS_AUXILIARES if c in colunas and c not in necessarias]
+    return necessarias
+
+def mapear_colunas(df):
+    """
+    Mapeia as colunas do DataFrame para os nomes padrão esperados.
+    Verifica variações comuns dos nomes das colunas.
+    Retorna um novo DataFrame apenas com as colunas padrão e auxiliares,
+    que reaproveita os arrays do original (sem cópia), e um relatório do
+    mapeamento.
+    """
+    colunas_encontradas = resolver_colunas(df.columns)
+
+    # Projeção e renomeação: cada coluna padrão aponta para a coluna original
+    colunas = {padrao: df[variacao] for padrao, variacao in colunas_encontradas.items()}
+    usadas = set(colunas_encontradas.values())
+    for coluna in COLUNAS_AUXILIARES:
+        if coluna in df.columns and coluna not in usadas and coluna not in colunas:
+            colunas[coluna] = df[coluna]
+    novo_df = pd.DataFrame(colunas, index=df.index, copy=False)
+
+    relatorio = {
+        "colunas_encontradas": colunas_encontradas,
+        "colunas_ausentes": [c for c in MAPEAMENTO_COLUNAS if c not in colunas_encontradas],
+        "colunas_descartadas": [c for c in df.columns if c not in usadas and c not in colunas],
+        "colunas_disponiveis": df.columns.tolist()
+    }
+    return novo_df, relatorio
 
 # Função para extrair o ano do nome do arquivo
 def extrair_ano_do_arquivo(nome_arquivo):
@@ -81,7 +94,7 @@ def get_raca_map():
 # Função para processar os dados carregados
 def processar_dataframe(df):
     # Mapear colunas para nomes padrão
-    df = mapear_colunas(df)
+    df, mapeamento = mapear_colunas(df)
     
     # Converter datas importantes
     colunas_data = ["DTDIAGNO", "DATAINITRT", "DATAOBITO"]
@@ -95,15 +108,81 @@ def processar_dataframe(df):
     if "DATAOBITO" in df.columns:
         df["ANO_OBITO"] = df["DATAOBITO"].dt.year
     
+    # Reduzir o consumo de memória do DataFrame normalizado
+    df, relatorio = compactar_dataframe(df)
+    
+    # Índice de topografia: grupos da CID-10 usados nos filtros por tipo de câncer
+    df = indexar_topografia(df)
+    df.attrs["mapeamento"] = mapeamento
+    df.attrs["memoria"] = relatorio
+    
     return df
 
+# Colunas de códigos armazenadas como categorias
+COLUNAS_CATEGORICAS = ["UF", "TOPOGRAF", "LOUCTUPRI", "LOCTUDET"]
+
+# Colunas de códigos numéricos armazenadas como inteiros pequenos
+COLUNAS_INTEIRAS = ["SEXO", "RACACOR", "INSTRUC", "IDADE"]
+
+def bytes_por_linha(df):
+    """Calcula o consumo médio de memória por linha do DataFrame"""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True, index=False).sum() / len(df)
+
+def _para_inteiro_pequeno(serie):
+    """Converte uma coluna de códigos para o menor tipo inteiro possível"""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    validos = numeros.dropna()
+    # Manter a coluna original se houver textos ou valores fracionários
+    if numeros.isna().sum() > serie.isna().sum() or (validos % 1 != 0).any():
+        return serie
+    minimo = validos.min() if len(validos) else 0
+    maximo = validos.max() if len(validos) else 0
+    for tipo in ("int8", "int16", "int32"):
+        limites = np.iinfo(tipo)
+        if limites.min <= minimo and maximo <= limites.max:
+            break
+    # Tipo inteiro anulável quando houver valores ausentes
+    if numeros.isna().any():
+        tipo = tipo.capitalize()
+    return numeros.astype(tipo)
+
+def compactar_dataframe(df):
+    """
+    Converte os códigos para categorias ou inteiros pequenos.
+    Retorna o DataFrame compactado e um relatório com os bytes por linha
+    antes e depois da conversão.
+    """
+    antes = bytes_por_linha(df)
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns and df[coluna].dtype == object:
+            df[coluna] = df[coluna].astype("category")
+
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df.columns:
+            df[coluna] = _para_inteiro_pequeno(df[coluna])
+
+    # Anos com ausentes: float32 representa os anos exatamente
+    for coluna in ["ANO_DIAGNO", "ANO_OBITO"]:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("float32")
+
+    relatorio = {
+        "linhas": len(df),
+        "bytes_por_linha_antes": antes,
+        "bytes_por_linha_depois": bytes_por_linha(df)
+    }
+    return df, relatorio
+
 # Obter dados filtrados por tipo de câncer
 def filtrar_dados(data):
     # Filtrar cânceres de pele (todos os C44)
-    data_pele = data[data["LOCTUPRI"].str.startswith("C44", na=False)].copy()
+    data_pele = data[mascara_grupo(data, "C44")].copy()
     
     # Filtrar melanoma (um subconjunto específico)
-    data_melanoma = data[data["LOCTUPRI"].str.contains("C43", na=False)].copy()
+    data_melanoma = data[mascara_grupo(data, "C43")].copy()
     
     # Garantir que as colunas de ano sejam adicionadas aos dataframes filtrados
     for df in [data_pele, data_melanoma]:
@@ -148,26 +227,13 @@ def calcular_metricas_basicas(data_pele, data_melanoma, ano_selecionado, populac
 
 # Calcular tempos médios
 def calcular_tempos_medios(data):
-    # Calculando as diferenças de datas entre DTDIAGNO e DATAINITRT
-    data["DIFF_DTDIAGNO_DATAINITRT"] = data.apply(
-        lambda row: calcular_diferenca(
-            row["DTDIAGNO"].strftime('%d/%m/%Y') if pd.notna(row["DTDIAGNO"]) else None, 
-            row["DATAINITRT"].strftime('%d/%m/%Y') if pd.notna(row["DATAINITRT"]) else None
-        ), 
-        axis=1
-    )
-    
-    # Calculando as diferenças de datas entre DTDIAGNO e DATAOBITO
-    data["DIFF_DTDIAGNO_DATAOBITO"] = data.apply(
-        lambda row: calcular_diferenca(
-            row["DTDIAGNO"].strftime('%d/%m/%Y') if pd.notna(row["DTDIAGNO"]) else None, 
-            row["DATAOBITO"].strftime('%d/%m/%Y') if pd.notna(row["DATAOBITO"]) else None
-        ), 
-        axis=1
-    )
+    # Calcular os intervalos entre diagnóstico, tratamento e óbito de forma vetorizada
+    intervalos, resumo = calcular_tempos(data)
+    data["DIFF_DTDIAGNO_DATAINITRT"] = intervalos["DIFF_DTDIAGNO_DATAINITRT"]
+    data["DIFF_DTDIAGNO_DATAOBITO"] = intervalos["DIFF_DTDIAGNO_DATAOBITO"]
     
-    # Filtrar valores válidos para calcular as médias (remover NaN)
-    media_tempo_initr = data["DIFF_DTDIAGNO_DATAINITRT"].dropna().mean()
-    media_tempo_obito = data["DIFF_DTDIAGNO_DATAOBITO"].dropna().mean()
+    # Médias dos valores válidos (NaN são ignorados)
+    media_tempo_initr = resumo["DIFF_DTDIAGNO_DATAINITRT"]["media"]
+    media_tempo_obito = resumo["DIFF_DTDIAGNO_DATAOBITO"]["media"]
     
     return media_tempo_initr, media_tempo_obito 
\ No newline at end of file
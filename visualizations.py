@@ -7,6 +7,8 @@ import base64
 from io import BytesIO
 import pandas as pd
 
+from instrumentacao import medir
+
 # Paleta de cores moderna e vibrante
 PALETA_CORES = [
     "#4361EE", "#3A0CA3", "#7209B7", "#F72585",
@@ -55,6 +57,7 @@ def aplicar_estilo_moderno(fig):
     
     return fig
 
+@medir("figura.criar_grafico_pizza")
 def criar_grafico_pizza(dados, coluna, titulo, estados_selecionados=None):
     # Filtrar por estados selecionados, se aplicável
     if estados_selecionados:
@@ -96,6 +99,7 @@ def criar_grafico_pizza(dados, coluna, titulo, estados_selecionados=None):
 
     return fig
 
+@medir("figura.criar_grafico_barras")
 def criar_grafico_barras(dados, x, y, titulo, estados_selecionados=None):
     # Filtrar por estados selecionados, se aplicável
     if estados_selecionados:
@@ -134,6 +138,7 @@ def criar_grafico_barras(dados, x, y, titulo, estados_selecionados=None):
 
     return fig
 
+@medir("figura.criar_grafico_linha")
 def criar_grafico_linha(df, x, y, titulo):
     fig = px.line(
         df, 
@@ -156,6 +161,44 @@ def criar_grafico_linha(df, x, y, titulo):
     
     return fig
 
+@medir("figura.criar_grafico_sobrevida")
+def criar_grafico_sobrevida(curvas, titulo):
+    """Curvas de Kaplan-Meier em degraus, com a faixa do intervalo de confiança"""
+    fig = go.Figure()
+    for i, (estrato, curva) in enumerate(curvas.groupby("ESTRATO", sort=True)):
+        cor = PALETA_CORES[i % len(PALETA_CORES)]
+        # Todas as curvas começam em sobrevida 1 no diagnóstico
+        tempo = [0] + curva["TEMPO"].tolist()
+        sobrevida = [1] + curva["SOBREVIDA"].tolist()
+        inferior = [1] + curva["IC_INFERIOR"].tolist()
+        superior = [1] + curva["IC_SUPERIOR"].tolist()
+        fig.add_trace(go.Scatter(
+            x=tempo + tempo[::-1],
+            y=superior + inferior[::-1],
+            fill='toself',
+            fillcolor=cor,
+            opacity=0.2,
+            line=dict(width=0, shape='hv'),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(go.Scatter(
+            x=tempo,
+            y=sobrevida,
+            name=str(estrato),
+            mode='lines',
+            line=dict(color=cor, width=3, shape='hv'),
+            hovertemplate='<b>%{x:.0f} dias</b><br>Sobrevida: %{y:.1%}<extra></extra>'
+        ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title="Dias desde o diagnóstico",
+        yaxis_title="Probabilidade de sobrevida",
+        yaxis_range=[0, 1.02]
+    )
+    return aplicar_estilo_moderno(fig)
+
+@medir("figura.criar_mapa_calor")
 def criar_mapa_calor(df, titulo):
     # Criar mapa de calor por estado
     fig = px.choropleth(
@@ -181,6 +224,7 @@ def criar_mapa_calor(df, titulo):
     
     return fig
 
+@medir("figura.criar_grafico_combinado_idade_sexo")
 def criar_grafico_combinado_idade_sexo(df_idade, df_sexo, ano_selecionado):
     # Criar subplots: 1 row, 2 cols
     fig = make_subplots(